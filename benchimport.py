@@ -0,0 +1,122 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Script to benchmark the cold start time of genimage.py against a budget'''
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+# budget of the median cold start time of the common invocation, no XIP and no
+# address translation, which runs once per example in the SDK makefiles
+DEFAULT_BUDGET_MS = 200.0
+
+GENIMAGE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'genimage.py')
+
+def parse_importtime(text: str) -> dict:
+    '''Returns the self import time in microseconds of each top level package in -X importtime output'''
+    packages = {}
+    for line in text.splitlines():
+        if not line.startswith('import time:'):
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            # the header line
+            continue
+        package = fields[2].strip().split('.')[0]
+        packages[package] = packages.get(package, 0) + int(fields[0])
+    return packages
+
+def run_once(genimage_args: list) -> dict:
+    '''Runs genimage.py in a new interpreter and returns its wall time and import times'''
+    start = time.perf_counter()
+    proc = subprocess.run([sys.executable, '-X', 'importtime', GENIMAGE_PATH] + genimage_args,
+                          stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=False)
+    wall_us = (time.perf_counter() - start) * 1e6
+    if proc.returncode != 0:
+        errors = [line for line in proc.stderr.splitlines() if not line.startswith('import time:')]
+        raise RuntimeError(f"genimage.py failed: {' '.join(errors)}")
+
+    packages = parse_importtime(proc.stderr)
+    return {"wall_us": wall_us, "import_us": sum(packages.values()), "packages": packages}
+
+def main():
+    '''Main function'''
+    my_parser = argparse.ArgumentParser(description='Benchmark the cold start time of genimage.py, '
+                                        'the genimage.py arguments follow --')
+    my_parser.add_argument('-n', '--runs', type=int, default=10,
+                           help='Number of runs, the median is compared against the budget')
+    my_parser.add_argument('--budget-ms', type=float, default=DEFAULT_BUDGET_MS,
+                           help=f'Budget of the median wall time in ms (default {DEFAULT_BUDGET_MS})')
+    my_parser.add_argument('--top', type=int, default=10,
+                           help='Number of packages to list by import time')
+    my_parser.add_argument('--json', required=False, type=str, default=None,
+                           help='Also write the results to this JSON file to track them')
+    my_parser.add_argument('genimage_args', nargs=argparse.REMAINDER)
+    arguments = my_parser.parse_args()
+
+    genimage_args = arguments.genimage_args
+    if len(genimage_args) > 0 and genimage_args[0] == '--':
+        genimage_args = genimage_args[1:]
+    if len(genimage_args) == 0:
+        my_parser.error('the genimage.py arguments are required')
+
+    runs = [run_once(genimage_args) for _ in range(arguments.runs)]
+
+    wall_ms = statistics.median(run['wall_us'] for run in runs) / 1000
+    import_ms = statistics.median(run['import_us'] for run in runs) / 1000
+    packages = {}
+    for package in runs[0]['packages']:
+        packages[package] = statistics.median(run['packages'].get(package, 0) for run in runs) / 1000
+
+    print(f"Median of {len(runs)} runs: {wall_ms:.1f} ms wall time, {import_ms:.1f} ms of imports")
+    print(f"{'package':<24} {'import ms':>10}")
+    for package, package_ms in sorted(packages.items(), key=lambda x: -x[1])[:arguments.top]:
+        print(f"{package:<24} {package_ms:>10.2f}")
+
+    within_budget = bool(wall_ms <= arguments.budget_ms)
+    print(f"Budget {arguments.budget_ms:.1f} ms: {'PASS' if within_budget else 'FAIL'}")
+
+    if arguments.json is not None:
+        results = {"args": genimage_args, "runs": len(runs), "budget_ms": arguments.budget_ms,
+                   "wall_ms": wall_ms, "import_ms": import_ms, "packages": packages}
+        with open(arguments.json, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=4)
+
+    if not within_budget:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Script to benchmark the image layout settings with the load time estimate'''
+import argparse
+import itertools
+import json
+import os
+import tempfile
+from modules.args import xip_addr_type
+from modules.multicoreelf import MultiCoreELF
+from modules.loadsim import LoadProfile, get_load_report
+
+def list_type(item_type):
+    '''Custom type to take comma separated lists of values'''
+    def parse(arg_val: str) -> list:
+        return [item_type(val) for val in arg_val.split(',')]
+    return parse
+
+def bool_type(arg_val: str) -> bool:
+    '''Custom type to take "true/false" strings'''
+    return bool(arg_val.upper() == "TRUE")
+
+def main():
+    '''Main function'''
+    my_parser = argparse.ArgumentParser(description='Benchmark the layout settings with the SBL load time estimate')
+    my_parser.add_argument('-i', '--core-img', required=True, action='append', nargs='*',
+                           help='Specify the individual ELF images as core_num:ELF_image')
+    my_parser.add_argument('-p', '--profile', required=True, type=str,
+                           help='Device load profile JSON inside the deviceData/LoadProfile folder')
+    my_parser.add_argument('--merge-segments', type=list_type(bool_type), default=[False, True])
+    my_parser.add_argument('-t', '--tolerance-limit', type=list_type(int), default=[0])
+    my_parser.add_argument('--ignore-context', type=list_type(bool_type), default=[False])
+    my_parser.add_argument('--max_segment_size', type=list_type(int), default=[8192])
+    my_parser.add_argument('--xip', type=xip_addr_type, default=None,
+                           help='Leave the XIP range out of the benchmarked image')
+    my_parser.add_argument('--xlat', type=str, default=None)
+    my_parser.add_argument('--json', required=False, type=str, default=None,
+                           help='Also write the results to this JSON file')
+    arguments = my_parser.parse_args()
+
+    profile = LoadProfile(arguments.profile)
+    # the inputs are parsed once for all the settings
+    core_cache = {}
+    results = []
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        ofname = os.path.join(tmp_dir, 'bench.mcelf')
+        for segmerge, tol_limit, ignore_context, max_segment_size in itertools.product(
+                arguments.merge_segments, arguments.tolerance_limit,
+                arguments.ignore_context, arguments.max_segment_size):
+            m_elf = MultiCoreELF(ofname=ofname, ignore_range=arguments.xip, core_cache=core_cache)
+            for ifname in arguments.core_img:
+                m_elf.add_elf(ifname[0])
+            m_elf.generate_multicoreelf(max_segment_size=max_segment_size, segmerge=segmerge,
+                                        tol_limit=tol_limit, ignore_context=ignore_context,
+                                        xlat_file_path=arguments.xlat, add_rs_note=True)
+            report = get_load_report(ofname, profile)
+            report['image'] = None
+            report['settings'] = {"merge_segments": segmerge, "tolerance_limit": tol_limit,
+                                  "ignore_context": ignore_context, "max_segment_size": max_segment_size}
+            report['file_size'] = os.path.getsize(ofname)
+            results.append(report)
+
+    results.sort(key=lambda x: x['total_us'])
+    print(f"{'merge':>6} {'tol':>8} {'ignctx':>6} {'maxseg':>8} {'segs':>6} {'size':>10} {'load ms':>10}")
+    for report in results:
+        settings = report['settings']
+        print(f"{str(settings['merge_segments']):>6} {settings['tolerance_limit']:>8} "
+              f"{str(settings['ignore_context']):>6} {settings['max_segment_size']:>8} "
+              f"{report['segments']:>6} {report['file_size']:>10} {report['total_us'] / 1000:>10.3f}")
+
+    if arguments.json is not None:
+        with open(arguments.json, 'w', encoding='utf-8') as file:
+            json.dump(results, file, indent=4)
+
+if __name__ == "__main__":
+    main()
@@ -31,18 +31,97 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 '''
 
 '''Main script to generate the multicore ELF image'''
-from modules.args import get_args
+import json
+import os
+import sys
+from modules.args import get_args, get_diff_args
 from modules.multicoreelf import MultiCoreELF
-from modules.note import CustomNote
+from modules.note import CustomNote, get_note_size
+from modules.emit import EMITTERS, EMITTER_SUFFIXES, RawImageEmitter
+from modules.overlap import check_overlaps, has_collisions, get_overlap_text
 
-def generate_image(arguments, m_elf: MultiCoreELF, add_rs_note = False, custom_note: CustomNote = None):
-    '''Helper function to generate image'''
+# the modules of the optional modes are imported when the mode is used, so the
+# common invocation from the makefiles only loads what it needs
+
+def get_emitters(arguments, m_elf: MultiCoreELF):
+    '''Returns the emitters of the other output formats requested for an image'''
+    emitters = []
+    for out_format in arguments.format or []:
+        fname = f"{m_elf.ofname}{EMITTER_SUFFIXES[out_format]}"
+        if out_format == 'raw':
+            # a raw image only makes sense for an address range like the XIP one
+            if m_elf.accept_range is not None:
+                emitters.append(RawImageEmitter(fname, m_elf.accept_range))
+        else:
+            emitters.append(EMITTERS[out_format](fname))
+    return emitters
+
+def get_custom_notes(arguments):
+    '''Returns the custom notes of the main image, their files are streamed into the image'''
+    return [CustomNote.from_file(note.name, note.type, note.file) for note in arguments.note or []]
+
+def get_segment_transforms(arguments):
+    '''Returns the transforms computing the segment results of the report'''
+    from modules.transform import DigestTransform, ZeroBlockTransform, DeflateSizeTransform
+    transforms = []
+    if arguments.report_digest is not None:
+        transforms.append(DigestTransform(arguments.report_digest))
+    if arguments.report_zero_bytes:
+        transforms.append(ZeroBlockTransform())
+    if arguments.report_deflate_size:
+        transforms.append(DeflateSizeTransform())
+    return transforms
+
+def add_input_elfs(arguments, m_elf: MultiCoreELF):
+    '''Helper function to add the input ELFs to an image'''
     for ifname in arguments.core_img:
         m_elf.add_elf(ifname[0])
 
     if arguments.sso is not None:
         for ifname in arguments.sso:
-            m_elf.add_sso(ifname[0])
+            m_elf.add_sso(ifname[0].file, cores=ifname[0].cores)
+
+def tune_layout(arguments, images: list):
+    '''Evaluates the candidate layouts of the images and sets the best settings in the arguments'''
+    from modules.autolayout import LayoutInput, get_candidates, find_best_layout, get_comparison_table
+    section_extract_flag = bool(arguments.section_extract.upper() == "TRUE")
+
+    layouts = []
+    for m_elf, add_rs_note in images:
+        add_input_elfs(arguments, m_elf)
+        descriptors = m_elf.get_layout_descriptors(section_extract=section_extract_flag,
+                                                   pipeline_depth=arguments.pipeline_depth,
+                                                   xlat_file_path=arguments.xlat)
+        custom_note_size = 0
+        if add_rs_note:
+            custom_note_size = sum(get_note_size(note.get_name(), len(note.data))
+                                   for note in get_custom_notes(arguments))
+        layouts.append(LayoutInput(descriptors, m_elf.get_elfheader_size(), m_elf.get_core_count(),
+                                   add_rs_note=add_rs_note, custom_note_size=custom_note_size))
+
+    chunk_sizes = arguments.auto_layout_chunk_sizes
+    if arguments.max_segment_size not in chunk_sizes:
+        chunk_sizes = [arguments.max_segment_size] + chunk_sizes
+    candidates = get_candidates(arguments.auto_layout_tolerances, chunk_sizes)
+    results = find_best_layout(layouts, candidates, arguments.auto_layout_objective)
+
+    print(f"Evaluated {len(candidates)} layouts, the best ones:")
+    print(get_comparison_table(results), end='')
+
+    best = results[0]['candidate']
+    arguments.merge_segments = "true" if best.segmerge else "false"
+    arguments.tolerance_limit = best.tol_limit
+    arguments.ignore_context = "true" if best.ignore_context else "false"
+    arguments.max_segment_size = best.max_segment_size
+    arguments.segment_order = best.order
+    print(f"Using --merge-segments={arguments.merge_segments} --tolerance-limit={arguments.tolerance_limit} "
+          f"--ignore-context={arguments.ignore_context} --max_segment_size={arguments.max_segment_size} "
+          f"--segment-order={arguments.segment_order}")
+
+def generate_image(arguments, m_elf: MultiCoreELF, add_rs_note = False, custom_note: CustomNote = None,
+                   only_if_changed = False):
+    '''Helper function to generate image, returns 0 on success'''
+    add_input_elfs(arguments, m_elf)
 
     # Set segment merge flag based on input string "true/false"
     segment_merge_flag = False
@@ -60,41 +139,197 @@ def generate_image(arguments, m_elf: MultiCoreELF, add_rs_note = False, custom_n
     else:
         ignore_context_flag = False
 
+    # Set section extract flag based on input string "true/false"
+    section_extract_flag = False
+
+    if (arguments.section_extract.upper() == "TRUE"):
+        section_extract_flag = True
+    else:
+        section_extract_flag = False
+
     # Generate multicoreelf
-    m_elf.generate_multicoreelf(max_segment_size=arguments.max_segment_size,
+    return m_elf.generate_multicoreelf(max_segment_size=arguments.max_segment_size,
                                 segmerge=segment_merge_flag,
                                 tol_limit=arguments.tolerance_limit,
                                 ignore_context=ignore_context_flag,
                                 xlat_file_path=arguments.xlat,
                                 custom_note=custom_note,
-                                add_rs_note=add_rs_note)
+                                add_rs_note=add_rs_note,
+                                section_extract=section_extract_flag,
+                                pipeline_depth=arguments.pipeline_depth,
+                                only_if_changed=only_if_changed,
+                                update=arguments.update,
+                                emitters=get_emitters(arguments, m_elf),
+                                report=arguments.report,
+                                order=arguments.segment_order,
+                                transforms=get_segment_transforms(arguments) if arguments.report else None,
+                                transform_jobs=arguments.transform_jobs)
 
-def main():
-    '''Main function'''
-    arguments = get_args()
+def check_images(arguments, images: list):
+    '''Checks the segments of all the images for overlaps, returns False if the check fails'''
+    if arguments.check_overlaps == 'off':
+        return True
+    local_spans = []
+    load_spans = []
+    for m_elf, _ in images:
+        local_spans.extend(m_elf.local_spans)
+        load_spans.extend(m_elf.load_spans)
+
+    result = check_overlaps(local_spans, load_spans, margin=arguments.overlap_margin)
+    if not has_collisions(result):
+        return True
+
+    level = "ERROR" if arguments.check_overlaps == 'error' else "WARNING"
+    for line in get_overlap_text(result).splitlines():
+        print(f"[{level}] : {line}")
+    return arguments.check_overlaps != 'error'
+
+def watch_images(arguments, images: list):
+    '''Regenerates the images whenever one of their input files changes'''
+    from modules.watch import FileWatcher
+    watch_paths = set()
+    for m_elf, _ in images:
+        watch_paths.update(m_elf.elf_file_list.values())
+
+    xlat_path = None
+    if arguments.xlat is not None:
+        xlat_path = os.path.realpath(arguments.xlat)
+        watch_paths.add(xlat_path)
+
+    watcher = FileWatcher(watch_paths, debounce=arguments.watch_debounce)
+    print(f"Watching {len(watch_paths)} files, press Ctrl+C to stop")
+
+    try:
+        while True:
+            changed = watcher.wait()
+            # the parsed segments of unchanged cores are reused, an image whose
+            # segments and entry points did not change is not written again
+            xlat_changed = bool(xlat_path in changed)
+            for m_elf, add_rs_note in images:
+                try:
+                    custom_note = get_custom_notes(arguments) if add_rs_note else None
+                    if generate_image(arguments, m_elf, add_rs_note=add_rs_note, custom_note=custom_note,
+                                      only_if_changed=not xlat_changed) != 0:
+                        m_elf.log_error(f"Failed to generate {m_elf.ofname}")
+                except Exception as err: # pylint: disable=broad-except
+                    # keep watching, the input may be rebuilt again
+                    m_elf.log_error(f"Failed to generate {m_elf.ofname}: {err}")
+            check_images(arguments, images)
+            print(f"Regenerated images for changes in {', '.join(sorted(changed))}")
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+
+def diff_main(argv):
+    '''Compares two images, returns 1 if they differ like cmp'''
+    from modules.imagediff import diff_images, get_diff_text
+    arguments = get_diff_args(argv)
+
+    diff = diff_images(arguments.old, arguments.new, block_size=arguments.block_size, jobs=arguments.jobs)
+    print(get_diff_text(diff), end='')
+
+    if arguments.json is not None:
+        with open(arguments.json, 'w', encoding='utf-8') as file:
+            json.dump(diff, file, indent=4)
+
+    return 0 if diff['identical'] else 1
+
+def serve_main(argv):
+    '''Generates the images of genimagec.py jobs until the server is idle'''
+    from modules.server import serve
+    from modules.args import get_serve_args
+    arguments = get_serve_args(argv)
+    return serve(run, socket_path=arguments.socket, idle_timeout=arguments.idle_timeout,
+                 max_cached_images=arguments.max_cached_images)
+
+def run(argv, core_caches=None):
+    '''Generates the images for the given arguments, returns the exit code
+
+    A long running caller can pass the same core_caches dict to every call, the
+    parsed input ELFs of each output are then kept in it between the calls.
+    '''
+    # the diff and serve subcommands have their own arguments, all the others generate images
+    if len(argv) > 0 and argv[0] == 'diff':
+        return diff_main(argv[1:])
+    if len(argv) > 0 and argv[0] == 'serve':
+        return serve_main(argv[1:])
+
+    arguments = get_args(argv)
 
     if arguments.xlat is not None and arguments.xlat.strip() == "":
         arguments.xlat = None
 
-    is_xip = bool(arguments.xip is not None)
+    # the XIP range is a partition named xip
+    partitions = {}
+    if arguments.xip is not None:
+        partitions['xip'] = arguments.xip
+    for partition in arguments.partition or []:
+        partitions[partition.name] = partition
 
-    ignore_range = None
-    accept_range = None
+    # all images share the parsed input ELFs, so they are read only once
+    core_cache = {}
+    if core_caches is not None:
+        # reinserted to keep the most recently used output last
+        cache_key = os.path.realpath(arguments.output)
+        core_cache = core_caches.pop(cache_key, {})
+        core_caches[cache_key] = core_cache
+    images = []
 
-    if is_xip:
-        ignore_range = accept_range = arguments.xip
+    elf_index = None
+    if arguments.elf_index is not None:
+        from modules.elfindex import ElfIndex
+        elf_index = ElfIndex(arguments.elf_index)
 
-        m_elf_xip = MultiCoreELF(
-            ofname=f"{arguments.output}_xip",
-            accept_range=accept_range
+    for name, partition in partitions.items():
+        m_elf_part = MultiCoreELF(
+            ofname=f"{arguments.output}_{name}",
+            accept_range=partition,
+            core_cache=core_cache,
+            elf_index=elf_index
             )
-        generate_image(arguments, m_elf_xip, add_rs_note=False)
+        images.append((m_elf_part, False))
 
+    # segments in none of the partitions go to the main image
     m_elf = MultiCoreELF(
         ofname=arguments.output,
-        ignore_range=ignore_range
+        ignore_range=list(partitions.values()),
+        core_cache=core_cache,
+        elf_index=elf_index
         )
-    generate_image(arguments, m_elf, add_rs_note=True)
+    images.append((m_elf, True))
+
+    # the note files are opened before any image is written, they may have changed since parsing the arguments
+    try:
+        custom_notes = get_custom_notes(arguments)
+    except OSError as err:
+        m_elf.log_error(f"Cannot read note file {err.filename}: {err.strerror}")
+        return 1
+
+    # every core must have address translation regions, also for the auto layout
+    if m_elf.check_xlat(arguments.xlat) != 0:
+        return 1
+
+    if arguments.auto_layout:
+        tune_layout(arguments, images)
+
+    # the custom notes go to the main image along with the RS note
+    for m_elf, add_rs_note in images:
+        custom_note = custom_notes if add_rs_note else None
+        if generate_image(arguments, m_elf, add_rs_note=add_rs_note, custom_note=custom_note) != 0:
+            return 1
+
+    if not check_images(arguments, images):
+        return 1
+
+    if arguments.watch:
+        watch_images(arguments, images)
+
+    return 0
+
+def main():
+    '''Main function'''
+    sys.exit(run(sys.argv[1:]))
 
 if __name__ == "__main__":
     main()
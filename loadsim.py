@@ -0,0 +1,66 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Script to estimate the time the bootloader takes to load multicore ELF images'''
+import argparse
+import json
+from modules.loadsim import LoadProfile, get_load_report
+
+def print_report(report):
+    '''Prints a load time estimate as text'''
+    print(f"{report['image']} ({report['profile']}): {report['segments']} segments, "
+          f"{report['load_bytes']} bytes, {report['total_us'] / 1000:.3f} ms")
+    for core, us in report['cores'].items():
+        print(f"    {core:>8} : {us / 1000:10.3f} ms")
+
+def main():
+    '''Main function'''
+    my_parser = argparse.ArgumentParser(description='Estimate the SBL load time of multicore ELF images')
+    my_parser.add_argument('-i', '--image', required=True, action='append', type=str,
+                           help='Multicore ELF image to simulate, can be given multiple times')
+    my_parser.add_argument('-p', '--profile', required=True, type=str,
+                           help='Device load profile JSON inside the deviceData/LoadProfile folder')
+    my_parser.add_argument('--json', required=False, type=str, default=None,
+                           help='Also write the estimates to this JSON file')
+    arguments = my_parser.parse_args()
+
+    profile = LoadProfile(arguments.profile)
+    reports = [get_load_report(image, profile) for image in arguments.image]
+    for report in reports:
+        print_report(report)
+
+    if arguments.json is not None:
+        with open(arguments.json, 'w', encoding='utf-8') as file:
+            json.dump(reports, file, indent=4)
+
+if __name__ == "__main__":
+    main()
@@ -33,23 +33,66 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 '''Module to perform Address Translation'''
 
 import json
+import os
 
-def address_translate(xlat_file_path, coreid, addr):
-    '''Address Translation based on device'''
-    output_addr = addr
-    with open(xlat_file_path, 'r', encoding='utf-8') as file:
-        data = json.load(file)
+class AddressTranslator():
+    '''Address Translation tables of a device, loaded once'''
+    def __init__(self, xlat_file_path) -> None:
+        with open(xlat_file_path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+
+        # (cpulocaladdr, socaddr, regionsize) of each region, per core in file order
+        self.core_regions = []
+        for core in data['cores'].values():
+            regions = []
+            for info in core['info']:
+                regions.append((int(info["cpulocaladdr"], 16), int(info["socaddr"], 16),
+                                int(info["regionsize"], 16)))
+            self.core_regions.append(regions)
+
+    def has_core(self, coreid):
+        '''Returns True if the tables have the regions of a core, cores are indexed in file order'''
+        return 0 <= coreid < len(self.core_regions)
+
+    def __get_regions(self, coreid):
+        if not self.has_core(coreid):
+            raise ValueError(f"No address translation regions for core {coreid}, "
+                             f"the tables have {len(self.core_regions)} cores")
+        return self.core_regions[coreid]
+
+    def translate(self, coreid, addr):
+        '''Returns the translated address and whether it is inside a region of the core'''
+        for cpulocaladdr, socaddr, regionsize in self.__get_regions(coreid):
+            if (addr >= cpulocaladdr) and (addr < cpulocaladdr + regionsize):
+                return socaddr + (addr - cpulocaladdr), True
 
-    region_addr_info = list(data['cores'].values())[coreid]['info']
+        return addr, False
 
-    for info in region_addr_info:
-        cpulocaladdr = int(info["cpulocaladdr"], 16)
-        socaddr = int(info["socaddr"], 16)
-        regionsize = int(info["regionsize"], 16)
-        if((addr >= cpulocaladdr) and (addr < cpulocaladdr + regionsize)):
-            offset = addr - cpulocaladdr
-            output_addr = socaddr + offset
-            break
+    def get_boundaries(self, coreid, addr, size):
+        '''Returns the offsets inside [addr, addr + size) where a region of the core starts or ends'''
+        offsets = []
+        for cpulocaladdr, _, regionsize in self.__get_regions(coreid):
+            for boundary in (cpulocaladdr, cpulocaladdr + regionsize):
+                if addr < boundary < addr + size:
+                    offsets.append(boundary - addr)
+        return offsets
+
+# loaded translation tables by path, reused while the JSON file is unchanged
+_TRANSLATORS = {}
+
+def get_address_translator(xlat_file_path):
+    '''Returns the address translator of a device JSON, loading it only when it changed'''
+    path = os.path.realpath(xlat_file_path)
+    f_stat = os.stat(path)
+    key = (f_stat.st_ino, f_stat.st_size, f_stat.st_mtime_ns)
+    cached = _TRANSLATORS.get(path)
+    if cached is None or cached[0] != key:
+        cached = (key, AddressTranslator(path))
+        _TRANSLATORS[path] = cached
+    return cached[1]
+
+def address_translate(xlat_file_path, coreid, addr):
+    '''Address Translation based on device'''
+    output_addr, _ = get_address_translator(xlat_file_path).translate(coreid, addr)
 
     return output_addr
-    
\ No newline at end of file
@@ -0,0 +1,157 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Module with the Python API to generate multicore ELF images without the command line'''
+
+import io
+import os
+from collections import namedtuple
+from dataclasses import dataclass, field
+from typing import BinaryIO, List, Mapping, Optional, Sequence, Union
+from .consts import SEGMENT_ORDERS
+from .multicoreelf import MultiCoreELF
+from .note import CustomNote
+
+# address range of a partition, the end is exclusive
+AddressRange = namedtuple('AddressRange', ['start', 'end'])
+
+# an input ELF is a path, a bytes-like object or a readable binary file object
+ElfSource = Union[str, os.PathLike, bytes, bytearray, memoryview, BinaryIO]
+
+# a shared static object and the IDs of the cores using it, None for all the cores
+SharedObject = namedtuple('SharedObject', ['source', 'cores'])
+
+@dataclass
+class ImageOptions():
+    '''Options of an image, the counterparts of the genimage.py arguments'''
+    max_segment_size: int = 8192
+    merge_segments: bool = False
+    tolerance_limit: int = 0
+    ignore_context: bool = False
+    xlat: Optional[str] = None
+    section_extract: bool = False
+    segment_order: str = 'address'
+    add_rs_note: bool = True
+    # a custom note or a list of them, CustomNote.from_file streams the note data from a file
+    custom_note: Union[None, CustomNote, List[CustomNote]] = None
+    # only segments inside accept_range and outside all of the ignore_ranges are kept
+    accept_range: Optional[AddressRange] = None
+    ignore_ranges: List[AddressRange] = field(default_factory=list)
+    little_endian: bool = True
+
+    def __post_init__(self):
+        if self.max_segment_size <= 0:
+            raise ValueError("max_segment_size must be positive")
+        if self.tolerance_limit < 0:
+            raise ValueError("tolerance_limit must not be negative")
+        if self.segment_order not in SEGMENT_ORDERS:
+            raise ValueError(f"segment_order must be one of {', '.join(SEGMENT_ORDERS)}")
+
+def get_elf_source(source: ElfSource):
+    '''Returns the real path of an input ELF given as a path, else its contents'''
+    if isinstance(source, (str, os.PathLike)):
+        return os.path.realpath(source)
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        return source
+    if hasattr(source, 'read'):
+        return source.read()
+    raise TypeError(f"Unsupported input ELF: {type(source).__name__}")
+
+def add_elf_source(m_elf: MultiCoreELF, core_id, source: ElfSource):
+    '''Adds an input ELF given as a path, bytes-like object or file object to an image'''
+    source = get_elf_source(source)
+    if isinstance(source, str):
+        m_elf.add_elf_file(core_id, source)
+    else:
+        m_elf.add_elf_data(core_id, source)
+
+def add_sso_source(m_elf: MultiCoreELF, sso: SharedObject):
+    '''Adds an input SSO given as a path, bytes-like object or file object to an image'''
+    source = get_elf_source(sso.source)
+    if isinstance(source, str):
+        m_elf.add_sso(source, cores=sso.cores)
+    else:
+        m_elf.add_sso_data(source, cores=sso.cores)
+
+def build_image(cores: Mapping[Union[int, str], ElfSource], options: Optional[ImageOptions] = None,
+                output: Union[None, str, os.PathLike, BinaryIO] = None,
+                sso: Union[None, ElfSource, SharedObject, Sequence[SharedObject]] = None,
+                core_cache: Optional[dict] = None) -> Optional[bytes]:
+    '''Generates the image of the given input ELF of each core
+
+    The image is returned as bytes if output is None, else it is written to the
+    output path or streamed in order to the writable binary file object. sso is
+    an SSO used by all the cores, or a list of SharedObject and of SSOs used by all the cores. Images generated
+    from the same inputs can share a core_cache dict to parse them once.
+    '''
+    if options is None:
+        options = ImageOptions()
+    if len(cores) == 0:
+        raise ValueError("At least one core image is required")
+
+    target = output
+    if output is None:
+        target = io.BytesIO()
+    elif isinstance(output, os.PathLike):
+        target = os.fspath(output)
+
+    m_elf = MultiCoreELF(ofname=target, little_endian=options.little_endian,
+                         ignore_range=list(options.ignore_ranges), accept_range=options.accept_range,
+                         core_cache=core_cache)
+    for core_id, source in cores.items():
+        add_elf_source(m_elf, core_id, source)
+    if isinstance(sso, SharedObject) or (sso is not None and not isinstance(sso, (list, tuple))):
+        sso = [sso]
+    for shared_object in sso or []:
+        # a source without cores is used by all of them
+        if not isinstance(shared_object, SharedObject):
+            shared_object = SharedObject(shared_object, None)
+        add_sso_source(m_elf, shared_object)
+
+    ret = m_elf.generate_multicoreelf(max_segment_size=options.max_segment_size,
+                                      segmerge=options.merge_segments,
+                                      tol_limit=options.tolerance_limit,
+                                      ignore_context=options.ignore_context,
+                                      xlat_file_path=options.xlat,
+                                      custom_note=options.custom_note,
+                                      add_rs_note=options.add_rs_note,
+                                      section_extract=options.section_extract,
+                                      order=options.segment_order)
+    if ret != 0:
+        raise ValueError("Failed to lay out the image")
+
+    if output is None:
+        return target.getvalue()
+    return None
+
+if __name__ == "__main__":
+    pass
@@ -32,8 +32,11 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 '''Abstraction layer for parsing arguments'''
 import argparse
+import os
 from collections import namedtuple
 from modules import desc
+from modules.emit import EMITTERS
+from modules.consts import SEGMENT_ORDERS
 
 def xip_addr_type(arg_val: str) -> tuple:
     '''Custom type to take xip arguments'''
@@ -58,14 +61,104 @@ def xip_addr_type(arg_val: str) -> tuple:
 
     return addr_range(start=start_addr, end=end_addr)
 
-def get_args():
+def partition_type(arg_val: str) -> tuple:
+    '''Custom type to take address range partition arguments'''
+    parts = arg_val.split(':', 1)
+    if len(parts) != 2 or not parts[0].isidentifier():
+        raise argparse.ArgumentTypeError('Invalid partition arguments, expected name:start:end')
+
+    addr_range = xip_addr_type(parts[1])
+    if addr_range is None:
+        raise argparse.ArgumentTypeError('Invalid partition address range')
+
+    partition = namedtuple('Partition', ['name', 'start', 'end'])
+
+    return partition(name=parts[0], start=addr_range.start, end=addr_range.end)
+
+def check_partitions(my_parser, arguments):
+    '''Checks that the partitions have unique names and don't overlap'''
+    partitions = list(arguments.partition or [])
+    if arguments.xip is not None:
+        partitions.append(arguments.xip)
+
+    names = [getattr(partition, 'name', 'xip') for partition in partitions]
+    if len(set(names)) != len(names):
+        my_parser.error('Partition names must be unique, the XIP partition is named xip')
+
+    partitions = sorted(partitions, key=lambda x: x.start)
+    for prev, cur in zip(partitions, partitions[1:]):
+        if cur.start < prev.end:
+            my_parser.error(f'Partitions at {hex(prev.start)} and {hex(cur.start)} overlap')
+
+def note_type(arg_val: str) -> tuple:
+    '''Custom type to take custom note arguments as name:type:file'''
+    parts = arg_val.split(':', 2)
+    if len(parts) != 3 or parts[0] == '' or parts[2] == '':
+        raise argparse.ArgumentTypeError('Invalid note arguments, expected name:type:file')
+    if not parts[0].isascii() or not parts[0].isprintable():
+        raise argparse.ArgumentTypeError('Note name must be printable ASCII')
+
+    try:
+        ntype = int(parts[1], 0)
+    except ValueError as err:
+        raise argparse.ArgumentTypeError('Invalid note type') from err
+    if not 0 <= ntype <= 0xFFFFFFFF:
+        raise argparse.ArgumentTypeError('Note type must fit in 32 bits')
+    # checked here so a missing file fails before any image is written
+    if not os.path.isfile(parts[2]) or not os.access(parts[2], os.R_OK):
+        raise argparse.ArgumentTypeError(f'Note file {parts[2]} does not exist or is not readable')
+
+    note = namedtuple('Note', ['name', 'type', 'file'])
+
+    return note(name=parts[0], type=ntype, file=parts[2])
+
+def sso_type(arg_val: str) -> tuple:
+    '''Custom type to take SSO arguments as file, shared by all the cores, or as cores:file
+    with the comma separated IDs of the cores using it'''
+    cores = None
+    fname = arg_val
+    parts = arg_val.split(':', 1)
+    if len(parts) == 2 and all(core.isdigit() for core in parts[0].split(',')):
+        cores = [int(core) for core in parts[0].split(',')]
+        fname = parts[1]
+    if fname == '':
+        raise argparse.ArgumentTypeError('Invalid SSO arguments, expected [cores:]file')
+
+    sso = namedtuple('SSO', ['cores', 'file'])
+
+    return sso(cores=cores, file=fname)
+
+def int_list_type(arg_val: str) -> list:
+    '''Custom type to take comma separated integers'''
+    try:
+        return [int(val, 0) for val in arg_val.split(',')]
+    except ValueError as err:
+        raise argparse.ArgumentTypeError('Invalid list of integers') from err
+
+def objective_type(arg_val: str) -> dict:
+    '''Custom type to take the auto layout objective as comma separated metric=weight pairs'''
+    weights = {}
+    for item in arg_val.split(','):
+        parts = item.split('=')
+        if len(parts) != 2 or parts[0] not in ('size', 'segments', 'padding'):
+            raise argparse.ArgumentTypeError('Invalid objective, expected metric=weight with \
+                                             metric as size, segments or padding')
+        try:
+            weights[parts[0]] = float(parts[1])
+        except ValueError as err:
+            raise argparse.ArgumentTypeError('Invalid objective weight') from err
+    return weights
+
+def get_args(argv=None):
     '''Abstraction layer to fetch arguments via argparse module'''
     my_parser = argparse.ArgumentParser(description=desc.G_TOOL_DEFINITION)
     my_parser.add_argument('-i', '--core-img', required=True, action='append', nargs='*', \
                            help='Specify the individual ELF images. \
                             To be specified as core_num:ELF_image. \
                                 Example: --core-img=0:core0_binary.out')
-    my_parser.add_argument('-s', '--sso', required=False, action='append', nargs='*')
+    my_parser.add_argument('-s', '--sso', required=False, action='append', nargs='*', type=sso_type, \
+                           help='Specify the shared static objects as file, used by all the cores, \
+                            or as core_num,core_num:file. Example: --sso=0,1:shared_lib.out')
     my_parser.add_argument('--merge-segments', required=True, type=str, default=False)
     my_parser.add_argument('-t', '--tolerance-limit', type=int, required=True, default=0)
     my_parser.add_argument('--ignore-context', required=True, type=str, default=False)
@@ -74,14 +167,121 @@ def get_args():
                            help='Provide the start and end address seperated by colon. \
                             This will generate {multicore_elf.out_xip}. \
                                 Example: --xip=0x60100000:0x60200000')
+    my_parser.add_argument('--partition', required=False, action='append', type=partition_type, \
+                           help='Route the segments in an address range to their own image \
+                            {multicore_elf.out_name}, can be given multiple times. \
+                                Example: --partition=ospi1:0x88000000:0x88100000')
     my_parser.add_argument('--xlat', required=True, type=str, default=None, \
                            help="Path to device JSON file inside the \
                             deviceData/AddrTranslate folder")
     my_parser.add_argument('--max_segment_size', required=True, type=int, default=None, \
                            help="Maximum allowed size for a loadable segment. \
                              This option is not honored when merge segments is set to True")
+    my_parser.add_argument('--section-extract', required=False, type=str, default="false", \
+                           help="Copy only the parts of a loadable segment covered by allocated \
+                             sections, dropping alignment holes between them")
+    my_parser.add_argument('--pipeline-depth', required=False, type=int, default=0, \
+                           help="Overlap reading, layout and writing using reader and writer threads. \
+                             The reader warms up to 16 MiB of input files per level ahead of the parser, \
+                             the writer holds this many buffers in flight. 0 disables the pipelined mode")
+    my_parser.add_argument('--format', required=False, action='append', choices=list(EMITTERS), \
+                           help="Also write the image in this format, can be given multiple times. \
+                             raw is only written for the XIP and partition images")
+    my_parser.add_argument('--segment-order', required=False, choices=SEGMENT_ORDERS, default='address', \
+                           help="Order of the segments in the image, by address or by core and then address")
+    my_parser.add_argument('--auto-layout', required=False, action='store_true', \
+                           help="Evaluate candidate layouts in memory and use the best one, overriding \
+                             --merge-segments, --tolerance-limit, --ignore-context, --max_segment_size \
+                             and --segment-order")
+    my_parser.add_argument('--auto-layout-tolerances', required=False, type=int_list_type, \
+                           default=[0, 16, 64, 256, 1024, 4096], \
+                           help="Comma separated tolerance limits evaluated by --auto-layout")
+    my_parser.add_argument('--auto-layout-chunk-sizes', required=False, type=int_list_type, \
+                           default=[4096, 8192, 16384, 65536], \
+                           help="Comma separated maximum segment sizes evaluated by --auto-layout")
+    my_parser.add_argument('--auto-layout-objective', required=False, type=objective_type, \
+                           default={'size': 1.0, 'segments': 256.0}, \
+                           help="Score minimized by --auto-layout as weights of the file size in bytes, \
+                             the segment count and the merge padding. Example: size=1,segments=256")
+    my_parser.add_argument('--report', required=False, action='store_true', \
+                           help="Write a layout and padding report of each image \
+                             to {multicore_elf.out.report.json} and {multicore_elf.out.report.txt}")
+    my_parser.add_argument('--report-digest', required=False, type=str, default=None, \
+                           help="Add the digest of each segment with this hashlib algorithm \
+                             to the --report, for example sha256")
+    my_parser.add_argument('--report-zero-bytes', required=False, action='store_true', \
+                           help="Add the bytes of each segment in 4 KiB blocks of zeros to the --report")
+    my_parser.add_argument('--report-deflate-size', required=False, action='store_true', \
+                           help="Add the deflate compressed size of each segment to the --report")
+    my_parser.add_argument('--transform-jobs', required=False, type=int, default=None, \
+                           help="Number of threads or processes computing the segment results \
+                             of the --report, by default the number of CPUs")
+    my_parser.add_argument('--elf-index', required=False, type=str, default=None, \
+                           help="Directory of a persistent index of parsed input ELFs, \
+                             unchanged inputs are not parsed again")
+    my_parser.add_argument('--note', required=False, action='append', type=note_type, \
+                           help="Add the contents of a file as a note of the given name and type \
+                             to the main image, as name:type:file. Can be given multiple times")
+    my_parser.add_argument('--check-overlaps', required=False, choices=['off', 'warn', 'error'], \
+                           default='warn', \
+                           help="Check the segments of the images for overlaps, in the local addresses \
+                             of each core and the load addresses of all the images, and warn or fail")
+    my_parser.add_argument('--overlap-margin', required=False, type=int, default=0, \
+                           help="Also report segments of different cores or images closer than \
+                             this many bytes at their load addresses")
+    my_parser.add_argument('--update', required=False, action='store_true', \
+                           help="Patch the changed segments of an existing output in place when \
+                             its layout matches, else rebuild it")
+    my_parser.add_argument('--watch', required=False, action='store_true', \
+                           help="Keep running and regenerate the images when an input ELF \
+                             or the address translation JSON changes")
+    my_parser.add_argument('--watch-debounce', required=False, type=float, default=0.3, \
+                           help="Time in seconds the inputs must stay unchanged before regenerating")
+
+    arguments = my_parser.parse_args(argv)
+    check_partitions(my_parser, arguments)
+    if not arguments.report and (arguments.report_digest is not None or arguments.report_zero_bytes or
+                                 arguments.report_deflate_size):
+        my_parser.error('--report-digest, --report-zero-bytes and --report-deflate-size require --report')
+    if arguments.report_digest is not None:
+        import hashlib
+        if arguments.report_digest not in hashlib.algorithms_available:
+            my_parser.error(f'unknown --report-digest algorithm {arguments.report_digest}')
+
+    return arguments
+
+def get_diff_args(argv):
+    '''Abstraction layer to fetch the arguments of the diff subcommand'''
+    my_parser = argparse.ArgumentParser(prog='genimage.py diff',
+                                        description='Compare two multicore ELF images segment by segment')
+    my_parser.add_argument('old', type=str, help='Multicore ELF image to compare against')
+    my_parser.add_argument('new', type=str, help='Multicore ELF image to compare')
+    my_parser.add_argument('--block-size', required=False, type=int, default=4096, \
+                           help="Granularity of the changed bytes of a segment for the update size estimate")
+    my_parser.add_argument('--jobs', required=False, type=int, default=None, \
+                           help="Number of threads hashing the segments, by default the number of CPUs")
+    my_parser.add_argument('--json', required=False, type=str, default=None, \
+                           help="Also write the comparison to this JSON file")
+
+    arguments = my_parser.parse_args(argv)
+    if arguments.block_size <= 0:
+        my_parser.error('--block-size must be positive')
+
+    return arguments
+
+def get_serve_args(argv):
+    '''Abstraction layer to fetch the arguments of the serve subcommand'''
+    my_parser = argparse.ArgumentParser(prog='genimage.py serve',
+                                        description='Generate images for genimagec.py in a long running process')
+    my_parser.add_argument('--socket', required=False, type=str, default=None, \
+                           help="Path of the Unix socket, by default $GENIMAGE_SOCKET or \
+                             genimage.sock in $XDG_RUNTIME_DIR, else in genimage-{uid} in the temporary directory")
+    my_parser.add_argument('--idle-timeout', required=False, type=float, default=3600, \
+                           help="Stop after this many seconds without a job, 0 to never stop")
+    my_parser.add_argument('--max-cached-images', required=False, type=int, default=64, \
+                           help="Number of outputs whose parsed input ELFs are kept in memory")
 
-    return my_parser.parse_args()
+    return my_parser.parse_args(argv)
 
 if __name__ == "__main__":
     pass
@@ -0,0 +1,155 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Module to pick the image layout settings by evaluating candidate layouts in memory'''
+
+import itertools
+from collections import namedtuple
+from .consts import SEGMENT_ORDERS
+from .elf_structs import ElfConstants as ELFC
+from .note import get_note_size, NOTE_NAME_VENDOR, NOTE_NAME_SEGMENT_MAP, NOTE_NAME_ENTRY_POINTS, \
+    NOTE_NAME_SHARED_SEGMENTS
+
+LayoutCandidate = namedtuple('LayoutCandidate',
+                             ['segmerge', 'tol_limit', 'ignore_context', 'max_segment_size', 'order'])
+
+# size of an entry point item, the image always uses 32 bit program headers
+EP_ITEM_SIZE = 8
+SHARED_ITEM_SIZE = 12
+RS_SIZE = 32
+
+class LayoutInput():
+    '''Lightweight description of an image to evaluate layouts on, without any payload'''
+    def __init__(self, descriptors, eh_size, num_cores, add_rs_note=False, custom_note_size=0) -> None:
+        # (vaddr, size, core, shared) of each unchunked segment at its SoC address, in the order they
+        # are added to the image, shared is the (core, address offset) of each core using a shared
+        # segment or None
+        self.descriptors = descriptors
+        self.eh_size = eh_size
+        self.ph_size = ELFC.ELFPH32_SIZE.value
+        self.num_cores = num_cores
+        self.add_rs_note = add_rs_note
+        self.custom_note_size = custom_note_size
+
+def get_candidates(tolerances, chunk_sizes, orders=SEGMENT_ORDERS):
+    '''Returns the candidate layouts for the given tolerance limits and chunk sizes'''
+    candidates = []
+    for order, max_segment_size in itertools.product(orders, chunk_sizes):
+        candidates.append(LayoutCandidate(False, 0, False, max_segment_size, order))
+        for tol_limit, ignore_context in itertools.product(tolerances, (False, True)):
+            candidates.append(LayoutCandidate(True, tol_limit, ignore_context, max_segment_size, order))
+    return candidates
+
+def evaluate_layout(layout: LayoutInput, candidate: LayoutCandidate):
+    '''Returns the file size, segment count and merge padding of an image laid out as a candidate
+
+    This follows ELF.merge_segments and ELF.layout_elf on (vaddr, size, core, shared) tuples.
+    '''
+    chunks = []
+    mss = candidate.max_segment_size
+    for vaddr, size, core, shared in layout.descriptors:
+        for start in range(0, size, mss):
+            chunks.append((vaddr + start, min(mss, size - start), core, shared))
+
+    if candidate.order == 'core':
+        chunks.sort(key=lambda x: (x[2], x[0]))
+    else:
+        chunks.sort(key=lambda x: x[0])
+
+    padding = 0
+    seg_count = len(chunks)
+    load_size = sum(chunk[1] for chunk in chunks)
+    # shared cores of each segment after merging
+    seg_shared = [chunk[3] for chunk in chunks]
+    if candidate.segmerge and len(chunks) > 1:
+        seg_count = 1
+        cur_vaddr, cur_size, cur_core, cur_shared = chunks[0]
+        seg_shared = [cur_shared]
+        for vaddr, size, core, shared in chunks[1:]:
+            gap = vaddr - (cur_vaddr + cur_size)
+            if 0 <= gap <= candidate.tol_limit and vaddr != cur_vaddr and \
+                    (candidate.ignore_context or core == cur_core) and shared == cur_shared:
+                padding += gap
+                cur_size += gap + size
+            else:
+                seg_count += 1
+                cur_vaddr, cur_size, cur_core, cur_shared = vaddr, size, core, shared
+                seg_shared.append(shared)
+
+    note_size = get_note_size(NOTE_NAME_VENDOR, 0) + get_note_size(NOTE_NAME_SEGMENT_MAP, seg_count) + \
+        get_note_size(NOTE_NAME_ENTRY_POINTS, layout.num_cores * EP_ITEM_SIZE) + layout.custom_note_size
+    shared_items = sum(len(shared) for shared in seg_shared if shared is not None)
+    if shared_items > 0:
+        note_size += get_note_size(NOTE_NAME_SHARED_SEGMENTS, shared_items * SHARED_ITEM_SIZE)
+    file_size = layout.eh_size + (seg_count + 1) * layout.ph_size + note_size + load_size + padding
+
+    if layout.add_rs_note:
+        # see ELF.__add_rs_note_segment
+        rs_padding = 16 - ((file_size - 52 - note_size) % 16)
+        file_size += layout.ph_size + rs_padding + RS_SIZE
+
+    return file_size, seg_count, padding
+
+def find_best_layout(layouts: list, candidates: list, weights: dict):
+    '''Evaluates the candidates on all the images, returns the results sorted by their score'''
+    results = []
+    for candidate in candidates:
+        file_size = 0
+        seg_count = 0
+        padding = 0
+        for layout in layouts:
+            l_file_size, l_seg_count, l_padding = evaluate_layout(layout, candidate)
+            file_size += l_file_size
+            seg_count += l_seg_count
+            padding += l_padding
+        score = weights.get('size', 0) * file_size + weights.get('segments', 0) * seg_count + \
+            weights.get('padding', 0) * padding
+        results.append({"candidate": candidate, "file_size": file_size, "segments": seg_count,
+                        "padding": padding, "score": score})
+
+    # the first candidate with the best score wins, the sort keeps the candidate order for ties
+    results.sort(key=lambda x: x['score'])
+    return results
+
+def get_comparison_table(results: list, count=10):
+    '''Returns the best results as a text table'''
+    lines = [f"{'merge':>6} {'tol':>8} {'ignctx':>6} {'maxseg':>8} {'order':>8} "
+             f"{'segs':>6} {'padding':>8} {'size':>10} {'score':>12}"]
+    for result in results[:count]:
+        cand = result['candidate']
+        lines.append(f"{str(cand.segmerge):>6} {cand.tol_limit:>8} {str(cand.ignore_context):>6} "
+                     f"{cand.max_segment_size:>8} {cand.order:>8} {result['segments']:>6} "
+                     f"{result['padding']:>8} {result['file_size']:>10} {result['score']:>12.1f}")
+    return '\n'.join(lines) + '\n'
+
+if __name__ == "__main__":
+    pass
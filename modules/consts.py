@@ -33,5 +33,8 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 '''Module of consts'''
 SSO_CORE_ID = 0xFF
 
+# orders of the segments in the image
+SEGMENT_ORDERS = ('address', 'core')
+
 if __name__ == "__main__":
     pass
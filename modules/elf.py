@@ -32,13 +32,20 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 '''ELF Module'''
 
-import subprocess
-from elftools.elf.elffile import Segment
+import copy
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
 from .elf_structs import elf_header, elf_prog_header
 from .elf_structs import ElfConstants as ELFC, PT_TYPE_DICT
-from .addtranslate import address_translate as xlat
-from .note import get_note_vendor, get_note_segment_map, \
-                get_note_custom, get_note_entrypoints, CustomNote
+from .addtranslate import get_address_translator
+from .note import NoteTypes, NOTE_NAME_VENDOR, NOTE_NAME_SEGMENT_MAP, CustomNote, \
+                encode_note, encode_note_entrypoints, encode_note_shared_segments, get_note_custom_payload
+from .payload import Payload, FileWriter, ObjectWriter
+from .pipeline import StreamWriter
+
+# suffix of the file recording where the segments of an image written with --update come from
+UPDATE_STATE_SUFFIX = '.update'
 
 class ELFHeader():
     '''ELF Header'''
@@ -95,20 +102,25 @@ class ELFProgramHeader():
         self.format = elf_prog_header(self.islittle, self.is64)
         self.header = self.format.parse(bytearray(self.size))
 
-        if isinstance(data, Segment):
+        # data is an ELFFile segment or a mapping of its p_* header fields,
+        # checked by attribute so pyelftools is only imported to parse inputs
+        if hasattr(data, 'section_in_segment'):
+            data = data.header
+
+        if data is not None:
             self.data = data
-            self.header.type = PT_TYPE_DICT[data.header['p_type']]
+            self.header.type = PT_TYPE_DICT[data['p_type']]
             if is64:
-                self.header.flags_64 = data.header['p_flags']
+                self.header.flags_64 = data['p_flags']
             else:
-                self.header.flags_32 = data.header['p_flags']
-
-            self.header.offset = data.header['p_offset']
-            self.header.vaddr  = data.header['p_vaddr']
-            self.header.paddr  = data.header['p_paddr']
-            self.header.filesz = data.header['p_filesz']
-            self.header.memsz  = data.header['p_memsz']
-            self.header.align  = data.header['p_align']
+                self.header.flags_32 = data['p_flags']
+
+            self.header.offset = data['p_offset']
+            self.header.vaddr  = data['p_vaddr']
+            self.header.paddr  = data['p_paddr']
+            self.header.filesz = data['p_filesz']
+            self.header.memsz  = data['p_memsz']
+            self.header.align  = data['p_align']
         else:
             # empty segment header, useful for note segment
             pass
@@ -117,6 +129,12 @@ class ELFProgramHeader():
         '''Function to get the serialized size of header'''
         return self.size
 
+    def copy(self):
+        '''Function to get a copy of the program header which can be modified independently'''
+        phent = copy.copy(self)
+        phent.header = copy.copy(self.header)
+        return phent
+
     def pack(self):
         '''Function to get the serialized data'''
         return self.format.build(self.header)
@@ -126,10 +144,12 @@ class ELF():
     def __init__(self, little_endian=True, is64=False) -> None:
         self.little_endian = little_endian
         self.eh_added = False
-        self.bstream = bytearray()
         self.segmentlist = list()
         self.is64 = is64
         self.elfheader = None
+        self.layout_note_size = 0
+        # layout statistics for the image report
+        self.stats = {"merge_padding": 0, "rs_padding": 0, "xlat_hits": 0, "xlat_passes": 0}
 
     def log_error(self, my_str: str):
         '''Error logging function'''
@@ -145,75 +165,168 @@ class ELF():
         self.elfheader = ELFHeader(elf_fname)
         self.eh_added = True
 
-    def add_segment(self, phent: ELFProgramHeader, segdata = None, context = None):
-        '''Function to add segment to the internal segment list'''
-        self.segmentlist.append({"header": phent, "data": segdata, "context": context})
+    def add_segment(self, phent: ELFProgramHeader, segdata = None, context = None, consumers = None):
+        '''Function to add segment to the internal segment list, consumers are the cores using a shared segment'''
+        seg = {"header": phent, "data": segdata, "context": context}
+        if consumers is not None:
+            seg['consumers'] = tuple(consumers)
+        self.segmentlist.append(seg)
 
-    def add_segment_from_elf(self, segment, max_segment_size, context = 0):
+    def add_segment_from_elf(self, segment, max_segment_size, context = 0, start = 0, size = None):
         '''Function to add segment from ELFFile segment list'''
+        self.add_segment_from_phdr(segment.header, segment.stream, max_segment_size, context=context,
+                                   start=start, size=size)
+
+    def add_segment_from_phdr(self, phdr, stream, max_segment_size, context = 0, start = 0, size = None):
+        '''Function to add segment from its program header fields and the stream of its ELF file'''
+        # start and size select a byte range inside the segment, by default the whole segment
+        if size is None:
+            size = phdr['p_filesz'] - start
+
+        # keep track of where the data comes from instead of reading it, unless
+        # the input is an in-memory ELF
+        fname = getattr(stream, 'name', None)
+        if isinstance(fname, str):
+            segment_data = Payload.from_file(fname, phdr['p_offset'] + start, size)
+        else:
+            stream.seek(phdr['p_offset'] + start)
+            segment_data = Payload.from_bytes(stream.read(size))
 
-        size_left = segment.header['p_filesz']
-        segment_data=bytearray(segment.data())
-
+        size_left = size
         current_seg_count = 0
 
-        while (size_left >= max_segment_size):
-            phent = ELFProgramHeader(segment, little_endian=self.little_endian, is64=self.is64)
-            phent.header.vaddr += current_seg_count * max_segment_size
-            phent.header.paddr += current_seg_count * max_segment_size 
-            phent.header.filesz = max_segment_size
-            phent.header.memsz = max_segment_size
-            if (current_seg_count > 0):
+        while size_left > 0:
+            chunk_size = min(size_left, max_segment_size)
+            chunk_start = current_seg_count * max_segment_size
+            phent = ELFProgramHeader(phdr, little_endian=self.little_endian, is64=self.is64)
+            phent.header.vaddr += start + chunk_start
+            phent.header.paddr += start + chunk_start
+            phent.header.filesz = chunk_size
+            phent.header.memsz = chunk_size
+            if (start + chunk_start) > 0:
                 phent.header.align = 1
             self.add_segment(phent=phent,
-                             segdata=segment_data[current_seg_count * max_segment_size : (current_seg_count + 1) * max_segment_size],
+                             segdata=segment_data.slice(chunk_start, chunk_size),
                              context=context)
-            size_left -= max_segment_size
+            size_left -= chunk_size
             current_seg_count += 1
-        
-        if (size_left > 0):
-            phent = ELFProgramHeader(segment, little_endian=self.little_endian, is64=self.is64)
-            phent.header.vaddr += current_seg_count * max_segment_size
-            phent.header.paddr += current_seg_count * max_segment_size 
-            phent.header.filesz = size_left
-            phent.header.memsz = size_left
-            if (current_seg_count > 0):
-                phent.header.align = 1
-            self.add_segment(phent=phent, 
-                             segdata=segment_data[current_seg_count * max_segment_size : current_seg_count * max_segment_size + size_left],
-                             context=context)
-
 
     def __add_note_segment(self, eplist, custom_note: CustomNote = None):
+        # the notes are encoded straight into the note segment buffer
         note_data = bytearray(0)
 
         # add vendor id note
-        note_data.extend(get_note_vendor(self.little_endian))
+        encode_note(note_data, self.little_endian, NoteTypes.VENDOR_ID.value, NOTE_NAME_VENDOR, b'')
 
         # add segment list note
-        core_list = [int(seg['context']) for seg in self.segmentlist]
-        note_data.extend(get_note_segment_map(self.little_endian, core_list))
+        core_list = bytes(int(seg['context']) for seg in self.segmentlist)
+        encode_note(note_data, self.little_endian, NoteTypes.SEGMENT_MAP.value, NOTE_NAME_SEGMENT_MAP, core_list)
 
-        # add entry point list note
-        note_data.extend(get_note_entrypoints(self.little_endian, self.is64, eplist))
+        # the vendor and segment map notes only change along with the layout
+        self.layout_note_size = len(note_data)
 
-        # add custom note if any
-        if custom_note is not None:
-            note_data.extend(get_note_custom(self.little_endian, custom_note))
+        # add entry point list note
+        encode_note_entrypoints(note_data, self.little_endian, self.is64, eplist)
+
+        # add the addresses of the shared segments for each core using them, if any
+        shared_list = []
+        for seg_index, seg in enumerate(self.segmentlist):
+            for core_id, addr in seg.get('shared_addrs', []):
+                shared_list.append((seg_index, core_id, addr))
+        if len(shared_list) > 0:
+            encode_note_shared_segments(note_data, self.little_endian, self.is64, shared_list)
+
+        # add custom notes if any, their data is streamed from its source when the image is written
+        if isinstance(custom_note, CustomNote):
+            custom_note = [custom_note]
+        note_payload = Payload.from_bytes(note_data)
+        for note in custom_note or []:
+            note_payload.extend(get_note_custom_payload(self.little_endian, note))
 
         r_seg = ELFProgramHeader(None, little_endian=self.little_endian, is64=self.is64)
         r_seg.header.type = PT_TYPE_DICT['PT_NOTE']
         r_seg.header.vaddr = 0
         r_seg.header.paddr = 0
-        r_seg.header.filesz = len(note_data)
-        r_seg.header.memsz = len(note_data)
+        r_seg.header.filesz = len(note_payload)
+        r_seg.header.memsz = len(note_payload)
 
-        seg_dict = {"header": r_seg, "data": note_data, "context": None}
+        seg_dict = {"header": r_seg, "data": note_payload, "context": None}
 
         self.segmentlist.insert(0, seg_dict)
 
         return len(seg_dict["data"])
 
+    def __slice_segment(self, seg, start, size):
+        '''Returns a copy of the bytes [start, start + size) of a segment'''
+        phent = seg['header'].copy()
+        phent.header.vaddr += start
+        phent.header.paddr += start
+        phent.header.filesz = size
+        phent.header.memsz = size
+        if start > 0:
+            phent.header.align = 1
+        piece = dict(seg)
+        piece['header'] = phent
+        piece['data'] = seg['data'].slice(start, size)
+        return piece
+
+    def __translate_segment(self, seg, cores, translator):
+        '''Translates the addresses of a segment which is inside a single region of each core using it'''
+        header = seg['header'].header
+        # the addresses in the view of each core using the segment, for the overlap check
+        seg['local_ranges'] = [(core_id, header.vaddr, header.filesz) for core_id in cores]
+        if 'consumers' in seg:
+            # a shared segment is stored once and loaded to its address in the view of each
+            # core using it, the PHT has the address of the first one
+            seg['shared_addrs'] = []
+            for core_id in cores:
+                addr = header.vaddr
+                if translator is not None:
+                    addr, _ = translator.translate(core_id, addr)
+                seg['shared_addrs'].append((core_id, addr))
+        if translator is None:
+            return
+
+        header.vaddr, hit = translator.translate(cores[0], header.vaddr)
+        header.paddr, _ = translator.translate(cores[0], header.paddr)
+        if hit:
+            self.stats['xlat_hits'] += 1
+        else:
+            self.stats['xlat_passes'] += 1
+
+    def translate_segments(self, xlat_file_path):
+        '''Translates the segments to SoC addresses, splitting the segments crossing a region boundary
+
+        Segments translated before are kept as they are, so the segments can be translated
+        before merging them in SoC address space.
+        '''
+        translator = None
+        if xlat_file_path is not None:
+            translator = get_address_translator(xlat_file_path)
+
+        translated_list = []
+        for seg in self.segmentlist:
+            if 'local_ranges' in seg:
+                translated_list.append(seg)
+                continue
+
+            header = seg['header'].header
+            cores = seg.get('consumers', (int(seg['context']),))
+            offsets = {0}
+            if translator is not None:
+                for core_id in cores:
+                    offsets.update(translator.get_boundaries(core_id, header.vaddr, header.filesz))
+            offsets = sorted(offsets) + [header.filesz]
+
+            for start, end in zip(offsets, offsets[1:]):
+                piece = seg
+                if len(offsets) > 2:
+                    piece = self.__slice_segment(seg, start, end - start)
+                self.__translate_segment(piece, cores, translator)
+                translated_list.append(piece)
+
+        self.segmentlist = translated_list
+
     def __merge_two_segments(self, merger, mergee):
         if merger is None:
             return None
@@ -227,7 +340,8 @@ class ELF():
         padding = start-end
 
         # add zero padding
-        merger['data'].extend(bytearray(padding))
+        merger['data'].extend_zeros(padding)
+        self.stats['merge_padding'] += padding
 
         # now merge the data of mergee
         merger['data'].extend(mergee['data'])
@@ -237,6 +351,8 @@ class ELF():
         orig_size = merger['header'].header.filesz
         merger['header'].header.filesz = orig_size + padding + mergee['header'].header.filesz
         merger['header'].header.memsz = merger['header'].header.filesz
+        if 'local_ranges' in merger:
+            merger['local_ranges'] = merger['local_ranges'] + mergee['local_ranges']
 
         return merger
 
@@ -246,13 +362,23 @@ class ELF():
 
         end = merger['header'].header.vaddr + merger['header'].header.filesz
         start = mergee['header'].header.vaddr
-        addr_check = bool(((start - end) <= tol_limit) and (start != merger['header'].header.vaddr))
+        addr_check = bool((0 <= (start - end) <= tol_limit) and (start != merger['header'].header.vaddr))
 
         if ignore_context:
             context_check = True
         else:
             context_check = bool(mergee['context'] == merger['context'])
 
+        # shared segments only merge with the segments shared by the same cores, even ignoring the context
+        if merger.get('consumers') != mergee.get('consumers'):
+            context_check = False
+        elif merger.get('shared_addrs') is not None:
+            # and only if they are next to each other in the view of each of these cores too
+            offset = start - merger['header'].header.vaddr
+            for (_, merger_addr), (_, mergee_addr) in zip(merger['shared_addrs'], mergee['shared_addrs']):
+                if mergee_addr - merger_addr != offset:
+                    context_check = False
+
         return bool(addr_check and context_check)
 
     def __get_merged_list(self, in_list, tol_limit, ignore_context):
@@ -282,10 +408,13 @@ class ELF():
 
         return out_list
 
-    def merge_segments(self, tol_limit=0, segmerge=False, ignore_context=False):
+    def merge_segments(self, tol_limit=0, segmerge=False, ignore_context=False, order='address'):
         '''Runs the merge operation on the internal list of segments'''
-        # sort the segments
-        sorted_list = sorted(self.segmentlist, key = lambda x:x['header'].header.vaddr)
+        # sort the segments by address, or by core and then address
+        if order == 'core':
+            sorted_list = sorted(self.segmentlist, key = lambda x:(int(x['context']), x['header'].header.vaddr))
+        else:
+            sorted_list = sorted(self.segmentlist, key = lambda x:x['header'].header.vaddr)
         merged_list = self.get_merged_list(sorted_list,
                                         segmerge=segmerge,
                                         tol_limit=tol_limit,
@@ -316,10 +445,109 @@ class ELF():
         self.elfheader.header.e_shoff = 0
         self.elfheader.header.e_shnum = 0
         self.elfheader.header.e_shstrndx = 0
-        self.bstream.extend(self.elfheader.pack())
 
         return self.elfheader
 
+    def __get_file_size(self):
+        filesize = self.elfheader.get_size()
+        for seg in self.segmentlist:
+            filesize += seg['header'].get_size() + len(seg['data'])
+
+        return filesize
+
+    def __write_elf(self, file_p):
+        # ELF header, then the PHT and then the data of each segment
+        file_p.write(self.elfheader.pack())
+
+        for seg in self.segmentlist:
+            file_p.write(seg['header'].pack())
+
+        for seg in self.segmentlist:
+            file_p.write(seg['data'])
+
+    def __rewrite_changed_blocks(self, fd, file_p, seg):
+        '''Rewrites the blocks of a segment whose contents differ from the existing image'''
+        offset = seg['header'].header.offset
+        for block in seg['data'].iter_blocks():
+            if os.pread(fd, len(block), offset) != block:
+                file_p.seek(offset)
+                file_p.write(block)
+            offset += len(block)
+
+    def __get_segment_keys(self):
+        '''Returns the provenance key of each loadable segment, None for the note segments'''
+        stats = {}
+        return [None if seg['context'] is None else seg['data'].get_provenance_key(stats)
+                for seg in self.segmentlist]
+
+    def __get_image_key(self, f_stat):
+        '''Returns the key of an image file, which changes whenever the file is written'''
+        return [f_stat.st_dev, f_stat.st_ino, f_stat.st_size, f_stat.st_mtime_ns, f_stat.st_ctime_ns]
+
+    def __read_update_state(self, fname, f_stat):
+        '''Returns the segment keys recorded when the image was last written, None if it changed since'''
+        try:
+            with open(f"{fname}{UPDATE_STATE_SUFFIX}", 'r', encoding='utf-8') as file:
+                state = json.load(file)
+        except (OSError, ValueError):
+            return None
+        if not isinstance(state, dict) or state.get('image') != self.__get_image_key(f_stat):
+            return None
+        segments = state.get('segments')
+        if not isinstance(segments, list) or len(segments) != len(self.segmentlist):
+            return None
+        return segments
+
+    def __write_update_state(self, fname, seg_keys):
+        '''Records the keys of the segments of the image just written, for the next update'''
+        state = {"image": self.__get_image_key(os.stat(fname)), "segments": seg_keys}
+        with open(f"{fname}{UPDATE_STATE_SUFFIX}", 'w', encoding='utf-8') as file:
+            json.dump(state, file)
+
+    def __update_in_place(self, fname, seg_keys):
+        '''Rewrites the changed parts of an existing image with the same layout, returns False if the layout differs'''
+        try:
+            fd = os.open(fname, os.O_RDONLY)
+        except OSError:
+            return False
+
+        try:
+            f_stat = os.fstat(fd)
+            if f_stat.st_size != self.__get_file_size():
+                return False
+
+            # the ELF header, PHT, vendor and segment map notes must match
+            headers = bytearray(self.elfheader.pack())
+            for seg in self.segmentlist:
+                headers.extend(seg['header'].pack())
+            if os.pread(fd, len(headers), 0) != headers:
+                return False
+
+            note_seg = self.segmentlist[0]
+            layout_notes = note_seg['data'].slice(0, self.layout_note_size).read()
+            if os.pread(fd, len(layout_notes), note_seg['header'].header.offset) != layout_notes:
+                return False
+
+            # segments coming from the same input ranges as when the image was last written
+            # are skipped without reading them, the others are compared block by block. The
+            # contents are compared rather than the input modification times, which can be
+            # older than the image for changed inputs restored from an archive or a cache
+            last_keys = self.__read_update_state(fname, f_stat)
+            with FileWriter(fname, truncate=False) as file_p:
+                # padding must overwrite whatever is in the existing file
+                file_p.use_holes = False
+                for index, seg in enumerate(self.segmentlist):
+                    if seg['context'] is None:
+                        # note segments carry the entry points and the random string
+                        file_p.seek(seg['header'].header.offset)
+                        file_p.write(seg['data'])
+                    elif last_keys is None or last_keys[index] != seg_keys[index]:
+                        self.__rewrite_changed_blocks(fd, file_p, seg)
+        finally:
+            os.close(fd)
+
+        return True
+
     def dbg_dumpsegments(self):
         '''Debug function to dump the segments of the ELF Object'''
         for seg in self.segmentlist:
@@ -328,13 +556,14 @@ class ELF():
     def  __add_rs_note_segment(self, filesize, custom_note_seg_len):
         ''' Add RS note segment to the end of the created elf file '''
         
-        random_string = subprocess.check_output('openssl rand 32', shell=True)
+        random_string = os.urandom(32)
         
         # Ensure that the program segments are a multiple of 16 bytes
         # for AES CBC encryption by padding with zeros,
         # 52 is the ELF Header size (which always holds true).
         # The size of each PHT entry is 32 bytes in case of ELF32 and 64 in case of ELF64.
         zeros_pad = bytearray(16 - ((filesize - 52 - custom_note_seg_len) % 16))
+        self.stats['rs_padding'] = len(zeros_pad)
 
         phent = ELFProgramHeader(None, little_endian=self.little_endian, is64=self.is64)
         phent.header.type = PT_TYPE_DICT['PT_NOTE']
@@ -343,25 +572,19 @@ class ELF():
         phent.header.filesz = len (zeros_pad + random_string)
         phent.header.memsz = len (zeros_pad + random_string)
 
-        seg_dict = {"header": phent, "data": zeros_pad + random_string, "context": None}
+        seg_dict = {"header": phent, "data": Payload.from_bytes(zeros_pad + random_string), "context": None}
 
         self.segmentlist.append(seg_dict)
        
-    def make_elf(self, fname, xlat_file_path, eplist, custom_note: CustomNote = None, add_rs_note = False):
-        '''Create the elf file and write it to the filename provided'''
+    def layout_elf(self, xlat_file_path, eplist, custom_note: CustomNote = None, add_rs_note = False):
+        '''Translate the addresses, add the note segments and lay out the PHT and ELF header'''
         # check if elf header is added
         if not self.eh_added:
             self.log_error("ELF Header not added")
             return -1
 
-        # do address translation if required
-        if xlat_file_path is not None:
-            for seg in self.segmentlist:
-                seg['header'].header.vaddr = xlat(xlat_file_path=xlat_file_path,
-                coreid=int(seg['context']), addr=seg['header'].header.vaddr)
-
-                seg['header'].header.paddr = xlat(xlat_file_path=xlat_file_path,
-                coreid=int(seg['context']), addr=seg['header'].header.paddr)
+        # translate the segments which were not translated before merging
+        self.translate_segments(xlat_file_path)
 
         # add note segments
         cust_note_segment_length = self.__add_note_segment(eplist, custom_note)
@@ -369,51 +592,83 @@ class ELF():
         # generate PHT
         self.__generate_pht()
 
-        # update and add elf header
-        self.__update_elfh()
-
-        # this stream will represent the final binary with RS note segment
-        final_stream = bytearray()
-
-        # now add PHT
-        for seg in self.segmentlist:
-            self.bstream.extend(seg['header'].pack())
-
-        # now add the data
-        for seg in self.segmentlist:
-            self.bstream.extend(seg['data'])
-
         # if addition of random string note segment is required
         if add_rs_note:
-            # add rs segment to the end of the segment list    
-            self.__add_rs_note_segment(len(self.bstream), cust_note_segment_length)
-            
+            # add rs segment to the end of the segment list
+            self.__add_rs_note_segment(self.__get_file_size(), cust_note_segment_length)
+
             # generate the modified pht
             self.__generate_pht()
-            
-            # get the updated ELF header
-            updated_elfh = self.__update_elfh()
-            if (updated_elfh):
-                final_stream.extend(updated_elfh.pack())
 
-            # now add PHT
-            for seg in self.segmentlist:
-                final_stream.extend(seg['header'].pack())
+        # update the elf header
+        self.__update_elfh()
 
-            # now add the data
-            for seg in self.segmentlist:
-                final_stream.extend(seg['data'])
+        return 0
 
-            # the end, now write this to a file
-            with open(fname, 'wb+') as file_p:
-                file_p.write(final_stream)
-                
+    def write_elf(self, fname, pipeline_depth = 0, update = False, transforms = None, transform_jobs = None):
+        '''Write the laid out elf file to the filename or writable binary file object provided'''
+        if not transforms:
+            return self.__write_image(fname, pipeline_depth, update)
+
+        # per segment post-processing of the final layout for the report, it only reads the
+        # payloads so it runs alongside the writing, the results are joined before returning
+        with ThreadPoolExecutor(max_workers=1) as executor:
+            future = executor.submit(self.transform_segments, transforms, jobs=transform_jobs)
+            ret = self.__write_image(fname, pipeline_depth, update)
+            future.result()
+        return ret
+
+    def __write_image(self, fname, pipeline_depth, update):
+        '''Writes the image to the filename or file object, in place if updating'''
+        if not isinstance(fname, (str, os.PathLike)):
+            # the image is written in order, so the object doesn't have to be seekable
+            with ObjectWriter(fname) as file_p:
+                self.__write_elf(file_p)
+            return 0
+
+        if not update:
+            # the recorded segments of an image written before no longer apply
+            if os.path.exists(f"{fname}{UPDATE_STATE_SUFFIX}"):
+                os.remove(f"{fname}{UPDATE_STATE_SUFFIX}")
+        else:
+            # only rewrite the changed segments if the existing image has the same layout
+            seg_keys = self.__get_segment_keys()
+            if self.__update_in_place(fname, seg_keys):
+                self.__write_update_state(fname, seg_keys)
+                return 0
+
+        # the end, now write this to a file
+        if pipeline_depth > 0:
+            with StreamWriter(fname, depth=pipeline_depth) as file_p:
+                self.__write_elf(file_p)
         else:
-            # the end, now write this to a file
-            with open(fname, 'wb+') as file_p:
-                file_p.write(self.bstream)
+            with FileWriter(fname) as file_p:
+                self.__write_elf(file_p)
+
+        if update:
+            self.__write_update_state(fname, seg_keys)
 
         return 0
 
+    def make_elf(self, fname, xlat_file_path, eplist, custom_note: CustomNote = None, add_rs_note = False,
+                 pipeline_depth = 0, update = False, transforms = None, transform_jobs = None):
+        '''Create the elf file and write it to the filename provided'''
+        if self.layout_elf(xlat_file_path, eplist, custom_note=custom_note, add_rs_note=add_rs_note) != 0:
+            return -1
+
+        return self.write_elf(fname, pipeline_depth=pipeline_depth, update=update, transforms=transforms,
+                              transform_jobs=transform_jobs)
+
+    def get_load_segments(self):
+        '''Returns the loadable segments, leaving out the note segments'''
+        return [seg for seg in self.segmentlist if seg['context'] is not None]
+
+    def transform_segments(self, transforms, jobs=None):
+        '''Runs the transforms on the payloads of the loadable segments, the results are kept in each segment'''
+        from .transform import run_transforms
+        load_segs = self.get_load_segments()
+        for seg, result in zip(load_segs, run_transforms(load_segs, transforms, jobs=jobs)):
+            seg['transforms'] = result
+
 if __name__ == "__main__":
     pass
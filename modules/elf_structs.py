@@ -32,9 +32,9 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 '''Basic module defining ELF structures and constants'''
 
+import struct
 from enum import Enum
-from construct import Struct, Int16ul, Int16ub, \
-Int32ul, Int32ub, Int64ul, Int64ub, Bytes, IfThenElse, If
+from functools import lru_cache
 
 class ElfConstants(Enum):
     '''ENUM Class for certain ELF constants'''
@@ -64,50 +64,77 @@ PT_TYPE_DICT = {
     'PT_HIPROC':	0x7fffff
 }
 
-def __elf_header(elf_int16, elf_int32, elf_int64, is_64):
-    entry_off = IfThenElse(is_64, elf_int64, elf_int32)
-    return Struct(
-        "e_ident"       / Bytes(16),
-        "e_type"        / elf_int16,
-        "e_machine"     / elf_int16,
-        "e_version"     / elf_int32,
-        "e_entry"       / entry_off,
-        "e_phoff"       / entry_off,
-        "e_shoff"       / entry_off,
-        "e_flags"       / elf_int32,
-        "e_ehsize"      / elf_int16,
-        "e_phentsize"   / elf_int16,
-        "e_phnum"       / elf_int16,
-        "e_shentsize"   / elf_int16,
-        "e_shnum"       / elf_int16,
-        "e_shstrndx"    / elf_int16,
-        )
+class StructContainer(dict):
+    '''Parsed structure, the fields can also be read and set as attributes'''
+    def __getattr__(self, name):
+        try:
+            return self[name]
+        except KeyError:
+            raise AttributeError(name) from None
 
+    def __setattr__(self, name, value):
+        self[name] = value
+
+class StructFormat():
+    '''Structure of named fields packed with a precompiled struct format'''
+    def __init__(self, byte_order, fields):
+        # fields are (name, format character), fields without format are absent and parse as None
+        self.fields = [name for name, _ in fields]
+        self.names = [name for name, fmt in fields if fmt is not None]
+        self.format = struct.Struct(byte_order + ''.join(fmt for _, fmt in fields if fmt is not None))
+
+    def sizeof(self):
+        '''Function to get the serialized size'''
+        return self.format.size
+
+    def parse(self, data):
+        '''Function to parse the structure from the first bytes of data'''
+        values = dict(zip(self.names, self.format.unpack_from(data)))
+        return StructContainer((name, values.get(name)) for name in self.fields)
+
+    def build(self, container):
+        '''Function to serialize the structure'''
+        return self.format.pack(*(container[name] for name in self.names))
+
+def __byte_order(is_le):
+    return '<' if is_le else '>'
+
+@lru_cache(maxsize=None)
 def elf_header(is_le=True, is_64=False):
     '''ELF header structure'''
-    if is_le:
-        return __elf_header(Int16ul, Int32ul, Int64ul, is_64=is_64)
-    return __elf_header(Int16ub, Int32ub, Int64ub, is_64=is_64)
-
-def __elf_prog_header(elf_int32, elf_int64, is_64):
-    elf_addr = IfThenElse(is_64, elf_int64, elf_int32)
-    return Struct(
-        "type"      / elf_int32,
-        "flags_64"  / If(is_64, elf_int32),
-        "offset"    / elf_addr,
-        "vaddr"     / elf_addr,
-        "paddr"     / elf_addr,
-        "filesz"    / elf_addr,
-        "memsz"     / elf_addr,
-        "flags_32"  / If((not is_64), elf_int32),
-        "align"     / elf_addr,
-    )
+    entry_off = 'Q' if is_64 else 'I'
+    return StructFormat(__byte_order(is_le), [
+        ("e_ident",     '16s'),
+        ("e_type",      'H'),
+        ("e_machine",   'H'),
+        ("e_version",   'I'),
+        ("e_entry",     entry_off),
+        ("e_phoff",     entry_off),
+        ("e_shoff",     entry_off),
+        ("e_flags",     'I'),
+        ("e_ehsize",    'H'),
+        ("e_phentsize", 'H'),
+        ("e_phnum",     'H'),
+        ("e_shentsize", 'H'),
+        ("e_shnum",     'H'),
+        ("e_shstrndx",  'H'),
+        ])
 
+@lru_cache(maxsize=None)
 def elf_prog_header(is_le=True, is_64=False):
     '''Program header structure'''
-    if is_le:
-        return __elf_prog_header(Int32ul, Int64ul, is_64=is_64)
-    return __elf_prog_header(Int32ub, Int64ub, is_64=is_64)
+    elf_addr = 'Q' if is_64 else 'I'
+    return StructFormat(__byte_order(is_le), [
+        ("type",        'I'),
+        ("flags_64",    'I' if is_64 else None),
+        ("offset",      elf_addr),
+        ("vaddr",       elf_addr),
+        ("paddr",       elf_addr),
+        ("filesz",      elf_addr),
+        ("memsz",       elf_addr),
+        ("flags_32",    None if is_64 else 'I'),
+        ("align",       elf_addr),
+        ])
 
 if __name__ == "__main__":
     pass
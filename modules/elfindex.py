@@ -0,0 +1,102 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Module with the persistent index of parsed input ELFs'''
+
+import hashlib
+import json
+import os
+import tempfile
+
+# bump when the layout of the index entries changes
+ELF_INDEX_VERSION = 1
+
+class ElfIndex():
+    '''Persistent index of parsed input ELFs kept in a cache directory
+
+    An entry holds the ELF class, the entry point and the PT_LOAD table of an
+    input ELF along with the section ranges of each PT_LOAD. It is keyed by the
+    real path, size, modification time and inode of the file, so an entry is
+    only used while the file is unchanged.
+    '''
+    def __init__(self, cache_dir) -> None:
+        self.cache_dir = cache_dir
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def get_key(self, fname, f_stat=None):
+        '''Returns the key of an ELF file, from its stat taken before it was read if given'''
+        if f_stat is None:
+            f_stat = os.stat(fname)
+        return [ELF_INDEX_VERSION, os.path.realpath(fname), f_stat.st_size,
+                f_stat.st_mtime_ns, f_stat.st_ino]
+
+    def __get_entry_path(self, fname):
+        name = hashlib.sha1(os.path.realpath(fname).encode('utf-8')).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}.json")
+
+    def lookup(self, fname, key=None):
+        '''Returns the indexed info of an ELF file, None if it isn't indexed or has changed'''
+        try:
+            with open(self.__get_entry_path(fname), 'r', encoding='utf-8') as file:
+                entry = json.load(file)
+        except (OSError, ValueError):
+            return None
+
+        if key is None:
+            key = self.get_key(fname)
+        if entry.get('key') != key:
+            return None
+
+        return entry.get('info')
+
+    def store(self, fname, info: dict, key=None):
+        '''Adds the info of an ELF file to the index, replacing any older entry
+
+        key must be taken before the file is parsed, so that a file rewritten while
+        it is parsed is not stored with the info of its older contents.
+        '''
+        if key is None:
+            key = self.get_key(fname)
+        entry = {"key": key, "info": info}
+        # write to a temporary file first, parallel builds may share the index
+        fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as file:
+                json.dump(entry, file)
+            os.replace(tmp_path, self.__get_entry_path(fname))
+        except OSError:
+            # the index is only a cache, carry on without it
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+if __name__ == "__main__":
+    pass
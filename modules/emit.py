@@ -0,0 +1,198 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Module with the emitters writing other output formats from a laid out image'''
+
+from abc import ABC, abstractmethod
+from .payload import COPY_BLOCK_SIZE
+
+# erased flash reads as all ones
+RAW_FILL_BYTE = 0xFF
+
+# bytes of data in each Intel HEX and S-record line
+RECORD_DATA_SIZE = 32
+
+# Intel HEX and S-records with 32 bit addresses cover the first 4 GB
+RECORD_ADDR_LIMIT = 0x100000000
+
+class Emitter(ABC):
+    '''Base class of the output format emitters'''
+    def __init__(self, fname) -> None:
+        self.fname = fname
+
+    def check(self, elf_obj):
+        '''Raises ValueError if a laid out ELF object can't be written in this format'''
+
+    @abstractmethod
+    def emit(self, elf_obj):
+        '''Writes the loadable segments of a laid out ELF object to the output file'''
+
+    def get_segments(self, elf_obj):
+        '''Returns the loadable segments sorted by their load address'''
+        return sorted(elf_obj.get_load_segments(), key=lambda x: x['header'].header.paddr)
+
+    def check_addr_limit(self, elf_obj, format_name):
+        '''Raises ValueError if a segment is out of the 32 bit address range of the records'''
+        for seg in elf_obj.get_load_segments():
+            addr = seg['header'].header.paddr
+            if addr + seg['header'].header.filesz > RECORD_ADDR_LIMIT:
+                raise ValueError(f"Segment at {hex(addr)} is out of the {format_name} address range")
+
+class RawImageEmitter(Emitter):
+    '''Emits a raw flash image of an address range, holes filled with RAW_FILL_BYTE'''
+    def __init__(self, fname, addr_range, fill=RAW_FILL_BYTE) -> None:
+        super().__init__(fname)
+        self.addr_range = addr_range
+        self.fill = fill
+
+    def __write_fill(self, file_p, length):
+        fill_block = bytes([self.fill]) * min(length, COPY_BLOCK_SIZE)
+        while length > 0:
+            count = min(length, len(fill_block))
+            file_p.write(fill_block[:count])
+            length -= count
+
+    def __get_start(self, elf_obj):
+        '''Returns the load address the raw image starts at
+
+        The range is in the CPU local addresses the segments were routed with. The image
+        starts where the range starts in the view of the core of a segment, at the lowest
+        such address if the cores see the range at different load addresses.
+        '''
+        image_start = None
+        pos = None
+        for seg in self.get_segments(elf_obj):
+            header = seg['header'].header
+            local_ranges = seg.get('local_ranges', [(int(seg['context']), header.vaddr, header.filesz)])
+            for core_id, local_vaddr, size in local_ranges:
+                if local_vaddr < self.addr_range.start or local_vaddr + size > self.addr_range.end:
+                    raise ValueError(f"Segment at {hex(local_vaddr)} of core {core_id} is not inside the raw "
+                                     f"image range {hex(self.addr_range.start)}:{hex(self.addr_range.end)}")
+            if pos is not None and header.paddr < pos:
+                raise ValueError(f"Segment at {hex(header.paddr)} overlaps the previous one in the raw image")
+            pos = header.paddr + header.filesz
+
+            seg_start = header.paddr - (local_ranges[0][1] - self.addr_range.start)
+            if image_start is None or seg_start < image_start:
+                image_start = seg_start
+        return image_start
+
+    def check(self, elf_obj):
+        self.__get_start(elf_obj)
+
+    def emit(self, elf_obj):
+        pos = self.__get_start(elf_obj)
+        with open(self.fname, 'wb') as file_p:
+            for seg in self.get_segments(elf_obj):
+                start = seg['header'].header.paddr
+                self.__write_fill(file_p, start - pos)
+                for block in seg['data'].iter_blocks():
+                    file_p.write(block)
+                pos = start + seg['header'].header.filesz
+        return 0
+
+class IntelHexEmitter(Emitter):
+    '''Emits the loadable segments as Intel HEX records'''
+    def __record(self, rtype, addr, data=b''):
+        rec = bytes([len(data), (addr >> 8) & 0xFF, addr & 0xFF, rtype]) + bytes(data)
+        checksum = (-sum(rec)) & 0xFF
+        return f":{rec.hex().upper()}{checksum:02X}\n"
+
+    def check(self, elf_obj):
+        self.check_addr_limit(elf_obj, 'Intel HEX')
+
+    def emit(self, elf_obj):
+        self.check(elf_obj)
+        upper = None
+        with open(self.fname, 'w', encoding='ascii') as file_p:
+            for seg in self.get_segments(elf_obj):
+                addr = seg['header'].header.paddr
+                for block in seg['data'].iter_blocks():
+                    lines = []
+                    pos = 0
+                    while pos < len(block):
+                        # records can't cross a 64 KB boundary of the extended linear address
+                        count = min(RECORD_DATA_SIZE, len(block) - pos, 0x10000 - (addr & 0xFFFF))
+                        if (addr >> 16) != upper:
+                            upper = addr >> 16
+                            lines.append(self.__record(0x04, 0, upper.to_bytes(2, 'big')))
+                        lines.append(self.__record(0x00, addr & 0xFFFF, block[pos:pos + count]))
+                        addr += count
+                        pos += count
+                    file_p.write(''.join(lines))
+            # the start linear address is the entry point, like the S7 record of the S-records
+            entry = elf_obj.elfheader.header.e_entry & 0xFFFFFFFF
+            file_p.write(self.__record(0x05, 0, entry.to_bytes(4, 'big')))
+            file_p.write(self.__record(0x01, 0))
+        return 0
+
+class SRecordEmitter(Emitter):
+    '''Emits the loadable segments as Motorola S-records with 32 bit addresses'''
+    def __record(self, rtype, addr, data=b''):
+        rec = bytes([len(data) + 5]) + addr.to_bytes(4, 'big') + bytes(data)
+        checksum = (~sum(rec)) & 0xFF
+        return f"S{rtype}{rec.hex().upper()}{checksum:02X}\n"
+
+    def check(self, elf_obj):
+        self.check_addr_limit(elf_obj, 'S-record')
+
+    def emit(self, elf_obj):
+        self.check(elf_obj)
+        with open(self.fname, 'w', encoding='ascii') as file_p:
+            header = bytes([0, 0]) + self.fname.encode('ascii', 'replace')[:32]
+            checksum = (~sum(bytes([len(header) + 1]) + header)) & 0xFF
+            file_p.write(f"S0{len(header) + 1:02X}{header.hex().upper()}{checksum:02X}\n")
+            for seg in self.get_segments(elf_obj):
+                addr = seg['header'].header.paddr
+                for block in seg['data'].iter_blocks():
+                    lines = []
+                    for pos in range(0, len(block), RECORD_DATA_SIZE):
+                        lines.append(self.__record(3, addr + pos, block[pos:pos + RECORD_DATA_SIZE]))
+                    file_p.write(''.join(lines))
+                    addr += len(block)
+            file_p.write(self.__record(7, elf_obj.elfheader.header.e_entry & 0xFFFFFFFF))
+        return 0
+
+EMITTERS = {
+    'raw': RawImageEmitter,
+    'ihex': IntelHexEmitter,
+    'srec': SRecordEmitter,
+}
+
+EMITTER_SUFFIXES = {
+    'raw': '.bin',
+    'ihex': '.hex',
+    'srec': '.srec',
+}
+
+if __name__ == "__main__":
+    pass
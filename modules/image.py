@@ -0,0 +1,109 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Module to read back a generated multicore ELF image'''
+
+import mmap
+from .elf import ELFHeader
+from .elf_structs import elf_prog_header, ElfConstants as ELFC, PT_TYPE_DICT
+from .note import NoteTypes, parse_notes, parse_entrypoints, parse_shared_segments
+
+class MultiCoreELFImage():
+    '''Generated multicore ELF image, memory mapped for reading'''
+    def __init__(self, fname) -> None:
+        self.fname = fname
+        with open(fname, 'rb') as f_ptr:
+            self.mmap = mmap.mmap(f_ptr.fileno(), 0, access=mmap.ACCESS_READ)
+
+        class_idx = ELFC.ELFCLASS_IDX.value
+        self.is64 = bool(self.mmap[class_idx] == ELFC.ELFCLASS64.value)
+        self.islittle = bool(self.mmap[ELFC.ELFDATA_IDX.value] == ELFC.ELFLE.value)
+        if self.is64:
+            eh_size = ELFC.ELF64_SIZE.value
+            ph_size = ELFC.ELFPH64_SIZE.value
+        else:
+            eh_size = ELFC.ELF32_SIZE.value
+            ph_size = ELFC.ELFPH32_SIZE.value
+
+        self.ph_size = ph_size
+        self.elfheader = ELFHeader(bytearray(self.mmap[:eh_size]), little_endian=self.islittle)
+        ph_format = elf_prog_header(self.islittle, self.is64)
+
+        self.segments = []
+        phoff = self.elfheader.header.e_phoff
+        for index in range(self.elfheader.header.e_phnum):
+            start = phoff + index * ph_size
+            phent = ph_format.parse(self.mmap[start:start + ph_size])
+            self.segments.append({"index": index, "type": phent.type, "offset": phent.offset,
+                                  "vaddr": phent.vaddr, "paddr": phent.paddr, "filesz": phent.filesz,
+                                  "memsz": phent.memsz, "align": phent.align, "core": None, "shared": []})
+
+        # the first note segment holds the vendor, segment map and entry point notes
+        self.notes = []
+        self.entry_points = {}
+        note_segs = [seg for seg in self.segments if seg['type'] == PT_TYPE_DICT['PT_NOTE']]
+        if len(note_segs) > 0:
+            self.notes = parse_notes(self.islittle, self.data(note_segs[0]))
+
+        for ntype, _, desc in self.notes:
+            if ntype == NoteTypes.SEGMENT_MAP.value:
+                for seg, core_id in zip(self.get_load_segments(), desc):
+                    seg['core'] = core_id
+            elif ntype == NoteTypes.ENTRY_POINTS.value:
+                self.entry_points = parse_entrypoints(self.islittle, self.is64, desc)
+            elif ntype == NoteTypes.SHARED_SEGMENTS.value:
+                # (core, address) of each core using a shared segment
+                load_segs = self.get_load_segments()
+                for seg_index, core_id, addr in parse_shared_segments(self.islittle, self.is64, desc):
+                    if seg_index < len(load_segs):
+                        load_segs[seg_index]['shared'].append((core_id, addr))
+
+    def get_load_segments(self):
+        '''Returns the loadable segments in PHT order'''
+        return [seg for seg in self.segments if seg['type'] == PT_TYPE_DICT['PT_LOAD']]
+
+    def data(self, seg):
+        '''Returns a memoryview of the file data of a segment'''
+        return memoryview(self.mmap)[seg['offset']:seg['offset'] + seg['filesz']]
+
+    def close(self):
+        '''Unmaps the image'''
+        self.mmap.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+if __name__ == "__main__":
+    pass
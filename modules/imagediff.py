@@ -0,0 +1,192 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Module to compare two multicore ELF images segment by segment'''
+
+import hashlib
+import os
+from concurrent.futures import ThreadPoolExecutor
+from .image import MultiCoreELFImage
+from .note import NoteTypes
+
+# granularity of the changed bytes of a segment, close to the flash erase and OTA block sizes
+DIFF_BLOCK_SIZE = 4096
+
+# ELF header fields compared between the images
+HEADER_FIELDS = ('e_type', 'e_machine', 'e_version', 'e_entry', 'e_flags')
+
+def get_segment_hash(image: MultiCoreELFImage, seg):
+    '''Returns the digest of the data of a segment, read from the mapping without copying it'''
+    # hashlib releases the GIL on large buffers, so the segments are hashed in parallel
+    with image.data(seg) as view:
+        return hashlib.blake2b(view, digest_size=16).hexdigest()
+
+def get_changed_blocks(old_image: MultiCoreELFImage, old_seg, new_image: MultiCoreELFImage, new_seg,
+                       block_size=DIFF_BLOCK_SIZE):
+    '''Returns the number of blocks which differ between two segments of the same size'''
+    # slices of the mappings are compared with memcmp, much faster than memoryview comparisons
+    changed = 0
+    size = old_seg['filesz']
+    for start in range(0, size, block_size):
+        length = min(block_size, size - start)
+        old_pos = old_seg['offset'] + start
+        new_pos = new_seg['offset'] + start
+        if old_image.mmap[old_pos:old_pos + length] != new_image.mmap[new_pos:new_pos + length]:
+            changed += 1
+    return changed
+
+def get_keyed_segments(image: MultiCoreELFImage):
+    '''Returns the loadable segments of an image keyed by (core, vaddr, occurrence)'''
+    keyed = {}
+    for seg in image.get_load_segments():
+        # the occurrence keeps segments at the same address apart, they can only
+        # come from different cores in images without a segment map
+        occurrence = 0
+        while (seg['core'], seg['vaddr'], occurrence) in keyed:
+            occurrence += 1
+        keyed[(seg['core'], seg['vaddr'], occurrence)] = seg
+    return keyed
+
+def get_note_diff(old_image: MultiCoreELFImage, new_image: MultiCoreELFImage):
+    '''Returns the differences of the notes other than the segment map, which the segments cover'''
+    notes = []
+    old_eps = old_image.entry_points
+    new_eps = new_image.entry_points
+    for core_id in sorted(set(old_eps) | set(new_eps)):
+        if old_eps.get(core_id) != new_eps.get(core_id):
+            notes.append({"note": "entry point", "core": core_id,
+                          "old": old_eps.get(core_id), "new": new_eps.get(core_id)})
+
+    skip_types = (NoteTypes.SEGMENT_MAP.value, NoteTypes.ENTRY_POINTS.value)
+    old_notes = {(ntype, name): desc for ntype, name, desc in old_image.notes if ntype not in skip_types}
+    new_notes = {(ntype, name): desc for ntype, name, desc in new_image.notes if ntype not in skip_types}
+    for ntype, name in sorted(set(old_notes) | set(new_notes)):
+        old_desc = old_notes.get((ntype, name))
+        new_desc = new_notes.get((ntype, name))
+        if old_desc != new_desc:
+            notes.append({"note": name.rstrip(b'\0 ').decode(errors='replace'), "type": ntype,
+                          "old": None if old_desc is None else len(old_desc),
+                          "new": None if new_desc is None else len(new_desc)})
+    return notes
+
+def diff_images(old_fname, new_fname, block_size=DIFF_BLOCK_SIZE, jobs=None):
+    '''Compares two images and returns the added, removed, resized and changed segments and notes'''
+    if jobs is None:
+        jobs = os.cpu_count() or 1
+
+    with MultiCoreELFImage(old_fname) as old_image, MultiCoreELFImage(new_fname) as new_image:
+        old_segs = get_keyed_segments(old_image)
+        new_segs = get_keyed_segments(new_image)
+
+        # the segments of both images are hashed at the same time
+        with ThreadPoolExecutor(max_workers=jobs) as executor:
+            old_futures = {key: executor.submit(get_segment_hash, old_image, seg) for key, seg in old_segs.items()}
+            new_futures = {key: executor.submit(get_segment_hash, new_image, seg) for key, seg in new_segs.items()}
+            old_hashes = {key: future.result() for key, future in old_futures.items()}
+            new_hashes = {key: future.result() for key, future in new_futures.items()}
+
+        diff = {"old": old_fname, "new": new_fname, "block_size": block_size, "header": {},
+                "added": [], "removed": [], "resized": [], "changed": [], "unchanged": 0,
+                "notes": get_note_diff(old_image, new_image), "ota_bytes": 0}
+
+        for field in HEADER_FIELDS:
+            old_val = old_image.elfheader.header[field]
+            new_val = new_image.elfheader.header[field]
+            if old_val != new_val:
+                diff['header'][field] = [old_val, new_val]
+
+        for key in sorted(set(old_segs) | set(new_segs), key=lambda x: (x[1], x[0] or 0, x[2])):
+            core_id, vaddr, _ = key
+            old_seg = old_segs.get(key)
+            new_seg = new_segs.get(key)
+            if old_seg is None:
+                diff['added'].append({"core": core_id, "vaddr": vaddr, "size": new_seg['filesz'],
+                                      "hash": new_hashes[key]})
+                diff['ota_bytes'] += new_seg['filesz']
+            elif new_seg is None:
+                diff['removed'].append({"core": core_id, "vaddr": vaddr, "size": old_seg['filesz'],
+                                        "hash": old_hashes[key]})
+            elif old_seg['filesz'] != new_seg['filesz']:
+                diff['resized'].append({"core": core_id, "vaddr": vaddr, "old_size": old_seg['filesz'],
+                                        "new_size": new_seg['filesz'], "old_hash": old_hashes[key],
+                                        "new_hash": new_hashes[key]})
+                diff['ota_bytes'] += new_seg['filesz']
+            elif old_hashes[key] != new_hashes[key]:
+                changed_blocks = get_changed_blocks(old_image, old_seg, new_image, new_seg, block_size)
+                diff['changed'].append({"core": core_id, "vaddr": vaddr, "size": new_seg['filesz'],
+                                        "changed_blocks": changed_blocks, "old_hash": old_hashes[key],
+                                        "new_hash": new_hashes[key]})
+                diff['ota_bytes'] += min(changed_blocks * block_size, new_seg['filesz'])
+            else:
+                diff['unchanged'] += 1
+
+    diff['identical'] = not (diff['header'] or diff['added'] or diff['removed'] or diff['resized']
+                             or diff['changed'] or diff['notes'])
+    return diff
+
+def get_diff_text(diff):
+    '''Returns the image comparison as text'''
+    def core_str(core_id):
+        return '-' if core_id is None else str(core_id)
+
+    lines = [f"--- {diff['old']}", f"+++ {diff['new']}"]
+    for field, (old_val, new_val) in diff['header'].items():
+        lines.append(f"header {field}: {hex(old_val)} -> {hex(new_val)}")
+    for seg in diff['added']:
+        lines.append(f"+ core {core_str(seg['core']):>3} {seg['vaddr']:#010x} {seg['size']:>10} bytes")
+    for seg in diff['removed']:
+        lines.append(f"- core {core_str(seg['core']):>3} {seg['vaddr']:#010x} {seg['size']:>10} bytes")
+    for seg in diff['resized']:
+        lines.append(f"~ core {core_str(seg['core']):>3} {seg['vaddr']:#010x} {seg['old_size']:>10} -> "
+                     f"{seg['new_size']} bytes")
+    for seg in diff['changed']:
+        lines.append(f"! core {core_str(seg['core']):>3} {seg['vaddr']:#010x} {seg['size']:>10} bytes, "
+                     f"{seg['changed_blocks']} blocks changed")
+    for note in diff['notes']:
+        if note['note'] == 'entry point':
+            old_ep = '-' if note['old'] is None else hex(note['old'])
+            new_ep = '-' if note['new'] is None else hex(note['new'])
+            lines.append(f"note entry point of core {note['core']}: {old_ep} -> {new_ep}")
+        elif note['old'] is None:
+            lines.append(f"note {note['note']} ({note['type']:#x}) added: {note['new']} bytes")
+        elif note['new'] is None:
+            lines.append(f"note {note['note']} ({note['type']:#x}) removed: {note['old']} bytes")
+        else:
+            lines.append(f"note {note['note']} ({note['type']:#x}) changed: {note['old']} -> {note['new']} bytes")
+
+    lines.append(f"{len(diff['added'])} added, {len(diff['removed'])} removed, {len(diff['resized'])} resized, "
+                 f"{len(diff['changed'])} changed, {diff['unchanged']} unchanged segments, "
+                 f"estimated update size {diff['ota_bytes']} bytes")
+    return '\n'.join(lines) + '\n'
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,118 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Module to estimate the time a bootloader takes to load a multicore ELF image'''
+
+import json
+from .image import MultiCoreELFImage
+from .elf_structs import PT_TYPE_DICT
+
+# common load time which is not spent on a particular core
+COMMON_CONTEXT = 'common'
+
+class LoadProfile():
+    '''Device load profile, the figures the estimates are based on'''
+    def __init__(self, profile_path) -> None:
+        with open(profile_path, 'r', encoding='utf-8') as file:
+            data = json.load(file)
+
+        self.name = data.get('name', profile_path)
+        # bandwidths are in bytes per second, overheads in microseconds
+        self.flash_bandwidth = float(data['flash_bandwidth'])
+        self.boot_overhead_us = float(data.get('boot_overhead_us', 0))
+        self.segment_overhead_us = float(data.get('segment_overhead_us', 0))
+        self.note_overhead_us = float(data.get('note_overhead_us', 0))
+        self.dma_alignment = int(data.get('dma_alignment', 1))
+        self.unaligned_penalty_us = float(data.get('unaligned_penalty_us', 0))
+        self.unaligned_bandwidth = float(data.get('unaligned_bandwidth', self.flash_bandwidth))
+        self.aes_bandwidth = float(data.get('aes_bandwidth', 0))
+        self.aes_enabled = bool(data.get('aes_enabled', False))
+
+def __transfer_us(size, bandwidth):
+    return size * 1e6 / bandwidth
+
+def simulate_load(image: MultiCoreELFImage, profile: LoadProfile):
+    '''Walks the image the way the SBL does and returns the estimated load time per core in us'''
+    times = {COMMON_CONTEXT: profile.boot_overhead_us}
+
+    # ELF header and PHT are read first
+    headers_size = image.elfheader.header.e_phoff + len(image.segments) * image.ph_size
+    times[COMMON_CONTEXT] += __transfer_us(headers_size, profile.flash_bandwidth)
+
+    for seg in image.segments:
+        if seg['type'] == PT_TYPE_DICT['PT_NOTE']:
+            times[COMMON_CONTEXT] += profile.note_overhead_us + \
+                __transfer_us(seg['filesz'], profile.flash_bandwidth)
+            continue
+
+        if seg['type'] != PT_TYPE_DICT['PT_LOAD']:
+            continue
+
+        # a shared segment is copied to each distinct address of the cores using it
+        copies = max(1, len(set(addr for _, addr in seg['shared'])))
+
+        seg_us = profile.segment_overhead_us
+        aligned = bool(seg['offset'] % profile.dma_alignment == 0 and
+                       seg['paddr'] % profile.dma_alignment == 0 and
+                       seg['filesz'] % profile.dma_alignment == 0)
+        if aligned:
+            seg_us += copies * __transfer_us(seg['filesz'], profile.flash_bandwidth)
+        else:
+            # the DMA can't be used directly, the copy falls back to the CPU
+            seg_us += copies * (profile.unaligned_penalty_us +
+                __transfer_us(seg['filesz'], min(profile.flash_bandwidth, profile.unaligned_bandwidth)))
+
+        if profile.aes_enabled and profile.aes_bandwidth > 0:
+            seg_us += __transfer_us(seg['filesz'], profile.aes_bandwidth)
+
+        context = seg['core'] if seg['core'] is not None else COMMON_CONTEXT
+        times[context] = times.get(context, 0.0) + seg_us
+
+    return times
+
+def get_load_report(image_path, profile: LoadProfile):
+    '''Returns the load time estimate of an image as a dict'''
+    with MultiCoreELFImage(image_path) as image:
+        times = simulate_load(image, profile)
+        load_segs = image.get_load_segments()
+        report = {
+            "image": image_path,
+            "profile": profile.name,
+            "segments": len(load_segs),
+            "load_bytes": sum(seg['filesz'] for seg in load_segs),
+            "cores": {str(core): round(us, 3) for core, us in times.items()},
+            "total_us": round(sum(times.values()), 3),
+        }
+    return report
+
+if __name__ == "__main__":
+    pass
@@ -32,24 +32,53 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 '''Multicore ELF module'''
 
+import io
 import os
-from elftools.elf.elffile import ELFFile
 from .elf import ELF
 from .elf_structs import ElfConstants as ELFC
 from .consts import SSO_CORE_ID
+from .addtranslate import get_address_translator
 from .note import CustomNote
+from .pipeline import ElfPrefetcher, PREFETCH_BYTES
+from .report import get_layout_report, write_layout_report
+from .overlap import get_load_spans
+
+# times an image is generated again when an input file is rebuilt while it is generated
+STALE_INPUT_RETRIES = 3
+# status of a generation which found an input file rebuilt since it was parsed
+STALE_INPUTS = -2
 
 class MultiCoreELF():
     '''Multicore ELF Object'''
     def __init__(self, ofname='multicoreelf.out', little_endian=True,
-                ignore_range=None, accept_range=None) -> None:
+                ignore_range=None, accept_range=None, core_cache=None, elf_index=None) -> None:
         self.elf_file_list = {}
+        # cores using each SSO of elf_file_list, None for all the cores
+        self.sso_consumers = {}
         self.metadata_added = False
         self.little_endian = little_endian
         self.ofname = ofname
-        self.ignore_range = ignore_range
+        # segments inside accept_range and outside all of the ignore ranges go to this image
+        if ignore_range is None:
+            self.ignore_range = []
+        elif isinstance(ignore_range, list):
+            self.ignore_range = ignore_range
+        else:
+            self.ignore_range = [ignore_range]
         self.accept_range = accept_range
         self.eplist = {}
+        # parsed segments of each core, reused while the input file is unchanged. The
+        # cache can be shared by the images generated from the same inputs
+        if core_cache is None:
+            core_cache = {}
+        self.core_cache = core_cache
+        # persistent index of parsed input ELFs, if any
+        self.elf_index = elf_index
+        # (cache key, entry point, segment count) of each core in the last generated image
+        self.last_state = {}
+        # local and load address spans of the segments in the last generated image
+        self.local_spans = []
+        self.load_spans = []
 
     def log_error(self, err_str: str):
         '''Error logging fxn'''
@@ -57,21 +86,74 @@ class MultiCoreELF():
 
     def add_elf(self, fname: str):
         '''Function to add an input ELF file to list'''
-        # Try to split the fname into core ID and filename
+        # Try to split the fname into core ID and filename, the filename may contain the delimiter
         delim = ':'
-        core_id, filename = fname.split(delim)
-        self.elf_file_list[core_id] = os.path.realpath(filename)
+        core_id, filename = fname.split(delim, 1)
+        self.add_elf_file(core_id, filename)
+
+    def add_elf_file(self, core_id, filename: str):
+        '''Function to add the input ELF file of a core to list'''
+        self.elf_file_list[str(core_id)] = os.path.realpath(filename)
+
+    def __get_sso_id(self, name, cores):
+        '''Returns the key of an SSO in elf_file_list, adding the same SSO again replaces it'''
+        cores_str = 'all' if cores is None else ','.join(str(core) for core in sorted(set(cores)))
+        return f"sso:{cores_str}:{name}"
+
+    def add_sso(self, fname: str, cores=None):
+        '''Function to add an input SSO file to list, shared by the given cores or by all of them'''
+        fname = os.path.realpath(fname)
+        sso_id = self.__get_sso_id(fname, cores)
+        self.elf_file_list[sso_id] = fname
+        self.sso_consumers[sso_id] = cores
+
+    def add_elf_data(self, core_id, data):
+        '''Function to add an in-memory input ELF to list'''
+        # keep an immutable copy, the segments are read from it when the image is written
+        self.elf_file_list[str(core_id)] = bytes(data)
+
+    def add_sso_data(self, data, cores=None):
+        '''Function to add an in-memory input SSO to list, shared by the given cores or by all of them'''
+        sso_id = self.__get_sso_id(f"<memory {len(self.sso_consumers)}>", cores)
+        self.elf_file_list[sso_id] = bytes(data)
+        self.sso_consumers[sso_id] = cores
+
+    def __get_core_ids(self):
+        '''Returns the IDs of the cores, without the SSOs'''
+        return [int(core_id) for core_id in self.elf_file_list if core_id not in self.sso_consumers]
+
+    def __get_consumers(self, core_id):
+        '''Returns the sorted cores using an SSO, or None for the input of a core'''
+        if core_id not in self.sso_consumers:
+            return None
+        cores = self.sso_consumers[core_id]
+        if cores is None:
+            cores = self.__get_core_ids()
+        return tuple(sorted(set(cores)))
 
-    def add_sso(self, fname: str):
-        '''Function to add an input SSO file to list'''
-        self.elf_file_list[SSO_CORE_ID] = os.path.realpath(fname)
+    def __open_elf(self, source):
+        '''Returns a binary stream of an input ELF file or in-memory ELF'''
+        if isinstance(source, str):
+            return open(source, 'rb')
+        return io.BytesIO(source)
+
+    def __add_eheader(self, elf_obj: ELF, source):
+        '''Adds the ELF header of an input ELF file or in-memory ELF to the image'''
+        if isinstance(source, str):
+            elf_obj.add_eheader_from_elf(source)
+            return
+
+        eh_size = ELFC.ELF32_SIZE.value
+        if source[ELFC.ELFCLASS_IDX.value] == ELFC.ELFCLASS64.value:
+            eh_size = ELFC.ELF64_SIZE.value
+        elf_obj.add_eheader_fromb(bytearray(source[:eh_size]))
 
     def __check_for_elf64(self):
         class_index = ELFC.ELFCLASS_IDX.value
         is64 = False
         core64 = 0
         for core_id, fname in self.elf_file_list.items():
-            with open(fname, 'rb') as f_ptr:
+            with self.__open_elf(fname) as f_ptr:
                 check_bytes = f_ptr.read(class_index + 1)
                 if check_bytes[class_index] == ELFC.ELFCLASS64.value:
                     is64 = True
@@ -79,21 +161,303 @@ class MultiCoreELF():
                     break
         return is64, core64
 
-    def __check_range(self, phent):
-        i_range = True
-        a_range = True
+    def __get_routed_ranges(self, vaddr, size, cores=(), translator=None):
+        '''Returns the (start, size) ranges of [vaddr, vaddr + size) which belong to this image
 
-        if self.ignore_range is not None:
-            i_range = not bool(self.ignore_range.start <= phent['p_vaddr'] <= self.ignore_range.end)
+        With a translator, the ranges are also split where an address translation region
+        of one of the cores starts or ends, so that each range is translated as a whole.
+        '''
+        ranges = [(vaddr, vaddr + size)]
 
         if self.accept_range is not None:
-            a_range = bool(self.accept_range.start <= phent['p_vaddr'] <= self.accept_range.end)
+            ranges = [(max(start, self.accept_range.start), min(end, self.accept_range.end))
+                      for start, end in ranges]
+            ranges = [(start, end) for start, end in ranges if start < end]
+
+        for i_range in self.ignore_range:
+            kept_ranges = []
+            for start, end in ranges:
+                if start < i_range.start:
+                    kept_ranges.append((start, min(end, i_range.start)))
+                if end > i_range.end:
+                    kept_ranges.append((max(start, i_range.end), end))
+            ranges = kept_ranges
+
+        if translator is not None:
+            split_ranges = []
+            for start, end in ranges:
+                offsets = set()
+                for core_id in cores:
+                    offsets.update(translator.get_boundaries(core_id, start, end - start))
+                bounds = [start] + [start + offset for offset in sorted(offsets)] + [end]
+                split_ranges.extend(zip(bounds, bounds[1:]))
+            ranges = split_ranges
+
+        return [(start - vaddr, end - start) for start, end in ranges]
+
+    def __route_segment(self, seg, max_segment_size, cores=(), translator=None):
+        '''Returns copies of the parts of a cached segment which belong to this image, chunked'''
+        routed = []
+        header = seg['header'].header
+        for start, size in self.__get_routed_ranges(header.vaddr, header.filesz, cores, translator):
+            for chunk_start in range(start, start + size, max_segment_size):
+                chunk_size = min(max_segment_size, start + size - chunk_start)
+                # copy since merging modifies the segments
+                phent = seg['header'].copy()
+                phent.header.vaddr += chunk_start
+                phent.header.paddr += chunk_start
+                phent.header.filesz = chunk_size
+                phent.header.memsz = chunk_size
+                if chunk_start > 0:
+                    phent.header.align = 1
+                routed.append({"header": phent, "data": seg['data'].slice(chunk_start, chunk_size),
+                               "context": seg['context'], "load": seg['load']})
+
+        return routed
+
+    def __get_section_ranges(self, elf_o, segment):
+        '''Returns the (start, size) ranges of a segment which are backed by allocated sections'''
+        from elftools.elf.constants import SH_FLAGS
+        filesz = segment.header['p_filesz']
+        ranges = []
 
-        return (i_range and a_range)
+        for section in elf_o.iter_sections():
+            if not section.header['sh_flags'] & SH_FLAGS.SHF_ALLOC:
+                continue
+            if section.header['sh_type'] == 'SHT_NOBITS' or section.header['sh_size'] == 0:
+                continue
+            if not segment.section_in_segment(section):
+                continue
+            start = section.header['sh_offset'] - segment.header['p_offset']
+            end = min(start + section.header['sh_size'], filesz)
+            ranges.append([start, end])
+
+        # no section headers to go by, keep the segment as it is
+        if len(ranges) == 0:
+            return [[0, filesz]]
+
+        ranges.sort()
+        merged_ranges = [ranges[0]]
+        for start, end in ranges[1:]:
+            if start <= merged_ranges[-1][1]:
+                merged_ranges[-1][1] = max(merged_ranges[-1][1], end)
+            else:
+                merged_ranges.append([start, end])
+
+        return [[start, end - start] for start, end in merged_ranges]
+
+    def __iter_elf_streams(self, file_list, pipeline_depth):
+        '''Yields (core_id, stream) of the input ELFs, opened ahead by a reader thread in pipelined mode'''
+        if pipeline_depth > 0:
+            yield from ElfPrefetcher(file_list, max_bytes=pipeline_depth * PREFETCH_BYTES)
+        else:
+            for core_id, fname in file_list.items():
+                yield core_id, self.__open_elf(fname)
+
+    def __parse_elf(self, elf_fp):
+        '''Parses an input ELF into its ELF class, entry point and PT_LOAD table'''
+        # pyelftools takes a good part of the startup time, import it only when
+        # an input is not in the core cache or the ELF index
+        from elftools.elf.elffile import ELFFile
+        elf_o = ELFFile(elf_fp)
+        segments = []
+        for segment in elf_o.iter_segments(type='PT_LOAD'):
+            if segment.header['p_filesz'] != 0:
+                segments.append({"phdr": dict(segment.header),
+                                 "sections": self.__get_section_ranges(elf_o, segment)})
+
+        return {"elfclass": elf_o.elfclass, "entry": elf_o.header['e_entry'], "segments": segments}
+
+    def __load_core(self, elf_fp, core_id, section_extract, f_stat=None):
+        '''Returns the entry point and unchunked loadable segments of an input ELF, f_stat is
+        the stat of an input file taken before it was opened'''
+        info = None
+        fname = self.elf_file_list[core_id]
+        # only input files are indexed, in-memory ELFs are parsed every time they change
+        use_index = bool(self.elf_index is not None and f_stat is not None)
+        if use_index:
+            index_key = self.elf_index.get_key(fname, f_stat)
+            info = self.elf_index.lookup(fname, key=index_key)
+        if info is None:
+            info = self.__parse_elf(elf_fp)
+            if use_index:
+                self.elf_index.store(fname, info, key=index_key)
+
+        # the segments of all the SSOs are tagged as shared in the segment map
+        context = core_id
+        if core_id in self.sso_consumers:
+            context = SSO_CORE_ID
+
+        core_elf = ELF(little_endian=self.little_endian)
+        for load_index, segment in enumerate(info['segments']):
+            # segments are chunked when they are routed to an image
+            filesz = segment['phdr']['p_filesz']
+            seg_count = len(core_elf.segmentlist)
+            if section_extract:
+                # only copy the parts of the segment covered by sections
+                for start, size in segment['sections']:
+                    core_elf.add_segment_from_phdr(segment['phdr'], elf_fp, filesz,
+                                                   context=context, start=start, size=size)
+            else:
+                core_elf.add_segment_from_phdr(segment['phdr'], elf_fp, filesz, context=context)
+            # remember the PT_LOAD each segment comes from
+            for seg in core_elf.segmentlist[seg_count:]:
+                seg['load'] = load_index
+
+        return info['entry'], core_elf.segmentlist
+
+    def __load_cores(self, section_extract, pipeline_depth):
+        '''Parses the input ELFs which changed since they were cached'''
+        stale_list = {}
+        stat_keys = {}
+        f_stats = {}
+
+        for core_id, fname in self.elf_file_list.items():
+            if isinstance(fname, str):
+                # the stat is taken before the file is read, a file rewritten in between
+                # then no longer matches the key its older contents are cached under
+                f_stat = os.stat(fname)
+                f_stats[core_id] = f_stat
+                stat_keys[core_id] = self.__get_stat_key(fname, f_stat, section_extract)
+            else:
+                # an in-memory ELF is its own key, equal contents reuse the parsed segments
+                stat_keys[core_id] = (None, fname, section_extract)
+            cached = self.core_cache.get(core_id)
+            if cached is None or cached['key'] != stat_keys[core_id]:
+                stale_list[core_id] = fname
+
+        for core_id, elf_fp in self.__iter_elf_streams(stale_list, pipeline_depth):
+            entry, segments = self.__load_core(elf_fp, core_id, section_extract, f_stats.get(core_id))
+            elf_fp.close()
+            self.core_cache[core_id] = {"key": stat_keys[core_id], "entry": entry, "segments": segments}
+
+    def __get_stat_key(self, fname, f_stat, section_extract):
+        '''Returns the key the parsed segments of an input file are cached under'''
+        return (fname, f_stat.st_ino, f_stat.st_size, f_stat.st_mtime_ns, section_extract)
+
+    def __inputs_changed(self):
+        '''Returns True if an input file no longer matches the key its segments were cached under'''
+        for core_id, fname in self.elf_file_list.items():
+            if not isinstance(fname, str):
+                continue
+            key = self.core_cache[core_id]['key']
+            try:
+                f_stat = os.stat(fname)
+            except OSError:
+                return True
+            if self.__get_stat_key(fname, f_stat, key[-1]) != key:
+                return True
+        return False
+
+    def __is_affected(self, state):
+        '''Returns True if the image has to be generated again for the given core state'''
+        if state.keys() != self.last_state.keys():
+            return True
+
+        for core_id, (key, entry, seg_count) in state.items():
+            last_key, last_entry, last_seg_count = self.last_state[core_id]
+            # a changed core only leaves this image as it is when it has no segments in it
+            # before and after the change and its entry point is the same
+            if key != last_key and (entry != last_entry or seg_count > 0 or last_seg_count > 0):
+                return True
+
+        return False
+
+    def __get_xlat_cores(self, core_id):
+        '''Returns the cores whose view the segments of an input are translated in, the first one for the PHT'''
+        consumers = self.__get_consumers(core_id)
+        if consumers is None:
+            return (int(core_id),)
+        return consumers
+
+    def get_layout_descriptors(self, section_extract=False, pipeline_depth=0, xlat_file_path=None):
+        '''Returns the (vaddr, size, core, shared) descriptors of the unchunked segments of this image
+
+        The addresses are translated to the SoC address space. shared is None, or the
+        (core, offset to the PHT address) of each core using a shared segment, such
+        segments are only merged with segments with the same offsets.
+        '''
+        self.__load_cores(section_extract, pipeline_depth)
+        translator = None
+        if xlat_file_path is not None:
+            translator = get_address_translator(xlat_file_path)
+
+        descriptors = []
+        for core_id in self.elf_file_list:
+            consumers = self.__get_consumers(core_id)
+            cores = self.__get_xlat_cores(core_id)
+            for seg in self.core_cache[core_id]['segments']:
+                header = seg['header'].header
+                for start, size in self.__get_routed_ranges(header.vaddr, header.filesz, cores, translator):
+                    vaddr = header.vaddr + start
+                    addrs = [vaddr] * len(cores)
+                    if translator is not None:
+                        addrs = [translator.translate(core, vaddr)[0] for core in cores]
+                    shared = None
+                    if consumers is not None:
+                        shared = tuple((core, addr - addrs[0]) for core, addr in zip(cores, addrs))
+                    descriptors.append((addrs[0], size, int(seg['context']), shared))
+
+        return descriptors
+
+    def check_xlat(self, xlat_file_path):
+        '''Checks that the address translation tables have the regions of every core, returns -1 if not'''
+        if xlat_file_path is None:
+            return 0
+        translator = get_address_translator(xlat_file_path)
+        for core_id in self.__get_core_ids():
+            if not translator.has_core(core_id):
+                self.log_error(f"No address translation regions for core {core_id} in {xlat_file_path}")
+                return -1
+        return 0
+
+    def get_core_count(self):
+        '''Returns the number of cores with an entry point in the image'''
+        return len(self.__get_core_ids())
+
+    def get_elfheader_size(self):
+        '''Returns the size of the ELF header the image will have'''
+        is64, _ = self.__check_for_elf64()
+        if is64:
+            return ELFC.ELF64_SIZE.value
+        return ELFC.ELF32_SIZE.value
 
     def generate_multicoreelf(self, max_segment_size: int, dump_segments=False, segmerge=False,
-        tol_limit=0, ignore_context=False, xlat_file_path=None, custom_note: CustomNote = None, add_rs_note=False):
+        tol_limit=0, ignore_context=False, xlat_file_path=None, custom_note: CustomNote = None, add_rs_note=False,
+        section_extract=False, pipeline_depth=0, only_if_changed=False, update=False, emitters=None,
+        report=False, order='address', transforms=None, transform_jobs=None):
         '''Function to finally generate the multicore elf file'''
+        # the segments are file extents read when the image is written, an input rebuilt
+        # after it was parsed would mix its old program headers with its new contents
+        for _ in range(STALE_INPUT_RETRIES + 1):
+            status = self.__generate_multicoreelf(max_segment_size, dump_segments=dump_segments,
+                segmerge=segmerge, tol_limit=tol_limit, ignore_context=ignore_context,
+                xlat_file_path=xlat_file_path, custom_note=custom_note, add_rs_note=add_rs_note,
+                section_extract=section_extract, pipeline_depth=pipeline_depth, only_if_changed=only_if_changed,
+                update=update, emitters=emitters, report=report, order=order, transforms=transforms,
+                transform_jobs=transform_jobs)
+            if status != STALE_INPUTS:
+                return status
+            print(f"Input files changed while generating {self.ofname}, generating it again")
+
+        self.log_error(f"Input files kept changing while generating {self.ofname}")
+        return -1
+
+    def __generate_multicoreelf(self, max_segment_size: int, dump_segments=False, segmerge=False,
+        tol_limit=0, ignore_context=False, xlat_file_path=None, custom_note: CustomNote = None, add_rs_note=False,
+        section_extract=False, pipeline_depth=0, only_if_changed=False, update=False, emitters=None,
+        report=False, order='address', transforms=None, transform_jobs=None):
+        '''Generates the image from the inputs, STALE_INPUTS if an input changed after it was parsed'''
+        # every core using an SSO must have an input ELF of its own
+        core_ids = self.__get_core_ids()
+        for sso_id in self.sso_consumers:
+            consumers = self.__get_consumers(sso_id)
+            if len(consumers) == 0 or not set(consumers).issubset(core_ids):
+                self.log_error(f"SSO {self.elf_file_list[sso_id]} must be used by cores with input ELFs")
+                return -1
+        if self.check_xlat(xlat_file_path) != 0:
+            return -1
+
         # Check if there are any 64 bit ELFs in the list
         is64, core64 = self.__check_for_elf64()
 
@@ -104,26 +468,84 @@ class MultiCoreELF():
         # if there are ELF64s, copy ELF header from the ELF64. Else pick the first one
 
         if is64:
-            elf_obj.add_eheader_from_elf(self.elf_file_list[core64])
+            self.__add_eheader(elf_obj, self.elf_file_list[core64])
         else:
             fname = next(iter(self.elf_file_list.values()))
-            elf_obj.add_eheader_from_elf(fname)
+            self.__add_eheader(elf_obj, fname)
 
-        for core_id, fname in self.elf_file_list.items():
-            elf_fp = open(fname, 'rb')
-            elf_o = ELFFile(elf_fp)
-            self.eplist[core_id] = elf_o.header['e_entry']
-            for segment in elf_o.iter_segments(type='PT_LOAD'):
-                if (segment.header['p_filesz'] != 0) and self.__check_range(segment.header):
-                    elf_obj.add_segment_from_elf(segment, max_segment_size, context=core_id)
-            elf_fp.close()
-        # segment sort and merge
+        self.__load_cores(section_extract, pipeline_depth)
+
+        translator = None
+        if xlat_file_path is not None:
+            translator = get_address_translator(xlat_file_path)
+
+        # route the cached segments of each core to this image
+        routed_list = {}
+        state = {}
+        for core_id in self.elf_file_list:
+            cached = self.core_cache[core_id]
+            cores = self.__get_xlat_cores(core_id)
+            routed_list[core_id] = []
+            for seg in cached['segments']:
+                routed_list[core_id].extend(self.__route_segment(seg, max_segment_size, cores, translator))
+            state[core_id] = (cached['key'], cached['entry'], len(routed_list[core_id]))
+
+        affected = self.__is_affected(state)
+        self.last_state = state
+        if only_if_changed and not affected and isinstance(self.ofname, str) and os.path.exists(self.ofname):
+            return 0
+
+        # per core statistics for the report, merging modifies the segments
+        core_stats = {}
+        for core_id, routed in routed_list.items():
+            core_stats[core_id] = {"bytes": sum(seg['header'].header.filesz for seg in routed),
+                                   "load_segments": len(set(seg['load'] for seg in routed)),
+                                   "chunked_segments": len(routed)}
+
+        self.eplist = {}
+        for core_id, routed in routed_list.items():
+            # SSOs are entered through the cores using them
+            consumers = self.__get_consumers(core_id)
+            if consumers is None:
+                self.eplist[core_id] = self.core_cache[core_id]['entry']
+            for seg in routed:
+                elf_obj.add_segment(phent=seg['header'], segdata=seg['data'], context=seg['context'],
+                                    consumers=consumers)
+
+        # translate to SoC addresses, then sort and merge the segments in SoC address space
+        elf_obj.translate_segments(xlat_file_path)
         elf_obj.merge_segments(tol_limit=tol_limit,
                             segmerge=segmerge,
-                            ignore_context=ignore_context)
-        # add note segment
-        # make final elf
-        elf_obj.make_elf(self.ofname, xlat_file_path, self.eplist, custom_note=custom_note, add_rs_note=add_rs_note)
+                            ignore_context=ignore_context,
+                            order=order)
+        # add note segment and lay out the final elf
+        if elf_obj.layout_elf(xlat_file_path, self.eplist, custom_note=custom_note, add_rs_note=add_rs_note) != 0:
+            return -1
+        self.local_spans, self.load_spans = get_load_spans(self.ofname, elf_obj)
+
+        # the other output formats are checked before any output is written
+        try:
+            for emitter in emitters or []:
+                emitter.check(elf_obj)
+        except ValueError as err:
+            self.log_error(str(err))
+            return -1
+
+        if self.__inputs_changed():
+            return STALE_INPUTS
+
+        # make final elf and the other output formats from the same layout
+        elf_obj.write_elf(self.ofname, pipeline_depth=pipeline_depth, update=update, transforms=transforms,
+                          transform_jobs=transform_jobs)
+        for emitter in emitters or []:
+            emitter.emit(elf_obj)
+        # an input rebuilt while it was copied leaves a mixed image
+        if self.__inputs_changed():
+            return STALE_INPUTS
+
+        if report:
+            write_layout_report(get_layout_report(self.ofname, elf_obj, core_stats),
+                                f"{self.ofname}.report")
 
         if dump_segments:
             elf_obj.dbg_dumpsegments()
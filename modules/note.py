@@ -32,126 +32,163 @@ OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
 
 '''Module which defines the note segment for the multicore elf'''
 
+import functools
+import os
+import struct
 from enum import Enum
-from construct import Struct, Int32ul, Int32ub, Int64ul, Int64ub, \
-    Array, IfThenElse, Padding, Byte, Bytes, If
+from .payload import Payload
 
 class NoteTypes(Enum):
     '''Enum subclass defining the different note types'''
     VENDOR_ID = 0xAAAA5555
     SEGMENT_MAP = 0xBBBB7777
     ENTRY_POINTS = 0xCCCC9999
+    SHARED_SEGMENTS = 0xDDDDBBBB
     CUSTOM = 0xDEADC0DE
 
+# names of the notes, the descriptor of the segment map holds one byte per segment
+NOTE_NAME_VENDOR = "Texas Instruments "
+NOTE_NAME_SEGMENT_MAP = "Segment Map "
+NOTE_NAME_ENTRY_POINTS = "Entry Points "
+NOTE_NAME_SHARED_SEGMENTS = "Shared Segments "
+
+NOTE_ALIGN = 4
+
 class CustomNote():
-    '''Helper class to build custom notes'''
-    def __init__(self, name, data) -> None:
+    '''Helper class to build custom notes, the data is bytes or a payload of an input file'''
+    def __init__(self, name, data, note_type=NoteTypes.CUSTOM.value) -> None:
         self.name = name
         self.data = data
+        self.note_type = note_type
+
+    @classmethod
+    def from_file(cls, name, note_type, fname):
+        '''Custom note with the contents of a file, copied to the image without reading it in memory'''
+        fname = os.path.realpath(fname)
+        return cls(name, Payload.from_file(fname, 0, os.path.getsize(fname)), note_type=note_type)
+
+    def get_name(self):
+        '''Returns the note name, ending with a space like the names of the other notes'''
+        return f'{self.name} '
+
+@functools.lru_cache(maxsize=None)
+def get_note_header_format(islittle: bool):
+    '''Function to return the precompiled namesz, descsz and type header of a note'''
+    return struct.Struct('<III' if islittle else '>III')
 
+@functools.lru_cache(maxsize=None)
 def get_ep_format(islittle: bool, is64: bool):
-    '''Function to return the entry point format'''
-    uint32_t = IfThenElse(islittle, Int32ul, Int32ub)
-    uint64_t = IfThenElse(islittle, Int64ul, Int64ub)
-    entrypoint = IfThenElse(is64, uint64_t, uint32_t)
-
-    return Struct(
-        "core_id" / uint32_t,
-        "entry_point" / entrypoint
-    )
-
-def get_note_format(islittle: bool, name: str, descsz: int, itemtype=Byte):
-    '''Function to return the basic note format'''
-    uint32_t = IfThenElse(islittle, Int32ul, Int32ub)
-    namelen = len(name)
-    padname = 0
-    paddesc = 0
-    alignsize = 4
-    if namelen % alignsize != 0:
-        padname = alignsize - (namelen % alignsize)
-    if descsz % alignsize != 0:
-        paddesc = alignsize - (descsz % alignsize)
-    return Struct(
-        "namesz" / uint32_t,
-        "descsz" / uint32_t,
-        "type" / uint32_t,
-        "name" / Bytes(namelen),
-        Padding(padname),
-        "desc" / If((descsz != 0), Array(int(descsz / itemtype.sizeof()), itemtype)),
-        Padding(paddesc)
-    )
+    '''Function to return the precompiled core ID and entry point item of the entry point note'''
+    endian = '<' if islittle else '>'
+    return struct.Struct(f'{endian}IQ' if is64 else f'{endian}II')
+
+@functools.lru_cache(maxsize=None)
+def get_shared_format(islittle: bool, is64: bool):
+    '''Function to return the precompiled segment index, core ID and address item of the shared segment note'''
+    endian = '<' if islittle else '>'
+    return struct.Struct(f'{endian}IIQ' if is64 else f'{endian}III')
+
+def __get_padding(length: int):
+    return (NOTE_ALIGN - (length % NOTE_ALIGN)) % NOTE_ALIGN
+
+def get_note_size(name: str, descsz: int):
+    '''Function to return the serialized size of a note'''
+    return 12 + ((len(name) + 3) & ~3) + ((descsz + 3) & ~3)
+
+def encode_note_header(buf: bytearray, islittle, ntype, name: str, descsz: int):
+    '''Appends the header and the padded name of a note to the buffer, the descriptor goes next'''
+    name_bytes = name.encode('ascii')
+    buf.extend(get_note_header_format(islittle).pack(len(name_bytes), descsz, ntype))
+    buf.extend(name_bytes)
+    buf.extend(bytes(__get_padding(len(name_bytes))))
+
+def encode_note(buf: bytearray, islittle, ntype, name: str, desc):
+    '''Appends a note with the given descriptor to the buffer'''
+    encode_note_header(buf, islittle, ntype, name, len(desc))
+    buf.extend(desc)
+    buf.extend(bytes(__get_padding(len(desc))))
+
+def encode_note_entrypoints(buf: bytearray, islittle, is64, eplist):
+    '''Appends the entry point note to the buffer, the items are packed in place'''
+    item_format = get_ep_format(islittle, is64)
+    desclen = len(eplist) * item_format.size
+    encode_note_header(buf, islittle, NoteTypes.ENTRY_POINTS.value, NOTE_NAME_ENTRY_POINTS, desclen)
+    offset = len(buf)
+    buf.extend(bytes(desclen + __get_padding(desclen)))
+    for coreid, e_entry in eplist.items():
+        item_format.pack_into(buf, offset, int(coreid), e_entry)
+        offset += item_format.size
+
+def encode_note_shared_segments(buf: bytearray, islittle, is64, shared_list):
+    '''Appends the shared segment note to the buffer, one (segment index, core ID, address) item
+    for each core using a shared segment, the index counts the loadable segments like the segment map'''
+    item_format = get_shared_format(islittle, is64)
+    desclen = len(shared_list) * item_format.size
+    encode_note_header(buf, islittle, NoteTypes.SHARED_SEGMENTS.value, NOTE_NAME_SHARED_SEGMENTS, desclen)
+    offset = len(buf)
+    buf.extend(bytes(desclen + __get_padding(desclen)))
+    for seg_index, coreid, addr in shared_list:
+        item_format.pack_into(buf, offset, seg_index, int(coreid), addr)
+        offset += item_format.size
 
 def get_note_vendor(islittle):
     '''Function to return the vendor ID note'''
-    name = "Texas Instruments "
-    note_format = get_note_format(islittle, name, 0)
-    dummy_data = bytearray(note_format.sizeof())
-    note = note_format.parse(dummy_data)
-    note.namesz = len(name)
-    note.descsz = 0
-    note.type   = NoteTypes.VENDOR_ID.value
-    note.name   = bytes(name.encode('ascii'))
-    note_data   = note_format.build(note)
-    return bytearray(note_data)
-
+    note_data = bytearray()
+    encode_note(note_data, islittle, NoteTypes.VENDOR_ID.value, NOTE_NAME_VENDOR, b'')
+    return note_data
 
 def get_note_segment_map(islittle, seglist):
     '''Function to return the segment map note'''
-    name = "Segment Map "
-    desclen = len(seglist)
-    note_format = get_note_format(islittle, name, desclen)
-    dummy_data = bytearray(note_format.sizeof())
-    note = note_format.parse(dummy_data)
-    note.namesz = len(name)
-    note.descsz = desclen
-    note.type   = NoteTypes.SEGMENT_MAP.value
-    note.name   = bytes(name.encode('ascii'))
-    note.desc   = seglist
-    note_data   = note_format.build(note)
-    return bytearray(note_data)
-
-def __ep_serialize(islittle: bool, is64: bool, eplist: dict):
-    ser_list = []
-    for coreid, e_entry in eplist.items():
-        itemtype = get_ep_format(islittle, is64)
-        dummy_data = bytearray(itemtype.sizeof())
-        ep_note = itemtype.parse(dummy_data)
-        ep_note.core_id = int(coreid)
-        ep_note.entry_point = e_entry
-        ser_list.append(ep_note)
-    return ser_list
+    note_data = bytearray()
+    encode_note(note_data, islittle, NoteTypes.SEGMENT_MAP.value, NOTE_NAME_SEGMENT_MAP, bytes(seglist))
+    return note_data
 
 def get_note_entrypoints(islittle, is64, eplist):
-    '''Function to return the segment map note'''
-    name = "Entry Points "
-    itemtype = get_ep_format(islittle, is64)
-    itemsize = itemtype.sizeof()
-    desclen = len(eplist) * itemsize
-    note_format = get_note_format(islittle, name, desclen, itemtype=itemtype)
-    dummy_data = bytearray(note_format.sizeof())
-    note = note_format.parse(dummy_data)
-    note.namesz = len(name)
-    note.descsz = desclen
-    note.type   = NoteTypes.ENTRY_POINTS.value
-    note.name   = bytes(name.encode('ascii'))
-    note.desc   = __ep_serialize(islittle, is64, eplist)
-    note_data   = note_format.build(note)
-    return bytearray(note_data)
+    '''Function to return the entry point note'''
+    note_data = bytearray()
+    encode_note_entrypoints(note_data, islittle, is64, eplist)
+    return note_data
 
 def get_note_custom(islittle, cust: CustomNote):
     '''Function to return custom note with descriptor as serialized data (byte array)'''
-    desclen = len(cust.data)
-    name = cust.name
-    note_format = get_note_format(islittle, f'{name} ', desclen)
-    dummy_data = bytearray(note_format.sizeof())
-    note = note_format.parse(dummy_data)
-    note.namesz = len(name)
-    note.descsz = desclen
-    note.type   = NoteTypes.CUSTOM.value
-    note.name   = bytes(name.encode('ascii'))
-    note.desc   = cust.data
-    note_data   = note_format.build(note)
-    return bytearray(note_data)
+    return get_note_custom_payload(islittle, cust).read()
+
+def get_note_custom_payload(islittle, cust: CustomNote):
+    '''Function to return custom note as a payload, a descriptor from a file is not read'''
+    header = bytearray()
+    encode_note_header(header, islittle, cust.note_type, cust.get_name(), len(cust.data))
+    payload = Payload.from_bytes(header)
+    if isinstance(cust.data, Payload):
+        payload.extend(cust.data)
+    else:
+        payload.add_extent(bytes(cust.data), 0, len(cust.data))
+    payload.extend_zeros(__get_padding(len(cust.data)))
+    return payload
+
+def parse_notes(islittle, data):
+    '''Function to parse the notes of a note segment into (type, name, desc) tuples'''
+    header_format = get_note_header_format(islittle)
+    notes = []
+    pos = 0
+    while pos + header_format.size <= len(data):
+        namesz, descsz, ntype = header_format.unpack_from(data, pos)
+        pos += header_format.size
+        name = bytes(data[pos:pos + namesz])
+        pos += (namesz + 3) & ~3
+        desc = bytes(data[pos:pos + descsz])
+        pos += (descsz + 3) & ~3
+        notes.append((ntype, name, desc))
+    return notes
+
+def parse_entrypoints(islittle, is64, desc):
+    '''Function to parse the entry point note descriptor into a dict of core ID to entry point'''
+    item_format = get_ep_format(islittle, is64)
+    return {core_id: entry for core_id, entry in item_format.iter_unpack(desc)}
+
+def parse_shared_segments(islittle, is64, desc):
+    '''Function to parse the shared segment note descriptor into (segment index, core ID, address) tuples'''
+    item_format = get_shared_format(islittle, is64)
+    return list(item_format.iter_unpack(desc))
 
 if __name__ == "__main__":
     # This is a module
@@ -0,0 +1,145 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Module to find overlapping and nearly colliding segments with a sweep line'''
+
+import heapq
+from collections import namedtuple
+
+# address range [start, end) of a segment of a core in an image
+LoadSpan = namedtuple('LoadSpan', ['image', 'core', 'start', 'end'])
+
+# number of collisions of each kind listed in the results, all of them are counted
+MAX_LISTED = 100
+
+def get_load_spans(image, elf_obj):
+    '''Returns the local and load address spans of the loadable segments of a laid out image
+
+    The local spans are the addresses in the view of the core, the load spans
+    the addresses in the PHT after translation, or the address in the view of
+    each core using a shared segment.
+    '''
+    local_spans = []
+    load_spans = []
+    for seg in elf_obj.get_load_segments():
+        header = seg['header'].header
+        if header.filesz == 0:
+            continue
+        # the parts of a segment merged in SoC address space may not be next to
+        # each other in the view of the cores
+        for core_id, local_vaddr, size in seg['local_ranges']:
+            local_spans.append(LoadSpan(image, core_id, local_vaddr, local_vaddr + size))
+
+        consumers = seg.get('consumers')
+        if consumers is None:
+            load_spans.append(LoadSpan(image, int(seg['context']), header.vaddr, header.vaddr + header.filesz))
+            continue
+
+        # a shared segment is loaded once for each distinct address
+        load_addrs = {}
+        for core_id, addr in seg['shared_addrs']:
+            load_addrs.setdefault(addr, core_id)
+        for addr, core_id in load_addrs.items():
+            load_spans.append(LoadSpan(image, core_id, addr, addr + header.filesz))
+
+    return local_spans, load_spans
+
+def find_collisions(spans, margin=0):
+    '''Returns the overlapping pairs of spans and the pairs of spans of different cores or images
+    closer than margin bytes, with the number of pairs of each kind
+
+    The spans are swept in address order keeping the ones which may still collide in
+    a heap ordered by their end, so this takes O(n log n) plus the number of pairs.
+    '''
+    result = {"overlaps": [], "near": [], "overlap_count": 0, "near_count": 0}
+    order = sorted((span for span in spans if span.end > span.start), key=lambda x: (x.start, x.end))
+
+    active = []
+    for index, span in enumerate(order):
+        # drop the spans ending at least margin bytes before this one
+        while len(active) > 0 and active[0][0] + margin <= span.start:
+            heapq.heappop(active)
+
+        for end, other_index in active:
+            other = order[other_index]
+            if end > span.start:
+                result['overlap_count'] += 1
+                if len(result['overlaps']) < MAX_LISTED:
+                    result['overlaps'].append((other, span, min(end, span.end) - span.start))
+            elif (other.image, other.core) != (span.image, span.core):
+                result['near_count'] += 1
+                if len(result['near']) < MAX_LISTED:
+                    result['near'].append((other, span, span.start - end))
+
+        heapq.heappush(active, (span.end, index))
+
+    return result
+
+def check_overlaps(local_spans, load_spans, margin=0):
+    '''Checks the local addresses of each core and the load addresses of all the images'''
+    # the local views of different cores are independent, only a core's own segments can collide
+    local = {"overlaps": [], "near": [], "overlap_count": 0, "near_count": 0}
+    by_core = {}
+    for span in local_spans:
+        by_core.setdefault(span.core, []).append(span)
+    for core_id in sorted(by_core):
+        core_result = find_collisions(by_core[core_id], margin=0)
+        local['overlap_count'] += core_result['overlap_count']
+        local['overlaps'].extend(core_result['overlaps'][:MAX_LISTED - len(local['overlaps'])])
+
+    return {"local": local, "load": find_collisions(load_spans, margin=margin), "margin": margin}
+
+def has_collisions(result):
+    '''Returns True if the check found overlaps or near collisions'''
+    return bool(result['local']['overlap_count'] > 0 or result['load']['overlap_count'] > 0 or
+                result['load']['near_count'] > 0)
+
+def get_overlap_text(result):
+    '''Returns the collisions found by check_overlaps as text'''
+    def span_str(span):
+        return f"{span.start:#010x}-{span.end:#010x} core {span.core} ({span.image})"
+
+    lines = []
+    for space, name in (('local', 'local'), ('load', 'load')):
+        for first, second, size in result[space]['overlaps']:
+            lines.append(f"Overlap of {size} bytes at {name} addresses: {span_str(first)} and {span_str(second)}")
+        for first, second, gap in result[space]['near']:
+            lines.append(f"Near collision, {gap} bytes apart at {name} addresses: "
+                         f"{span_str(first)} and {span_str(second)}")
+        listed = len(result[space]['overlaps']) + len(result[space]['near'])
+        total = result[space]['overlap_count'] + result[space]['near_count']
+        if total > listed:
+            lines.append(f"... {total - listed} more at {name} addresses")
+    return '\n'.join(lines) + '\n' if lines else ''
+
+if __name__ == "__main__":
+    pass
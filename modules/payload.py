@@ -0,0 +1,345 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Module to track segment payloads by provenance and copy them to the output'''
+
+import errno
+import hashlib
+import os
+
+# errors on which a kernel side copy method is given up for the next one
+COPY_FALLBACK_ERRNOS = (errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP,
+                        errno.EBADF, errno.ESPIPE)
+
+COPY_BLOCK_SIZE = 1024 * 1024
+
+class Payload():
+    '''Segment payload kept as a list of extents instead of bytes
+
+    Each extent is a (source, offset, length) tuple where source is either
+    the path of an input file, None for zero padding or a bytes-like object.
+    '''
+    def __init__(self) -> None:
+        self.extents = []
+        self.size = 0
+
+    @classmethod
+    def from_file(cls, fname: str, offset: int, length: int):
+        '''Payload for a range of an input file'''
+        payload = cls()
+        payload.add_extent(fname, offset, length)
+        return payload
+
+    @classmethod
+    def from_bytes(cls, data):
+        '''Payload for in-memory data'''
+        payload = cls()
+        payload.add_extent(data, 0, len(data))
+        return payload
+
+    def __len__(self):
+        return self.size
+
+    def add_extent(self, source, offset: int, length: int):
+        '''Appends an extent, coalescing it with the last one when contiguous'''
+        if length == 0:
+            return
+
+        self.size += length
+
+        if len(self.extents) > 0:
+            l_source, l_offset, l_length = self.extents[-1]
+            contiguous = False
+            if source is None and l_source is None:
+                contiguous = True
+            elif isinstance(source, str) and source == l_source:
+                contiguous = bool(l_offset + l_length == offset)
+            if contiguous:
+                self.extents[-1] = (l_source, l_offset, l_length + length)
+                return
+
+        self.extents.append((source, offset, length))
+
+    def copy(self):
+        '''Returns a copy of the payload which can be extended independently'''
+        payload = Payload()
+        payload.extents = list(self.extents)
+        payload.size = self.size
+        return payload
+
+    def compact(self):
+        '''Returns a copy of the payload keeping only the referenced bytes of its in-memory sources'''
+        payload = Payload()
+        for source, offset, length in self.extents:
+            if source is not None and not isinstance(source, str):
+                source, offset = bytes(source[offset:offset + length]), 0
+            payload.add_extent(source, offset, length)
+        return payload
+
+    def get_provenance_key(self, stats: dict):
+        '''Returns a digest of where the bytes of the payload come from, without reading the input files
+
+        File extents are identified by the stat of their file and their range, in-memory
+        extents by their contents. stats caches the stat of each file across payloads.
+        '''
+        digest = hashlib.blake2b(digest_size=16)
+        for source, offset, length in self.extents:
+            if source is None:
+                digest.update(f"zeros {length};".encode())
+            elif isinstance(source, str):
+                if source not in stats:
+                    # the change time also catches contents restored with an older modification time
+                    f_stat = os.stat(source)
+                    stats[source] = (f_stat.st_dev, f_stat.st_ino, f_stat.st_size, f_stat.st_mtime_ns,
+                                     f_stat.st_ctime_ns)
+                digest.update(f"file {source} {stats[source]} {offset} {length};".encode())
+            else:
+                digest.update(f"bytes {length};".encode())
+                digest.update(memoryview(source)[offset:offset + length])
+        return digest.hexdigest()
+
+    def extend_zeros(self, length: int):
+        '''Appends zero padding'''
+        self.add_extent(None, 0, length)
+
+    def extend(self, other):
+        '''Appends another payload'''
+        for source, offset, length in other.extents:
+            self.add_extent(source, offset, length)
+
+    def slice(self, start: int, length: int):
+        '''Returns the payload for a sub range of this payload'''
+        payload = Payload()
+        pos = 0
+        end = start + length
+        for source, offset, ext_len in self.extents:
+            ext_start = max(start, pos)
+            ext_end = min(end, pos + ext_len)
+            if ext_start < ext_end:
+                payload.add_extent(source, offset + ext_start - pos, ext_end - ext_start)
+            pos += ext_len
+            if pos >= end:
+                break
+        return payload
+
+    def iter_blocks(self, block_size=COPY_BLOCK_SIZE):
+        '''Yields the payload as consecutive blocks of at most block_size bytes'''
+        for start in range(0, self.size, block_size):
+            yield self.slice(start, min(block_size, self.size - start)).read()
+
+    def read(self):
+        '''Reads the payload into memory'''
+        data = bytearray()
+        for source, offset, length in self.extents:
+            if source is None:
+                data.extend(bytearray(length))
+            elif isinstance(source, str):
+                with open(source, 'rb') as f_ptr:
+                    f_ptr.seek(offset)
+                    data.extend(f_ptr.read(length))
+            else:
+                data.extend(source[offset:offset + length])
+        return data
+
+class FileWriter():
+    '''Writes bytes and payloads to the output file
+
+    File extents are copied in the kernel with os.copy_file_range, falling
+    back to os.sendfile and then to buffered copies. Zero padding is
+    skipped over with lseek to leave holes where the file system allows it.
+    '''
+    def __init__(self, fname, truncate=True) -> None:
+        flags = os.O_WRONLY | os.O_CREAT
+        if truncate:
+            flags |= os.O_TRUNC
+        self.fd = os.open(fname, flags, 0o666)
+        self.src_fds = {}
+        self.use_copy_file_range = hasattr(os, 'copy_file_range')
+        self.use_sendfile = hasattr(os, 'sendfile')
+        self.use_holes = True
+
+    def __get_src_fd(self, fname):
+        if fname not in self.src_fds:
+            self.src_fds[fname] = os.open(fname, os.O_RDONLY)
+        return self.src_fds[fname]
+
+    def __write_bytes(self, data):
+        view = memoryview(data)
+        while len(view) > 0:
+            written = os.write(self.fd, view)
+            view = view[written:]
+
+    def __write_zeros(self, length):
+        if self.use_holes:
+            try:
+                os.lseek(self.fd, length, os.SEEK_CUR)
+                return
+            except OSError:
+                self.use_holes = False
+
+        zeros = bytes(min(length, COPY_BLOCK_SIZE))
+        while length > 0:
+            count = min(length, len(zeros))
+            self.__write_bytes(zeros[:count])
+            length -= count
+
+    def __copy_range(self, src_fd, offset, length):
+        while length > 0 and self.use_copy_file_range:
+            try:
+                copied = os.copy_file_range(src_fd, self.fd, length, offset)
+            except OSError as err:
+                if err.errno not in COPY_FALLBACK_ERRNOS:
+                    raise
+                copied = 0
+            if copied == 0:
+                self.use_copy_file_range = False
+                break
+            offset += copied
+            length -= copied
+
+        while length > 0 and self.use_sendfile:
+            try:
+                copied = os.sendfile(self.fd, src_fd, offset, length)
+            except OSError as err:
+                if err.errno not in COPY_FALLBACK_ERRNOS:
+                    raise
+                copied = 0
+            if copied == 0:
+                self.use_sendfile = False
+                break
+            offset += copied
+            length -= copied
+
+        while length > 0:
+            data = os.pread(src_fd, min(length, COPY_BLOCK_SIZE), offset)
+            if len(data) == 0:
+                raise EOFError("Input file is shorter than its segment table")
+            self.__write_bytes(data)
+            offset += len(data)
+            length -= len(data)
+
+    def seek(self, offset):
+        '''Moves the current position to the given file offset'''
+        os.lseek(self.fd, offset, os.SEEK_SET)
+
+    def write(self, data):
+        '''Writes bytes or a payload at the current position'''
+        if not isinstance(data, Payload):
+            self.__write_bytes(data)
+            return
+
+        for source, offset, length in data.extents:
+            if source is None:
+                self.__write_zeros(length)
+            elif isinstance(source, str):
+                self.__copy_range(self.__get_src_fd(source), offset, length)
+            else:
+                self.__write_bytes(memoryview(source)[offset:offset + length])
+
+    def close(self):
+        '''Closes the output file, setting its size to cover trailing holes'''
+        try:
+            if self.use_holes:
+                end = os.lseek(self.fd, 0, os.SEEK_CUR)
+                if end > os.fstat(self.fd).st_size:
+                    os.ftruncate(self.fd, end)
+        finally:
+            for src_fd in self.src_fds.values():
+                os.close(src_fd)
+            self.src_fds = {}
+            os.close(self.fd)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+class ObjectWriter():
+    '''Writes bytes and payloads to a writable binary file object
+
+    The file object is left open, file extents are copied through buffered
+    reads since the object may not have a file descriptor.
+    '''
+    def __init__(self, file_obj) -> None:
+        self.file_obj = file_obj
+
+    def __write_bytes(self, data):
+        view = memoryview(data)
+        while len(view) > 0:
+            written = self.file_obj.write(view)
+            # raw file objects may write less than requested
+            if written is None:
+                written = len(view)
+            view = view[written:]
+
+    def seek(self, offset):
+        '''Moves the current position to the given offset'''
+        self.file_obj.seek(offset)
+
+    def write(self, data):
+        '''Writes bytes or a payload at the current position'''
+        if not isinstance(data, Payload):
+            self.__write_bytes(data)
+            return
+
+        for source, offset, length in data.extents:
+            if source is None:
+                zeros = bytes(min(length, COPY_BLOCK_SIZE))
+                while length > 0:
+                    count = min(length, len(zeros))
+                    self.__write_bytes(zeros[:count])
+                    length -= count
+            elif isinstance(source, str):
+                with open(source, 'rb') as f_ptr:
+                    f_ptr.seek(offset)
+                    while length > 0:
+                        data = f_ptr.read(min(length, COPY_BLOCK_SIZE))
+                        if len(data) == 0:
+                            raise EOFError("Input file is shorter than its segment table")
+                        self.__write_bytes(data)
+                        length -= len(data)
+            else:
+                self.__write_bytes(memoryview(source)[offset:offset + length])
+
+    def close(self):
+        '''Flushes the file object, it is closed by its owner'''
+        self.file_obj.flush()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,183 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Module with the reader and writer threads of the pipelined mode'''
+
+import io
+import os
+import queue
+import threading
+from collections import deque
+from .payload import FileWriter
+
+# bytes of input files the reader thread warms ahead of the parser for each level of pipeline depth
+PREFETCH_BYTES = 16 * 1024 * 1024
+# size of the reads warming the page cache where posix_fadvise is not available
+WARM_BUF_SIZE = 1024 * 1024
+
+def warm_page_cache(f_ptr, size):
+    '''Starts reading an open file into the page cache without copying it into the process'''
+    if hasattr(os, 'posix_fadvise'):
+        # the kernel reads ahead asynchronously, the parser and writer then hit the cache
+        try:
+            os.posix_fadvise(f_ptr.fileno(), 0, size, os.POSIX_FADV_WILLNEED)
+        except OSError:
+            # only a hint, some file systems do not take it
+            pass
+        return
+    buf = bytearray(min(size, WARM_BUF_SIZE))
+    while f_ptr.readinto(buf) > 0:
+        pass
+    f_ptr.seek(0)
+
+class ElfPrefetcher():
+    '''Reader thread which opens the input ELF files ahead of the parser and warms the page cache'''
+    def __init__(self, elf_file_list: dict, max_bytes=2 * PREFETCH_BYTES) -> None:
+        self.elf_file_list = elf_file_list
+        # the bytes of the files opened ahead of the parser are bounded, a file larger
+        # than the bound is still opened once the parser took all the ones before it
+        self.max_bytes = max_bytes
+        self.pending_bytes = 0
+        self.items = deque()
+        self.closed = False
+        self.cond = threading.Condition()
+        self.thread = threading.Thread(target=self.__reader, daemon=True)
+        self.thread.start()
+
+    def __reserve(self, size):
+        '''Waits until a file of the given size fits in the bytes ahead of the parser, False if closed'''
+        with self.cond:
+            while not self.closed and self.pending_bytes > 0 and self.pending_bytes + size > self.max_bytes:
+                self.cond.wait()
+            self.pending_bytes += size
+            return not self.closed
+
+    def __put(self, item, size=0):
+        '''Hands an item of the given reserved size to the parser, False if closed'''
+        with self.cond:
+            if self.closed:
+                return False
+            self.items.append((item, size))
+            self.cond.notify_all()
+            return True
+
+    def __reader(self):
+        for core_id, fname in self.elf_file_list.items():
+            size = 0
+            stream = None
+            try:
+                if isinstance(fname, str):
+                    # the file stays open and its segments file-backed, only the page cache is warmed
+                    stream = open(fname, 'rb')
+                    size = os.fstat(stream.fileno()).st_size
+                    if not self.__reserve(size):
+                        stream.close()
+                        return
+                    warm_page_cache(stream, size)
+                else:
+                    # in-memory ELFs are already there
+                    stream = io.BytesIO(fname)
+            except OSError as err:
+                if stream is not None:
+                    stream.close()
+                self.__put((None, err))
+                return
+            if not self.__put((core_id, stream), size):
+                stream.close()
+                return
+        self.__put(None)
+
+    def __iter__(self):
+        '''Yields (core_id, stream) for every input ELF in order'''
+        try:
+            while True:
+                with self.cond:
+                    while len(self.items) == 0:
+                        self.cond.wait()
+                    item, size = self.items.popleft()
+                    self.pending_bytes -= size
+                    self.cond.notify_all()
+                if item is None:
+                    break
+                if item[0] is None:
+                    raise item[1]
+                yield item
+        finally:
+            # a parser stopping early releases the reader and the files it opened
+            with self.cond:
+                self.closed = True
+                self.cond.notify_all()
+                for item, _ in self.items:
+                    if item is not None and item[0] is not None:
+                        item[1].close()
+                self.items.clear()
+        self.thread.join()
+
+class StreamWriter(FileWriter):
+    '''Writer thread which streams buffers and payloads to the output file'''
+    def __init__(self, fname, depth=8) -> None:
+        super().__init__(fname)
+        # the queue bounds the number of buffers waiting to be written
+        self.buf_queue = queue.Queue(maxsize=depth)
+        self.error = None
+        self.thread = threading.Thread(target=self.__writer, daemon=True)
+        self.thread.start()
+
+    def __writer(self):
+        while True:
+            buf = self.buf_queue.get()
+            if buf is None:
+                break
+            if self.error is not None:
+                continue
+            try:
+                super().write(buf)
+            except (OSError, EOFError) as err:
+                self.error = err
+
+    def write(self, data):
+        '''Queues bytes or a payload to be written, it must not be modified afterwards'''
+        if self.error is not None:
+            raise self.error
+        if len(data) > 0:
+            self.buf_queue.put(data)
+
+    def close(self):
+        '''Waits for all the queued buffers to be written and closes the file'''
+        self.buf_queue.put(None)
+        self.thread.join()
+        super().close()
+        if self.error is not None:
+            raise self.error
+
+if __name__ == "__main__":
+    pass
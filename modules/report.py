@@ -0,0 +1,133 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Module to report the layout of a generated image'''
+
+import json
+import os
+
+# number of the largest gaps between segments in the report
+REPORT_GAP_COUNT = 10
+
+def get_layout_report(ofname, elf_obj, core_stats: dict):
+    '''Returns the layout report of a laid out ELF object as a dict
+
+    core_stats holds the byte total, the number of input PT_LOAD segments and
+    the number of segments after chunking of each core.
+    '''
+    load_segs = elf_obj.get_load_segments()
+    note_segs = [seg for seg in elf_obj.segmentlist if seg['context'] is None]
+    ph_size = elf_obj.segmentlist[0]['header'].get_size()
+
+    gaps = []
+    sorted_segs = sorted(load_segs, key=lambda x: x['header'].header.paddr)
+    for prev, cur in zip(sorted_segs, sorted_segs[1:]):
+        prev_end = prev['header'].header.paddr + prev['header'].header.filesz
+        gap = cur['header'].header.paddr - prev_end
+        if gap > 0:
+            gaps.append({"start": hex(prev_end), "end": hex(cur['header'].header.paddr), "size": gap})
+    gaps.sort(key=lambda x: x['size'], reverse=True)
+
+    # results of the segment transforms, in PHT order
+    transforms = []
+    for seg in load_segs:
+        if 'transforms' in seg:
+            header = seg['header'].header
+            transforms.append({"vaddr": hex(header.vaddr), "size": header.filesz,
+                               "core": int(seg['context']), **seg['transforms']})
+
+    return {
+        "image": ofname,
+        "file_size": os.path.getsize(ofname) if os.path.exists(ofname) else None,
+        "cores": {str(core_id): stats for core_id, stats in core_stats.items()},
+        "segments": {
+            "input_load": sum(stats['load_segments'] for stats in core_stats.values()),
+            "after_chunking": sum(stats['chunked_segments'] for stats in core_stats.values()),
+            "after_merging": len(load_segs),
+        },
+        "padding": {
+            "merge_zero_padding": elf_obj.stats['merge_padding'],
+            "rs_aes_padding": elf_obj.stats['rs_padding'],
+        },
+        "notes": {
+            "segments": len(note_segs),
+            "bytes": sum(len(seg['data']) for seg in note_segs),
+            "pht_bytes": len(note_segs) * ph_size,
+        },
+        "largest_gaps": gaps[:REPORT_GAP_COUNT],
+        "xlat": {
+            "hits": elf_obj.stats['xlat_hits'],
+            "passes": elf_obj.stats['xlat_passes'],
+        },
+        "segment_transforms": transforms,
+    }
+
+def get_report_text(report: dict):
+    '''Returns the layout report as text'''
+    lines = [f"Image         : {report['image']}",
+             f"File size     : {report['file_size']} bytes",
+             "Cores         :"]
+    for core_id, stats in report['cores'].items():
+        lines.append(f"    {core_id:>4} : {stats['bytes']} bytes, {stats['load_segments']} PT_LOAD, "
+                     f"{stats['chunked_segments']} after chunking")
+    segments = report['segments']
+    lines.append(f"Segments      : {segments['input_load']} PT_LOAD, {segments['after_chunking']} after chunking, "
+                 f"{segments['after_merging']} after merging")
+    padding = report['padding']
+    lines.append(f"Padding       : {padding['merge_zero_padding']} bytes from merging, "
+                 f"{padding['rs_aes_padding']} bytes of RS/AES padding")
+    notes = report['notes']
+    lines.append(f"Notes         : {notes['segments']} segments, {notes['bytes']} bytes, "
+                 f"{notes['pht_bytes']} bytes of PHT entries")
+    lines.append(f"Translation   : {report['xlat']['hits']} hits, {report['xlat']['passes']} pass-throughs")
+    lines.append("Largest gaps  :")
+    for gap in report['largest_gaps']:
+        lines.append(f"    {gap['start']} - {gap['end']} : {gap['size']} bytes")
+    if len(report['segment_transforms']) > 0:
+        lines.append("Segments      :")
+        for seg in report['segment_transforms']:
+            results = ', '.join(f"{name} {value}" for name, value in seg.items()
+                                if name not in ('vaddr', 'size', 'core'))
+            lines.append(f"    {seg['vaddr']} : {seg['size']} bytes, core {seg['core']}, {results}")
+
+    return '\n'.join(lines) + '\n'
+
+def write_layout_report(report: dict, basename):
+    '''Writes the layout report to basename.json and basename.txt'''
+    with open(f"{basename}.json", 'w', encoding='utf-8') as file:
+        json.dump(report, file, indent=4)
+
+    with open(f"{basename}.txt", 'w', encoding='utf-8') as file:
+        file.write(get_report_text(report))
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,262 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Module to generate images in a long running local server and send jobs to it'''
+
+import contextlib
+import io
+import json
+import os
+import signal
+import socket
+import socketserver
+import stat
+import struct
+import sys
+import tempfile
+import traceback
+
+# environment variable overriding the default socket path of the server and client
+SOCKET_ENV = 'GENIMAGE_SOCKET'
+
+# name of the socket in the default socket directory
+SOCKET_NAME = 'genimage.sock'
+
+def get_socket_dir():
+    '''Returns the default directory of the server socket, private to the user'''
+    runtime_dir = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime_dir:
+        return runtime_dir
+    return os.path.join(tempfile.gettempdir(), f"genimage-{os.geteuid()}")
+
+def is_private_dir(path, create=False):
+    '''Returns True if path is a directory, not a symlink, owned by the user and only accessible to them'''
+    if create:
+        with contextlib.suppress(FileExistsError):
+            os.mkdir(path, 0o700)
+    try:
+        dir_stat = os.lstat(path)
+    except OSError:
+        return False
+    return (stat.S_ISDIR(dir_stat.st_mode) and dir_stat.st_uid == os.geteuid() and
+            stat.S_IMODE(dir_stat.st_mode) & 0o077 == 0)
+
+def get_socket_path(socket_path=None):
+    '''Returns the path of the server socket, given, from the environment or in the default directory'''
+    if socket_path is not None:
+        return socket_path
+    return os.environ.get(SOCKET_ENV, os.path.join(get_socket_dir(), SOCKET_NAME))
+
+def is_default_socket(socket_path=None):
+    '''Returns True if the socket is in the default directory, which must be private to the user'''
+    return socket_path is None and SOCKET_ENV not in os.environ
+
+def get_peer_uid(sock):
+    '''Returns the user ID of the process at the other end of a Unix socket, None if it cannot be known'''
+    if not hasattr(socket, 'SO_PEERCRED'):
+        return None
+    creds = sock.getsockopt(socket.SOL_SOCKET, socket.SO_PEERCRED, struct.calcsize('3i'))
+    _, uid, _ = struct.unpack('3i', creds)
+    return uid
+
+def is_same_user(sock):
+    '''Returns True unless the process at the other end of a Unix socket runs as another user'''
+    return get_peer_uid(sock) in (None, os.geteuid())
+
+def is_local_only(argv):
+    '''Returns True if the arguments must be run in the process of the client'''
+    # the server would never return from these jobs
+    if len(argv) > 0 and argv[0] == 'serve':
+        return True
+    return any(arg.split('=')[0] == '--watch' for arg in argv)
+
+def recv_message(sock_file):
+    '''Reads a message, a line of JSON'''
+    line = sock_file.readline()
+    if not line:
+        raise ConnectionError("Connection closed")
+    return json.loads(line)
+
+def send_message(sock_file, message):
+    '''Writes a message, a line of JSON'''
+    sock_file.write(json.dumps(message).encode('utf-8') + b'\n')
+    sock_file.flush()
+
+def send_job(argv, socket_path=None):
+    '''Runs the genimage.py arguments in the server, returns (exit code, output) or None if it is not running'''
+    # another user could have created the default directory or the socket to receive the jobs
+    if is_default_socket(socket_path) and not is_private_dir(get_socket_dir()):
+        return None
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        sock.connect(get_socket_path(socket_path))
+    except OSError:
+        sock.close()
+        return None
+    if not is_same_user(sock):
+        print(f"[WARNING] : The server on {get_socket_path(socket_path)} runs as another user, not using it",
+              file=sys.stderr)
+        sock.close()
+        return None
+
+    with sock, sock.makefile('rwb') as sock_file:
+        try:
+            send_message(sock_file, {"argv": list(argv), "cwd": os.getcwd()})
+            reply = recv_message(sock_file)
+        except (OSError, ValueError):
+            # the server stopped before replying
+            return None
+    return reply['status'], reply['output']
+
+class JobHandler(socketserver.StreamRequestHandler):
+    '''Runs the job of a client connection in the server process'''
+    def handle(self):
+        try:
+            job = recv_message(self.rfile)
+            argv = [str(arg) for arg in job['argv']]
+            cwd = str(job['cwd'])
+        except (ConnectionError, ValueError, KeyError, TypeError):
+            return
+        status, output = self.server.run_job(argv, cwd)
+        with contextlib.suppress(OSError):
+            send_message(self.wfile, {"status": status, "output": output})
+
+class GenImageServer(socketserver.UnixStreamServer):
+    '''Unix socket server running genimage.py jobs one at a time
+
+    The imported modules, the loaded address translation tables and the parsed
+    input ELFs of the last max_cached_images outputs are kept between the jobs.
+    '''
+    def __init__(self, socket_path, run, idle_timeout=3600, max_cached_images=64) -> None:
+        self.socket_path = socket_path
+        # genimage.py entry point taking the arguments and the core caches
+        self.run = run
+        self.max_cached_images = max_cached_images
+        # core cache of each output, most recently used last
+        self.core_caches = {}
+        self.stopped = False
+        self.timeout = idle_timeout if idle_timeout > 0 else None
+        # the socket is only accessible to the user running the server
+        old_umask = os.umask(0o077)
+        try:
+            super().__init__(socket_path, JobHandler)
+        finally:
+            os.umask(old_umask)
+
+    def verify_request(self, request, client_address):
+        # the jobs run with the rights of the server, only its user may send them
+        return is_same_user(request)
+
+    def handle_timeout(self):
+        self.stopped = True
+
+    def stop(self):
+        '''Stops the server, also while a job is running'''
+        self.stopped = True
+        sys.exit(0)
+
+    def run_job(self, argv, cwd):
+        '''Runs the arguments of a job in its working directory, returns (exit code, output)'''
+        if is_local_only(argv):
+            return 2, f"[ERROR] : {' '.join(argv)} cannot be run in the server !!!\n"
+
+        output = io.StringIO()
+        old_cwd = os.getcwd()
+        status = 0
+        with contextlib.redirect_stdout(output), contextlib.redirect_stderr(output):
+            try:
+                os.chdir(cwd)
+                status = self.run(argv, core_caches=self.core_caches)
+            except SystemExit as err:
+                # the server is stopping, the job does not reply
+                if self.stopped:
+                    raise
+                # argparse errors and --help exit like the script would
+                if isinstance(err.code, str):
+                    print(err.code)
+                    status = 1
+                else:
+                    status = err.code or 0
+            except Exception: # pylint: disable=broad-except
+                traceback.print_exc()
+                status = 1
+            finally:
+                os.chdir(old_cwd)
+
+        while len(self.core_caches) > self.max_cached_images:
+            del self.core_caches[next(iter(self.core_caches))]
+        return status, output.getvalue()
+
+    def serve_until_idle(self):
+        '''Handles the jobs until no job came for the idle timeout'''
+        while not self.stopped:
+            self.handle_request()
+
+def __remove_stale_socket(socket_path):
+    '''Removes the socket of a server which is not running anymore, returns False if one is running'''
+    if not os.path.exists(socket_path):
+        return True
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    with sock:
+        try:
+            sock.connect(socket_path)
+            return False
+        except OSError:
+            os.unlink(socket_path)
+    return True
+
+def serve(run, socket_path=None, idle_timeout=3600, max_cached_images=64):
+    '''Runs the jobs of the clients with run until the server is idle or interrupted, returns the exit code'''
+    if is_default_socket(socket_path) and not is_private_dir(get_socket_dir(), create=True):
+        print(f"[ERROR] : {get_socket_dir()} must be a directory only accessible to the user !!!")
+        return 1
+    socket_path = get_socket_path(socket_path)
+    if not __remove_stale_socket(socket_path):
+        print(f"[ERROR] : A server is already running on {socket_path} !!!")
+        return 1
+
+    server = GenImageServer(socket_path, run, idle_timeout=idle_timeout, max_cached_images=max_cached_images)
+    print(f"Serving on {socket_path}")
+    # stopping the server with kill also removes the socket
+    signal.signal(signal.SIGTERM, lambda signum, frame: server.stop())
+    try:
+        server.serve_until_idle()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        with contextlib.suppress(FileNotFoundError):
+            os.unlink(socket_path)
+    return 0
+
+if __name__ == "__main__":
+    pass
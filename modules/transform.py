@@ -0,0 +1,167 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Module to run per-segment transforms over the payloads of the laid out segments in parallel'''
+
+import hashlib
+import os
+import zlib
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+
+from .payload import COPY_BLOCK_SIZE
+
+class SegmentTransform(ABC):
+    '''Computation over the payload of a segment, its result is reported for the segment'''
+    # key of the result in the report
+    name = None
+    # True if apply mostly runs in code releasing the GIL, like hashlib and zlib on large
+    # buffers, the segments are then processed by threads instead of processes
+    releases_gil = True
+
+    @abstractmethod
+    def apply(self, payload):
+        '''Returns the result of the transform for the payload of a segment'''
+
+class DigestTransform(SegmentTransform):
+    '''Digest of the segment contents'''
+    def __init__(self, algorithm='sha256') -> None:
+        # fail early for an unknown algorithm
+        hashlib.new(algorithm)
+        self.algorithm = algorithm
+        self.name = algorithm
+
+    def apply(self, payload):
+        digest = hashlib.new(self.algorithm)
+        for block in payload.iter_blocks():
+            digest.update(block)
+        return digest.hexdigest()
+
+class ZeroBlockTransform(SegmentTransform):
+    '''Number of bytes in the blocks of the segment which are all zeros'''
+    name = 'zero_bytes'
+    # the zero blocks are found by C searches and compares with a few calls per run of
+    # zeros rather than per block, and reading the payload releases the GIL, so threads
+    # are enough
+
+    def __init__(self, block_size=4096) -> None:
+        self.block_size = block_size
+        # read in multiples of the block size so the blocks start at the same offsets
+        self.read_size = max(1, COPY_BLOCK_SIZE // block_size) * block_size
+        self.zeros = bytes(self.read_size)
+
+    def __get_zero_run_end(self, data, start, end):
+        '''Returns the end of the zero blocks from start, comparing growing slices with the zero buffer'''
+        step = self.block_size
+        while start < end:
+            length = min(step, end - start)
+            if data[start:start + length] == self.zeros[:length]:
+                start += length
+                step *= 2
+            elif length <= self.block_size:
+                break
+            else:
+                step = self.block_size
+        return start
+
+    def __count_zero_blocks(self, data):
+        '''Returns the bytes of the blocks of data which are all zeros, data starts at a block'''
+        size = self.block_size
+        # the last block may be shorter
+        full_end = len(data) // size * size
+        zero_bytes = 0
+        if full_end < len(data) and data[full_end:] == self.zeros[:len(data) - full_end]:
+            zero_bytes += len(data) - full_end
+
+        zero_block = self.zeros[:size]
+        pos = 0
+        while pos < full_end:
+            # a zero block is inside a run of at least block size zeros
+            run_start = data.find(zero_block, pos, full_end)
+            if run_start < 0:
+                break
+            first = -(-run_start // size) * size
+            pos = self.__get_zero_run_end(data, first, full_end)
+            zero_bytes += pos - first
+        return zero_bytes
+
+    def apply(self, payload):
+        zero_bytes = 0
+        for data in payload.iter_blocks(self.read_size):
+            zero_bytes += self.__count_zero_blocks(data)
+        return zero_bytes
+
+class DeflateSizeTransform(SegmentTransform):
+    '''Size of the segment contents compressed with deflate'''
+    name = 'deflate_size'
+
+    def __init__(self, level=6) -> None:
+        self.level = level
+
+    def apply(self, payload):
+        compressor = zlib.compressobj(self.level)
+        size = 0
+        for block in payload.iter_blocks():
+            size += len(compressor.compress(block))
+        return size + len(compressor.flush())
+
+def run_transforms(segments, transforms, jobs=None):
+    '''Returns a dict of the results of the transforms for each segment, in segment order
+
+    The segments of each transform are spread over jobs threads or processes, by
+    default one per CPU, and gathered in order so the results do not depend on it.
+    '''
+    payloads = [seg['data'] for seg in segments]
+    # the payloads sent to processes are pickled, slices of in-memory inputs would send the whole input
+    compact_payloads = None
+    results = [{} for _ in segments]
+    for transform in transforms:
+        if jobs == 1 or len(payloads) < 2:
+            values = [transform.apply(payload) for payload in payloads]
+        else:
+            workers = jobs or os.cpu_count() or 1
+            if transform.releases_gil:
+                with ThreadPoolExecutor(max_workers=workers) as executor:
+                    values = list(executor.map(transform.apply, payloads))
+            else:
+                if compact_payloads is None:
+                    compact_payloads = [payload.compact() for payload in payloads]
+                # send the segments in batches, a process per segment costs more than small segments
+                with ProcessPoolExecutor(max_workers=workers) as executor:
+                    values = list(executor.map(transform.apply, compact_payloads,
+                                               chunksize=max(1, len(payloads) // (workers * 4))))
+        for result, value in zip(results, values):
+            result[transform.name] = value
+    return results
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,151 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Module to watch the input files for changes'''
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import time
+
+# inotify event masks, see <sys/inotify.h>
+IN_MODIFY      = 0x00000002
+IN_ATTRIB      = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO    = 0x00000080
+IN_CREATE      = 0x00000100
+IN_DELETE      = 0x00000200
+IN_NONBLOCK    = 0o4000
+IN_CLOEXEC     = 0o2000000
+
+INOTIFY_WATCH_MASK = IN_MODIFY | IN_ATTRIB | IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE
+INOTIFY_EVENT = struct.Struct('iIII')
+
+class FileWatcher():
+    '''Watches a set of files using inotify, falling back to polling their stat'''
+    def __init__(self, paths, debounce=0.3, poll_interval=0.5) -> None:
+        self.paths = set(os.path.realpath(path) for path in paths)
+        self.debounce = debounce
+        self.poll_interval = poll_interval
+        self.inotify_fd = None
+        self.wd_dirs = {}
+        self.stat_list = {}
+
+        try:
+            self.__init_inotify()
+        except OSError:
+            self.inotify_fd = None
+
+        if self.inotify_fd is None:
+            self.stat_list = {path: self.__stat(path) for path in self.paths}
+
+    def __init_inotify(self):
+        libc_name = ctypes.util.find_library('c')
+        if libc_name is None:
+            return
+        libc = ctypes.CDLL(libc_name, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            return
+
+        inotify_fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if inotify_fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+
+        # watch the directories, build tools often replace the files instead of rewriting them
+        for dirname in set(os.path.dirname(path) for path in self.paths):
+            wd = libc.inotify_add_watch(inotify_fd, os.fsencode(dirname), INOTIFY_WATCH_MASK)
+            if wd < 0:
+                os.close(inotify_fd)
+                raise OSError(ctypes.get_errno(), f"inotify_add_watch failed for {dirname}")
+            self.wd_dirs[wd] = dirname
+
+        self.inotify_fd = inotify_fd
+
+    def __stat(self, path):
+        try:
+            f_stat = os.stat(path)
+        except OSError:
+            return None
+        return (f_stat.st_ino, f_stat.st_size, f_stat.st_mtime_ns)
+
+    def __read_events(self, timeout):
+        changed = set()
+        if self.inotify_fd is not None:
+            readable, _, _ = select.select([self.inotify_fd], [], [], timeout)
+            if len(readable) == 0:
+                return changed
+            try:
+                buf = os.read(self.inotify_fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            pos = 0
+            while pos + INOTIFY_EVENT.size <= len(buf):
+                wd, _, _, namelen = INOTIFY_EVENT.unpack_from(buf, pos)
+                pos += INOTIFY_EVENT.size
+                name = buf[pos:pos + namelen].rstrip(b'\0')
+                pos += namelen
+                path = os.path.join(self.wd_dirs.get(wd, ''), os.fsdecode(name))
+                if path in self.paths:
+                    changed.add(path)
+        else:
+            time.sleep(timeout)
+            for path in self.paths:
+                f_stat = self.__stat(path)
+                if f_stat != self.stat_list[path]:
+                    self.stat_list[path] = f_stat
+                    changed.add(path)
+        return changed
+
+    def wait(self):
+        '''Blocks until some files changed and stayed quiet for the debounce time, returns them'''
+        changed = set()
+        while len(changed) == 0:
+            changed = self.__read_events(self.poll_interval)
+
+        while True:
+            more = self.__read_events(self.debounce)
+            if len(more) == 0:
+                break
+            changed |= more
+
+        return changed
+
+    def close(self):
+        '''Stops watching'''
+        if self.inotify_fd is not None:
+            os.close(self.inotify_fd)
+            self.inotify_fd = None
+
+if __name__ == "__main__":
+    pass
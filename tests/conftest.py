@@ -0,0 +1,156 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Fixtures building small input ELFs for the tests'''
+
+import json
+import os
+import struct
+import subprocess
+import sys
+
+import pytest
+from elftools.elf.elffile import ELFFile
+
+from modules.multicoreelf import MultiCoreELF
+
+ELF32_HEADER_SIZE = 52
+ELF32_PH_SIZE = 32
+ELF32_SH_SIZE = 40
+PT_LOAD = 1
+SHT_PROGBITS = 1
+SHT_STRTAB = 3
+SHT_NOBITS = 8
+SHT_INIT_ARRAY = 14
+SHF_WRITE = 0x1
+SHF_ALLOC = 0x2
+
+GENIMAGE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'genimage.py')
+
+def get_section_headers(segments, sections, data_offset, strtab_offset):
+    '''Returns the section header table and string table of the (name, addr, size, type) allocated sections'''
+    names = b'\0'
+    headers = bytes(ELF32_SH_SIZE)
+    for name, addr, size, sh_type in sections:
+        # the file offset of a section follows from the segment it is in
+        offset = data_offset
+        for vaddr, data in segments:
+            if vaddr <= addr <= vaddr + len(data):
+                offset += addr - vaddr
+                break
+            offset += len(data)
+        headers += struct.pack('<IIIIIIIIII', len(names), sh_type, SHF_ALLOC | SHF_WRITE, addr, offset, size,
+                               0, 0, 4, 0)
+        names += name.encode('ascii') + b'\0'
+    headers += struct.pack('<IIIIIIIIII', len(names), SHT_STRTAB, 0, 0, strtab_offset, len(names) + 10, 0, 0, 1, 0)
+    names += b'.shstrtab\0'
+    return headers, names
+
+def write_elf32(fname, segments, entry=0, sections=None):
+    '''Writes a little endian ELF32 file with a PT_LOAD (vaddr, data) for each segment
+
+    sections are the (name, addr, size, type) allocated sections of the segments, there
+    are no section headers if it is None.
+    '''
+    data_offset = ELF32_HEADER_SIZE + ELF32_PH_SIZE * len(segments)
+    contents = b''.join(data for _, data in segments)
+    sh_table = b''
+    sh_offset = 0
+    sh_num = 0
+    if sections is not None:
+        strtab_offset = data_offset + len(contents)
+        sh_table, names = get_section_headers(segments, sections, data_offset, strtab_offset)
+        contents += names
+        contents += bytes(-len(contents) % 4)
+        sh_offset = data_offset + len(contents)
+        sh_num = len(sections) + 2
+
+    ident = b'\x7fELF' + bytes([1, 1, 1]) + bytes(9)
+    header = ident + struct.pack('<HHIIIIIHHHHHH', 2, 40, 1, entry, ELF32_HEADER_SIZE, sh_offset, 0,
+                                 ELF32_HEADER_SIZE, ELF32_PH_SIZE, len(segments), ELF32_SH_SIZE, sh_num,
+                                 max(sh_num - 1, 0))
+    pht = b''
+    offset = data_offset
+    for vaddr, data in segments:
+        pht += struct.pack('<IIIIIIII', PT_LOAD, offset, vaddr, vaddr, len(data), len(data), 5, 4)
+        offset += len(data)
+
+    with open(fname, 'wb') as file:
+        file.write(header + pht + contents + sh_table)
+    return str(fname)
+
+def run_genimage(*args):
+    '''Runs genimage.py with the arguments in a new interpreter, returns the completed process'''
+    return subprocess.run([sys.executable, GENIMAGE, *[str(arg) for arg in args]], capture_output=True,
+                          text=True, check=False)
+
+def get_image_args(cores, output, *extra):
+    '''Returns the genimage.py arguments generating output from the {core ID: input ELF} cores'''
+    return [*[f"--core-img={core_id}:{fname}" for core_id, fname in cores.items()], f"--output={output}",
+            "--merge-segments=false", "--tolerance-limit=0", "--ignore-context=false",
+            "--xip=0x60100000:0x60200000", "--xlat=", "--max_segment_size=8192", *extra]
+
+def get_pattern(size, seed=0):
+    '''Returns size bytes which differ at each offset, so misplaced data is noticed'''
+    return bytes((seed + i * 7 + (i >> 8)) & 0xFF for i in range(size))
+
+def read_load_segments(fname):
+    '''Returns the (vaddr, data) of the PT_LOAD segments of an image, in PHT order'''
+    with open(fname, 'rb') as file:
+        elf_o = ELFFile(file)
+        return [(seg['p_vaddr'], seg.data()) for seg in elf_o.iter_segments(type='PT_LOAD')]
+
+def generate_segments(inputs, ofname, **kwargs):
+    '''Generates an image of the (core ID, input ELF) inputs, returns its PT_LOAD segments'''
+    ranges = {key: kwargs.pop(key) for key in ('ignore_range', 'accept_range') if key in kwargs}
+    m_elf = MultiCoreELF(ofname=str(ofname), **ranges)
+    for core_id, fname in inputs:
+        m_elf.add_elf(f"{core_id}:{fname}")
+    kwargs.setdefault('max_segment_size', 0x10000)
+    assert m_elf.generate_multicoreelf(**kwargs) == 0
+    return read_load_segments(str(ofname))
+
+def write_xlat(path, regions):
+    '''Writes an address translation JSON with the (cpulocaladdr, socaddr, regionsize) regions of each core'''
+    cores = {}
+    for index, core_regions in enumerate(regions):
+        cores[f"core{index}"] = {"info": [{"cpulocaladdr": hex(local), "socaddr": hex(soc), "regionsize": hex(size)}
+                                          for local, soc, size in core_regions]}
+    path.write_text(json.dumps({"cores": cores}))
+    return str(path)
+
+@pytest.fixture
+def elf_factory(tmp_path):
+    '''Returns a function writing an input ELF to the test directory'''
+    def factory(name, segments, entry=0, sections=None):
+        return write_elf32(tmp_path / name, segments, entry=entry, sections=sections)
+    return factory
@@ -0,0 +1,63 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Tests of the Python API'''
+
+from modules.api import ImageOptions, SharedObject, build_image
+from conftest import get_pattern, write_elf32
+
+# without the random string note, images of the same inputs are equal
+OPTIONS = ImageOptions(add_rs_note=False)
+
+def test_core_path_with_colon(tmp_path):
+    '''An input ELF path containing the core ID delimiter is kept whole'''
+    data = get_pattern(0x100)
+    in_dir = tmp_path / "build:r5f"
+    in_dir.mkdir()
+    fname = write_elf32(in_dir / "core:0.out", [(0x1000, data)])
+
+    image = tmp_path / "image.out"
+    build_image({0: fname}, OPTIONS, output=image)
+    with open(fname, 'rb') as file:
+        assert build_image({0: file.read()}, OPTIONS) == image.read_bytes()
+
+def test_sso_list_of_sources(tmp_path):
+    '''Sources in an SSO list are used by all the cores, like a single source'''
+    core = write_elf32(tmp_path / "core0.out", [(0x1000, get_pattern(0x100))])
+    sso = write_elf32(tmp_path / "sso.out", [(0x8000, get_pattern(0x80, seed=3))])
+    with open(sso, 'rb') as file:
+        sso_data = file.read()
+
+    expected = build_image({0: core}, OPTIONS, sso=SharedObject(sso, None))
+    assert build_image({0: core}, OPTIONS, sso=[sso_data]) == expected
+    assert build_image({0: core}, OPTIONS, sso=[sso]) == expected
+    assert build_image({0: core}, OPTIONS, sso=sso_data) == expected
@@ -0,0 +1,88 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Tests of the automatic layout tuner'''
+
+import os
+
+from modules.autolayout import LayoutInput, evaluate_layout, find_best_layout, get_candidates
+from modules.multicoreelf import MultiCoreELF
+from conftest import get_image_args, get_pattern, read_load_segments, run_genimage
+
+def get_inputs(elf_factory):
+    '''Returns the (core ID, input ELF) of two cores with interleaved segments and small holes'''
+    core0 = elf_factory('core0.out', [(0x1000, get_pattern(0x900)), (0x1940, get_pattern(0x30, seed=1)),
+                                      (0x4000, get_pattern(0x200, seed=2))], entry=0x1000)
+    core1 = elf_factory('core1.out', [(0x1a00, get_pattern(0x100, seed=3)), (0x2000, get_pattern(0x10, seed=4))],
+                        entry=0x1a00)
+    return [(0, core0), (1, core1)]
+
+def test_evaluated_layouts_match_the_images(tmp_path, elf_factory):
+    '''The file size and segment count of every candidate are those of the generated image'''
+    inputs = get_inputs(elf_factory)
+    m_elf = MultiCoreELF(ofname=str(tmp_path / 'layout.out'))
+    for core_id, fname in inputs:
+        m_elf.add_elf(f"{core_id}:{fname}")
+    layout = LayoutInput(m_elf.get_layout_descriptors(), m_elf.get_elfheader_size(), len(inputs), add_rs_note=True)
+
+    for index, candidate in enumerate(get_candidates([0, 0x40, 0x1000], [0x100, 0x800])):
+        ofname = tmp_path / f"image{index}.out"
+        m_elf = MultiCoreELF(ofname=str(ofname))
+        for core_id, fname in inputs:
+            m_elf.add_elf(f"{core_id}:{fname}")
+        assert m_elf.generate_multicoreelf(max_segment_size=candidate.max_segment_size,
+                                           segmerge=candidate.segmerge, tol_limit=candidate.tol_limit,
+                                           ignore_context=candidate.ignore_context, add_rs_note=True,
+                                           order=candidate.order) == 0
+
+        file_size, seg_count, _ = evaluate_layout(layout, candidate)
+        assert (file_size, seg_count) == (os.path.getsize(ofname), len(read_load_segments(ofname))), candidate
+
+def test_best_layout_has_the_lowest_score(tmp_path, elf_factory):
+    '''The results are sorted by score and the tuned image uses the best layout'''
+    inputs = get_inputs(elf_factory)
+    m_elf = MultiCoreELF(ofname=str(tmp_path / 'layout.out'))
+    for core_id, fname in inputs:
+        m_elf.add_elf(f"{core_id}:{fname}")
+    layout = LayoutInput(m_elf.get_layout_descriptors(), m_elf.get_elfheader_size(), len(inputs))
+    candidates = get_candidates([0, 0x40, 0x1000], [0x100, 0x800])
+
+    results = find_best_layout([layout], candidates, {'segments': 1})
+    assert [result['score'] for result in results] == sorted(result['score'] for result in results)
+    assert results[0]['segments'] == min(evaluate_layout(layout, cand)[1] for cand in candidates)
+
+    output = tmp_path / 'image.out'
+    result = run_genimage(*get_image_args(dict(inputs), output, '--auto-layout',
+                                          '--auto-layout-objective=segments=1'))
+    assert result.returncode == 0, result.stdout + result.stderr
+    assert "Using --merge-segments=true" in result.stdout
+    assert len(read_load_segments(output)) == results[0]['segments']
@@ -0,0 +1,90 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Tests of the segment by segment comparison of images'''
+
+import json
+
+from modules.imagediff import diff_images
+from conftest import generate_segments, get_pattern, run_genimage
+
+def make_images(tmp_path, elf_factory, new_segments):
+    '''Generates an image of a reference core and one of the new_segments, returns both images'''
+    old_core = elf_factory('old.out', [(0x1000, get_pattern(0x3000)), (0x8000, get_pattern(0x100, seed=1))])
+    new_core = elf_factory('new.out', new_segments)
+    generate_segments([(0, old_core)], tmp_path / 'old_image.out')
+    generate_segments([(0, new_core)], tmp_path / 'new_image.out')
+    return str(tmp_path / 'old_image.out'), str(tmp_path / 'new_image.out')
+
+def test_identical_images(tmp_path, elf_factory):
+    '''Images of the same input do not differ'''
+    old, new = make_images(tmp_path, elf_factory, [(0x1000, get_pattern(0x3000)),
+                                                   (0x8000, get_pattern(0x100, seed=1))])
+    diff = diff_images(old, new)
+    assert diff['identical']
+    assert diff['unchanged'] == 2 and diff['ota_bytes'] == 0
+
+def test_changed_blocks(tmp_path, elf_factory):
+    '''A changed byte costs a block of the update, other segments are unchanged'''
+    data = bytearray(get_pattern(0x3000))
+    data[0x1800] ^= 0xFF
+    old, new = make_images(tmp_path, elf_factory, [(0x1000, bytes(data)), (0x8000, get_pattern(0x100, seed=1))])
+    diff = diff_images(old, new)
+    assert not diff['identical']
+    assert [(seg['vaddr'], seg['changed_blocks']) for seg in diff['changed']] == [(0x1000, 1)]
+    assert diff['unchanged'] == 1
+    assert diff['ota_bytes'] == 4096
+
+def test_added_removed_resized(tmp_path, elf_factory):
+    '''Segments are matched by core and address'''
+    old, new = make_images(tmp_path, elf_factory, [(0x1000, get_pattern(0x2000)),
+                                                   (0xA000, get_pattern(0x80, seed=2))])
+    diff = diff_images(old, new)
+    assert [(seg['vaddr'], seg['old_size'], seg['new_size']) for seg in diff['resized']] == [(0x1000, 0x3000, 0x2000)]
+    assert [(seg['vaddr'], seg['size']) for seg in diff['added']] == [(0xA000, 0x80)]
+    assert [(seg['vaddr'], seg['size']) for seg in diff['removed']] == [(0x8000, 0x100)]
+    assert diff['ota_bytes'] == 0x2000 + 0x80
+
+def test_diff_command(tmp_path, elf_factory):
+    '''The diff subcommand exits with 1 like cmp when the images differ and writes the JSON'''
+    old, new = make_images(tmp_path, elf_factory, [(0x1000, get_pattern(0x3000)),
+                                                   (0x8000, get_pattern(0x100, seed=3))])
+    assert run_genimage('diff', old, old).returncode == 0
+
+    json_fname = tmp_path / 'diff.json'
+    result = run_genimage('diff', old, new, '--json', str(json_fname))
+    assert result.returncode == 1, result.stderr
+    assert "1 changed" in result.stdout
+    assert json.loads(json_fname.read_text())['changed'][0]['vaddr'] == 0x8000
+
+if __name__ == "__main__":
+    pass
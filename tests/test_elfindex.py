@@ -0,0 +1,75 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Tests of the persistent index of parsed input ELFs'''
+
+import os
+
+from modules.elfindex import ElfIndex
+from modules.multicoreelf import MultiCoreELF
+from conftest import get_pattern, read_load_segments
+
+def test_entry_is_used_while_the_file_is_unchanged(tmp_path, elf_factory):
+    '''A stored entry is found again until the file changes'''
+    core0 = elf_factory('core0.out', [(0x1000, get_pattern(0x100))])
+    index = ElfIndex(str(tmp_path / 'idx'))
+    index.store(core0, {"entry": 1})
+    assert index.lookup(core0) == {"entry": 1}
+
+    elf_factory('core0.out', [(0x1000, get_pattern(0x200))])
+    os.utime(core0, ns=(1, 1))
+    assert index.lookup(core0) is None
+
+def test_file_rewritten_while_parsed_is_not_stored_as_new(tmp_path, elf_factory):
+    '''An entry stored with the key taken before parsing does not match the rewritten file'''
+    core0 = elf_factory('core0.out', [(0x1000, get_pattern(0x100))])
+    index = ElfIndex(str(tmp_path / 'idx'))
+    key = index.get_key(core0)
+
+    # the input is rebuilt between the parse and the store
+    elf_factory('core0.out', [(0x1000, get_pattern(0x200))])
+    os.utime(core0, ns=(2 * 10**18, 2 * 10**18))
+    index.store(core0, {"entry": "old"}, key=key)
+
+    assert index.lookup(core0) is None
+
+def test_images_from_the_index_match(tmp_path, elf_factory):
+    '''An image generated with the inputs found in the index is the same as without it'''
+    core0 = elf_factory('core0.out', [(0x1000, get_pattern(0x1800)), (0x4000, get_pattern(0x80))])
+    segs = []
+    for name in ('a', 'b', 'c'):
+        m_elf = MultiCoreELF(ofname=str(tmp_path / name),
+                             elf_index=ElfIndex(str(tmp_path / 'idx')) if name != 'a' else None)
+        m_elf.add_elf(f"0:{core0}")
+        assert m_elf.generate_multicoreelf(max_segment_size=0x1000) == 0
+        segs.append(read_load_segments(str(tmp_path / name)))
+    assert segs[0] == segs[1] == segs[2]
@@ -0,0 +1,177 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Tests of the raw, Intel HEX and S-record output formats'''
+
+import os
+import struct
+
+from modules.args import xip_addr_type
+from modules.emit import RawImageEmitter
+from modules.multicoreelf import MultiCoreELF
+from conftest import get_image_args, get_pattern, read_load_segments, run_genimage, write_xlat
+
+XIP_START = 0x60100000
+
+def parse_ihex(fname):
+    '''Returns the {address: byte} memory of an Intel HEX file and its records'''
+    memory = {}
+    records = []
+    upper = 0
+    with open(fname, encoding='ascii') as file:
+        for line in file:
+            rec = bytes.fromhex(line.strip()[1:])
+            assert sum(rec) & 0xFF == 0
+            count, addr, rtype, data = rec[0], int.from_bytes(rec[1:3], 'big'), rec[3], rec[4:-1]
+            assert len(data) == count
+            records.append((rtype, addr, data))
+            if rtype == 0x04:
+                upper = int.from_bytes(data, 'big') << 16
+            elif rtype == 0x00:
+                for index, value in enumerate(data):
+                    memory[upper + addr + index] = value
+    return memory, records
+
+def parse_srec(fname):
+    '''Returns the {address: byte} memory of an S-record file and its records'''
+    memory = {}
+    records = []
+    with open(fname, encoding='ascii') as file:
+        for line in file:
+            line = line.strip()
+            rec = bytes.fromhex(line[2:])
+            assert (sum(rec) + 1) & 0xFF == 0 and rec[0] == len(rec) - 1
+            rtype = line[1]
+            addr_size = 2 if rtype in '0159' else 4
+            addr = int.from_bytes(rec[1:1 + addr_size], 'big')
+            data = rec[1 + addr_size:-1]
+            records.append((rtype, addr, data))
+            if rtype == '3':
+                for index, value in enumerate(data):
+                    memory[addr + index] = value
+    return memory, records
+
+def get_memory(segments):
+    '''Returns the {address: byte} memory of (address, data) segments'''
+    return {addr + index: value for addr, data in segments for index, value in enumerate(data)}
+
+def generate(tmp_path, elf_factory):
+    '''Generates the images of two cores with segments in and out of the XIP range in all formats'''
+    core0 = elf_factory("core0.out", [(0x1000, get_pattern(0x2345)), (0x0001FFF0, get_pattern(0x40, seed=1)),
+                                      (XIP_START + 0x100, get_pattern(0x200, seed=2))], entry=0x1000)
+    core1 = elf_factory("core1.out", [(0x80000, get_pattern(0x100, seed=3)),
+                                      (XIP_START + 0x1000, get_pattern(0x80, seed=4))], entry=0x80000)
+    output = tmp_path / "image.out"
+    result = run_genimage(*get_image_args({0: core0, 1: core1}, output,
+                                          "--format=raw", "--format=ihex", "--format=srec"))
+    assert result.returncode == 0, result.stdout + result.stderr
+    return output
+
+def test_raw_image_of_xip_range(tmp_path, elf_factory):
+    '''The raw image starts at the XIP start, the gaps are erased flash'''
+    output = generate(tmp_path, elf_factory)
+    raw = (tmp_path / "image.out_xip.bin").read_bytes()
+
+    expected = bytearray(b'\xFF' * (0x1000 + 0x80))
+    expected[0x100:0x300] = get_pattern(0x200, seed=2)
+    expected[0x1000:0x1080] = get_pattern(0x80, seed=4)
+    assert raw == expected
+    # the main image is not in an address range
+    assert not (tmp_path / "image.out.bin").exists()
+    assert read_load_segments(f"{output}_xip") == [(XIP_START + 0x100, get_pattern(0x200, seed=2)),
+                                                   (XIP_START + 0x1000, get_pattern(0x80, seed=4))]
+
+def test_ihex_matches_the_image(tmp_path, elf_factory):
+    '''The Intel HEX records hold the segments of each image, across 64 KB boundaries'''
+    output = generate(tmp_path, elf_factory)
+    for image in (output, f"{output}_xip"):
+        memory, records = parse_ihex(f"{image}.hex")
+        assert memory == get_memory(read_load_segments(image))
+        assert records[-1] == (0x01, 0, b'')
+        assert records[-2] == (0x05, 0, (0x1000).to_bytes(4, 'big'))
+        assert all(len(data) <= 32 for rtype, _, data in records if rtype == 0x00)
+
+def test_srec_matches_the_image(tmp_path, elf_factory):
+    '''The S-records hold the segments of each image and the entry point of the main core'''
+    output = generate(tmp_path, elf_factory)
+    for image in (output, f"{output}_xip"):
+        memory, records = parse_srec(f"{image}.srec")
+        assert memory == get_memory(read_load_segments(image))
+        assert records[0][0] == '0'
+    assert records[-1][:2] == ('7', 0x1000)
+
+def get_entry(fname):
+    '''Returns the entry point in the ELF32 header of an image'''
+    with open(fname, 'rb') as file:
+        return struct.unpack_from('<I', file.read(28), 24)[0]
+
+def test_formats_with_translation(tmp_path, elf_factory):
+    '''The XIP range is in local addresses, the outputs are at the translated SoC addresses'''
+    core2 = elf_factory("core2.out", [(0x100, get_pattern(0x200)), (0x80000, get_pattern(0x100, seed=1))],
+                        entry=0x100)
+    xlat = write_xlat(tmp_path / "xlat.json", [[(0x0, 0x0, 0x10000)], [(0x0, 0x8000, 0x8000)],
+                                              [(0x0, 0x78400000, 0x10000), (0x80000, 0x78500000, 0x10000)]])
+    output = tmp_path / "image.out"
+    result = run_genimage(*get_image_args({2: core2}, output, "--xip=0x0:0x10000", f"--xlat={xlat}",
+                                          "--format=raw", "--format=ihex", "--format=srec"))
+    assert result.returncode == 0, result.stdout + result.stderr
+
+    assert read_load_segments(f"{output}_xip") == [(0x78400100, get_pattern(0x200))]
+    assert (tmp_path / "image.out_xip.bin").read_bytes() == b'\xFF' * 0x100 + get_pattern(0x200)
+    for image in (output, f"{output}_xip"):
+        memory, records = parse_ihex(f"{image}.hex")
+        assert memory == get_memory(read_load_segments(image))
+        assert records[-2] == (0x05, 0, get_entry(image).to_bytes(4, 'big'))
+        memory, records = parse_srec(f"{image}.srec")
+        assert memory == get_memory(read_load_segments(image))
+        assert records[-1][:2] == ('7', get_entry(image))
+    assert min(parse_ihex(f"{output}.hex")[0]) == 0x78500000
+
+def test_segment_partly_in_the_raw_range_fails(tmp_path, elf_factory):
+    '''A segment only partly inside the raw image range fails before any output is written'''
+    core0 = elf_factory("core0.out", [(0x100, get_pattern(0x200))])
+    output = tmp_path / "image.out"
+    m_elf = MultiCoreELF(ofname=str(output), accept_range=xip_addr_type('0x0:0x10000'))
+    m_elf.add_elf(f"0:{core0}")
+    emitter = RawImageEmitter(f"{output}.bin", xip_addr_type('0x0:0x200'))
+    assert m_elf.generate_multicoreelf(max_segment_size=0x10000, emitters=[emitter]) == -1
+    assert not os.path.exists(output) and not os.path.exists(f"{output}.bin")
+
+def test_addresses_above_4gb_fail_before_writing(tmp_path, elf_factory):
+    '''Segments the 32 bit records can't address fail the build before the image is written'''
+    core0 = elf_factory("core0.out", [(0xFFFFFF00, get_pattern(0x200))])
+    for out_format in ('ihex', 'srec'):
+        output = tmp_path / f"{out_format}.out"
+        result = run_genimage(*get_image_args({0: core0}, output, f"--format={out_format}"))
+        assert result.returncode != 0
+        assert "[ERROR] : Segment at 0xffffff00 is out of the" in result.stdout
+        assert not output.exists()
@@ -0,0 +1,84 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Tests of the genimage.py command line'''
+
+import pytest
+
+import genimage
+from conftest import get_pattern
+
+def get_argv(core_img, output, *extra):
+    '''Returns the arguments generating output from core 0 with an XIP partition'''
+    return [f"--core-img=0:{core_img}", f"--output={output}", "--merge-segments=false", "--tolerance-limit=0",
+            "--ignore-context=false", "--xip=0x60100000:0x60200000", "--xlat=", "--max_segment_size=8192",
+            *extra]
+
+def test_missing_note_file(tmp_path, elf_factory, capsys):
+    '''A missing note file fails before the XIP image is written'''
+    core = elf_factory("core0.out", [(0x1000, get_pattern(0x100)), (0x60100000, get_pattern(0x100, seed=1))])
+    output = tmp_path / "image.out"
+
+    with pytest.raises(SystemExit) as err:
+        genimage.run(get_argv(core, output, f"--note=calib:0x10:{tmp_path / 'missing.bin'}"))
+    assert err.value.code != 0
+    assert "missing.bin" in capsys.readouterr().err
+    assert not (tmp_path / "image.out_xip").exists()
+    assert not output.exists()
+
+def test_note_file_removed_after_parsing(tmp_path, elf_factory, monkeypatch, capsys):
+    '''A note file removed after the arguments are parsed is reported before any image is written'''
+    core = elf_factory("core0.out", [(0x1000, get_pattern(0x100)), (0x60100000, get_pattern(0x100, seed=1))])
+    note_file = tmp_path / "calib.bin"
+    note_file.write_bytes(b'calib')
+    output = tmp_path / "image.out"
+
+    arguments = genimage.get_args(get_argv(core, output, f"--note=calib:0x10:{note_file}"))
+    note_file.unlink()
+    monkeypatch.setattr(genimage, "get_args", lambda argv: arguments)
+
+    assert genimage.run([]) == 1
+    assert "[ERROR]" in capsys.readouterr().out
+    assert not (tmp_path / "image.out_xip").exists()
+    assert not output.exists()
+
+def test_failed_image_exit_code(tmp_path, elf_factory):
+    '''An image which cannot be generated makes the exit code non-zero'''
+    core = elf_factory("core0.out", [(0x1000, get_pattern(0x100))])
+    sso = elf_factory("sso.out", [(0x8000, get_pattern(0x80, seed=2))])
+    output = tmp_path / "image.out"
+
+    # the SSO is used by core 1, which has no input ELF
+    assert genimage.run(get_argv(core, output, f"--sso=0,1:{sso}")) == 1
+    assert not output.exists()
+    assert genimage.run(get_argv(core, output, f"--sso=0:{sso}")) == 0
+    assert output.exists()
@@ -0,0 +1,94 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Tests of reading generated images back and of the load time simulator'''
+
+import json
+
+import pytest
+
+from modules.image import MultiCoreELFImage
+from modules.loadsim import COMMON_CONTEXT, LoadProfile, get_load_report, simulate_load
+from conftest import generate_segments, get_pattern, read_load_segments
+
+def write_profile(path, **figures):
+    '''Writes a load profile with a flash reading a byte per microsecond'''
+    data = {"name": "test", "flash_bandwidth": 1e6, "boot_overhead_us": 100, "segment_overhead_us": 10,
+            "note_overhead_us": 5, "dma_alignment": 1}
+    data.update(figures)
+    path.write_text(json.dumps(data))
+    return str(path)
+
+@pytest.fixture
+def image(tmp_path, elf_factory):
+    '''Image of two cores, the segment of core 1 has an odd size'''
+    core0 = elf_factory('core0.out', [(0x1000, get_pattern(0x200)), (0x3000, get_pattern(0x100, seed=1))],
+                        entry=0x1000)
+    core1 = elf_factory('core1.out', [(0x8000, get_pattern(0x101, seed=2))], entry=0x8004)
+    ofname = tmp_path / 'image.out'
+    generate_segments([(0, core0), (1, core1)], ofname)
+    return str(ofname)
+
+def test_image_is_read_back(image):
+    '''The segments, their cores and the entry points are read from the PHT and the notes'''
+    with MultiCoreELFImage(image) as mc_image:
+        load_segs = mc_image.get_load_segments()
+        assert [(seg['vaddr'], bytes(mc_image.data(seg))) for seg in load_segs] == read_load_segments(image)
+        assert [seg['core'] for seg in load_segs] == [0, 0, 1]
+        assert mc_image.entry_points == {0: 0x1000, 1: 0x8004}
+
+def test_load_time_per_core(tmp_path, image):
+    '''The time of each core is its segment overheads and transfers, the rest is common'''
+    profile = LoadProfile(write_profile(tmp_path / 'profile.json'))
+    with MultiCoreELFImage(image) as mc_image:
+        times = simulate_load(mc_image, profile)
+        notes = [seg for seg in mc_image.segments if seg['type'] == 4]
+        headers_size = mc_image.elfheader.header.e_phoff + len(mc_image.segments) * mc_image.ph_size
+
+    assert times[0] == pytest.approx(10 + 0x200 + 10 + 0x100)
+    assert times[1] == pytest.approx(10 + 0x101)
+    assert times[COMMON_CONTEXT] == pytest.approx(100 + headers_size + sum(5 + seg['filesz'] for seg in notes))
+
+def test_unaligned_segments_are_slower(tmp_path, image):
+    '''Segments not aligned for the DMA pay the penalty and the CPU copy bandwidth'''
+    profile = LoadProfile(write_profile(tmp_path / 'profile.json', dma_alignment=4, unaligned_penalty_us=7,
+                                        unaligned_bandwidth=5e5, aes_enabled=True, aes_bandwidth=2e6))
+    with MultiCoreELFImage(image) as mc_image:
+        assert all(seg['offset'] % 4 == 0 for seg in mc_image.get_load_segments())
+        times = simulate_load(mc_image, profile)
+
+    assert times[0] == pytest.approx(10 + 0x200 * 1.5 + 10 + 0x100 * 1.5)
+    assert times[1] == pytest.approx(10 + 7 + 0x101 * 2.5)
+
+    report = get_load_report(image, profile)
+    assert report['segments'] == 3 and report['load_bytes'] == 0x200 + 0x100 + 0x101
+    assert report['total_us'] == pytest.approx(sum(times.values()), abs=0.01)
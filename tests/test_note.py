@@ -0,0 +1,103 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Tests of the note encoding against the construct based encoder it replaced'''
+
+import pytest
+from construct import Struct, Int32ul, Int32ub, Int64ul, Int64ub, Array, IfThenElse, Padding, Byte, Bytes, If
+
+from modules.note import NoteTypes, CustomNote, get_note_vendor, get_note_segment_map, \
+    get_note_entrypoints, get_note_custom, get_note_size, parse_notes
+
+def get_construct_ep_format(islittle, is64):
+    '''Entry point item of the construct based encoder'''
+    uint32_t = IfThenElse(islittle, Int32ul, Int32ub)
+    uint64_t = IfThenElse(islittle, Int64ul, Int64ub)
+    return Struct("core_id" / uint32_t, "entry_point" / IfThenElse(is64, uint64_t, uint32_t))
+
+def get_construct_note(islittle, ntype, name, namesz, desc, itemtype=Byte):
+    '''Note built like the construct based encoder, the desc is a list of items'''
+    uint32_t = IfThenElse(islittle, Int32ul, Int32ub)
+    descsz = len(desc) * itemtype.sizeof()
+    note_format = Struct(
+        "namesz" / uint32_t,
+        "descsz" / uint32_t,
+        "type" / uint32_t,
+        "name" / Bytes(len(name)),
+        Padding((4 - len(name) % 4) % 4),
+        "desc" / If((descsz != 0), Array(len(desc), itemtype)),
+        Padding((4 - descsz % 4) % 4)
+    )
+    return bytearray(note_format.build({"namesz": namesz, "descsz": descsz, "type": ntype,
+                                        "name": name.encode('ascii'), "desc": desc}))
+
+@pytest.mark.parametrize('islittle', [True, False])
+def test_vendor_note(islittle):
+    '''The vendor note is unchanged'''
+    name = "Texas Instruments "
+    assert get_note_vendor(islittle) == get_construct_note(islittle, NoteTypes.VENDOR_ID.value, name, len(name), [])
+
+@pytest.mark.parametrize('islittle', [True, False])
+@pytest.mark.parametrize('seglist', [[], [0], [0, 1, 2], [0, 1, 2, 3, 0xFF]])
+def test_segment_map_note(islittle, seglist):
+    '''The segment map note is unchanged for descriptors of any padding'''
+    name = "Segment Map "
+    assert get_note_segment_map(islittle, seglist) == \
+        get_construct_note(islittle, NoteTypes.SEGMENT_MAP.value, name, len(name), seglist)
+
+@pytest.mark.parametrize('islittle', [True, False])
+@pytest.mark.parametrize('is64', [True, False])
+def test_entry_point_note(islittle, is64):
+    '''The entry point note is unchanged for 32 and 64 bit entry points'''
+    name = "Entry Points "
+    eplist = {'0': 0x70000040, '1': 0x70040000, '3': 0x1234}
+    items = [{"core_id": int(core_id), "entry_point": entry} for core_id, entry in eplist.items()]
+    assert get_note_entrypoints(islittle, is64, eplist) == \
+        get_construct_note(islittle, NoteTypes.ENTRY_POINTS.value, name, len(name), items,
+                           itemtype=get_construct_ep_format(islittle, is64))
+
+@pytest.mark.parametrize('islittle', [True, False])
+@pytest.mark.parametrize('data', [b'', b'a', b'abcd', b'calibration'])
+def test_custom_note(islittle, data):
+    '''The custom note is unchanged except namesz, which now counts the space ending the name'''
+    note = CustomNote('calib', data)
+    assert get_note_custom(islittle, note) == \
+        get_construct_note(islittle, NoteTypes.CUSTOM.value, 'calib ', len('calib '), list(data))
+
+def test_note_size_and_parse():
+    '''get_note_size gives the encoded size and parse_notes reads the notes back'''
+    buf = get_note_vendor(True) + get_note_segment_map(True, [0, 1, 1])
+    assert len(buf) == get_note_size("Texas Instruments ", 0) + get_note_size("Segment Map ", 3)
+    notes = parse_notes(True, bytes(buf))
+    assert [(ntype, name) for ntype, name, _ in notes] == \
+        [(NoteTypes.VENDOR_ID.value, b"Texas Instruments "), (NoteTypes.SEGMENT_MAP.value, b"Segment Map ")]
+    assert bytes(notes[1][2]) == bytes([0, 1, 1])
@@ -0,0 +1,89 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Tests of the segment overlap check'''
+
+import random
+
+from modules.overlap import LoadSpan, find_collisions, check_overlaps, has_collisions
+from conftest import get_image_args, get_pattern, run_genimage
+
+def brute_force_overlaps(spans):
+    '''Returns the number of overlapping pairs by comparing all of them'''
+    count = 0
+    for index, first in enumerate(spans):
+        for second in spans[index + 1:]:
+            if first.start < second.end and second.start < first.end:
+                count += 1
+    return count
+
+def test_overlap_and_near_collision():
+    '''Overlaps are sized, near collisions only reported between different cores'''
+    spans = [LoadSpan('a', 0, 0x1000, 0x1100), LoadSpan('a', 1, 0x10C0, 0x1200),
+             LoadSpan('a', 0, 0x1210, 0x1300), LoadSpan('a', 0, 0x1308, 0x1400)]
+    result = find_collisions(spans, margin=0x20)
+    assert [(first.core, second.core, size) for first, second, size in result['overlaps']] == [(0, 1, 0x40)]
+    # 0x1200-0x1210 are too close, 0x1300-0x1308 belong to the same core
+    assert [(first.start, second.start, gap) for first, second, gap in result['near']] == [(0x10C0, 0x1210, 0x10)]
+    assert result['overlap_count'] == 1 and result['near_count'] == 1
+
+def test_sweep_matches_brute_force():
+    '''The sweep finds every overlapping pair'''
+    rand = random.Random(0)
+    spans = []
+    for _ in range(300):
+        start = rand.randrange(0, 0x100000, 4)
+        spans.append(LoadSpan('a', rand.randrange(3), start, start + rand.randrange(1, 0x2000)))
+    assert find_collisions(spans)['overlap_count'] == brute_force_overlaps(spans)
+
+def test_local_views_are_independent():
+    '''Cores may use the same local addresses, the load addresses must not collide'''
+    local_spans = [LoadSpan('a', 0, 0x0, 0x100), LoadSpan('a', 1, 0x0, 0x100)]
+    load_spans = [LoadSpan('a', 0, 0x70000000, 0x70000100), LoadSpan('a', 1, 0x78000000, 0x78000100)]
+    assert not has_collisions(check_overlaps(local_spans, load_spans))
+
+def test_check_overlaps_fails_the_build(tmp_path, elf_factory):
+    '''--check-overlaps=error exits with 1 when two cores load to the same addresses'''
+    core0 = elf_factory('core0.out', [(0x1000, get_pattern(0x100))])
+    core1 = elf_factory('core1.out', [(0x1080, get_pattern(0x100, seed=1))])
+    args = get_image_args({0: core0, 1: core1}, tmp_path / 'image.out')
+
+    result = run_genimage(*args, '--check-overlaps=warn')
+    assert result.returncode == 0, result.stderr
+    assert "[WARNING] : Overlap of 128 bytes at load addresses" in result.stdout
+
+    result = run_genimage(*args, '--check-overlaps=error')
+    assert result.returncode == 1
+    assert "[ERROR] : Overlap of 128 bytes at load addresses" in result.stdout
+
+if __name__ == "__main__":
+    pass
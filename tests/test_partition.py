@@ -0,0 +1,76 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Tests of the routing of segments to address range partitions'''
+
+from collections import namedtuple
+
+from conftest import generate_segments, get_image_args, get_pattern, read_load_segments, run_genimage
+
+AddressRange = namedtuple('AddressRange', ['start', 'end'])
+
+def test_partition_boundaries_split_segments(tmp_path, elf_factory):
+    '''A segment crossing a partition is split between the partition and the main image'''
+    data = get_pattern(0x2000)
+    core0 = elf_factory('core0.out', [(0x1000, data)])
+    partition = AddressRange(0x1800, 0x2800)
+
+    part_segs = generate_segments([(0, core0)], tmp_path / 'out_p', accept_range=partition)
+    main_segs = generate_segments([(0, core0)], tmp_path / 'out', ignore_range=[partition])
+
+    assert part_segs == [(0x1800, data[0x800:0x1800])]
+    assert main_segs == [(0x1000, data[:0x800]), (0x2800, data[0x1800:])]
+
+def test_chunks_follow_the_routed_ranges(tmp_path, elf_factory):
+    '''Chunking by the maximum segment size starts again after a partition boundary'''
+    data = get_pattern(0x2000)
+    core0 = elf_factory('core0.out', [(0x1000, data)])
+    segs = generate_segments([(0, core0)], tmp_path / 'out', ignore_range=[AddressRange(0x1000, 0x1100)],
+                    max_segment_size=0x800)
+
+    assert [(vaddr, len(seg_data)) for vaddr, seg_data in segs] == \
+        [(0x1100, 0x800), (0x1900, 0x800), (0x2100, 0x800), (0x2900, 0x700)]
+    assert b''.join(seg_data for _, seg_data in segs) == data[0x100:]
+
+def test_partition_images(tmp_path, elf_factory):
+    '''Each partition gets an image of its own and the other segments go to the main image'''
+    core0 = elf_factory('core0.out', [(0x1000, get_pattern(0x100)), (0x70000000, get_pattern(0x200, seed=1)),
+                                      (0x60100000, get_pattern(0x80, seed=2))])
+    core1 = elf_factory('core1.out', [(0x70001000, get_pattern(0x100, seed=3))])
+    output = tmp_path / 'image.out'
+    result = run_genimage(*get_image_args({0: core0, 1: core1}, output, '--partition=ospi:0x70000000:0x70010000'))
+    assert result.returncode == 0, result.stdout + result.stderr
+
+    assert read_load_segments(output) == [(0x1000, get_pattern(0x100))]
+    assert read_load_segments(f"{output}_xip") == [(0x60100000, get_pattern(0x80, seed=2))]
+    assert read_load_segments(f"{output}_ospi") == [(0x70000000, get_pattern(0x200, seed=1)),
+                                                    (0x70001000, get_pattern(0x100, seed=3))]
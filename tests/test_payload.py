@@ -0,0 +1,128 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Tests of the segment payload extents'''
+
+from modules.payload import Payload, FileWriter, ObjectWriter
+
+def test_slice_of_file_extent(tmp_path):
+    '''A slice of a file range reads the same bytes as the file'''
+    data = bytes(range(256)) * 4
+    fname = tmp_path / 'in.bin'
+    fname.write_bytes(data)
+
+    payload = Payload.from_file(str(fname), 100, 800)
+    assert payload.read() == data[100:900]
+    assert payload.slice(50, 300).read() == data[150:450]
+    assert payload.slice(50, 300).extents == [(str(fname), 150, 300)]
+
+def test_extend_round_trip(tmp_path):
+    '''Payloads built by extending and sliced back give the original parts'''
+    fname = tmp_path / 'in.bin'
+    fname.write_bytes(bytes(range(200)))
+    file_part = Payload.from_file(str(fname), 10, 100)
+    mem_part = Payload.from_bytes(b'abcdefgh')
+
+    payload = Payload.from_file(str(fname), 10, 100)
+    payload.extend_zeros(16)
+    payload.extend(mem_part)
+    payload.extend(Payload.from_file(str(fname), 110, 20))
+
+    assert len(payload) == 100 + 16 + 8 + 20
+    assert payload.read() == bytes(range(10, 110)) + bytes(16) + b'abcdefgh' + bytes(range(110, 130))
+    assert payload.slice(0, 100).read() == file_part.read()
+    assert payload.slice(100, 16).read() == bytes(16)
+    assert payload.slice(116, 8).read() == b'abcdefgh'
+
+def test_contiguous_extents_are_coalesced(tmp_path):
+    '''Appending the next range of the same file or more zeros extends the last extent'''
+    fname = str(tmp_path / 'in.bin')
+    payload = Payload.from_file(fname, 0, 10)
+    payload.add_extent(fname, 10, 10)
+    payload.extend_zeros(4)
+    payload.extend_zeros(4)
+    assert payload.extents == [(fname, 0, 20), (None, 0, 8)]
+
+def test_slices_cover_the_payload():
+    '''Consecutive slices across extent boundaries join back to the whole payload'''
+    payload = Payload.from_bytes(b'0123456789')
+    payload.extend_zeros(5)
+    payload.extend(Payload.from_bytes(b'abcdef'))
+    whole = payload.read()
+    for size in (1, 3, 4, 7, 21):
+        parts = b''.join(bytes(payload.slice(start, min(size, len(payload) - start)).read())
+                         for start in range(0, len(payload), size))
+        assert parts == whole
+
+def test_file_writer_writes_payloads(tmp_path):
+    '''File ranges, zero padding and in-memory data are written in order, trailing holes included'''
+    fname = tmp_path / 'in.bin'
+    fname.write_bytes(bytes(range(256)) * 64)
+    payload = Payload.from_file(str(fname), 5, 10000)
+    payload.extend_zeros(5000)
+    payload.extend(Payload.from_bytes(b'tail'))
+    payload.extend_zeros(3000)
+
+    out_name = tmp_path / 'out.bin'
+    with FileWriter(str(out_name)) as writer:
+        writer.write(b'head')
+        writer.write(payload)
+    assert out_name.read_bytes() == b'head' + payload.read()
+
+def test_copy_is_independent(tmp_path):
+    '''Extending a copy does not change the payload it was copied from'''
+    fname = str(tmp_path / 'in.bin')
+    payload = Payload.from_file(fname, 0, 10)
+    copied = payload.copy()
+    copied.extend_zeros(6)
+    assert len(payload) == 10 and payload.extents == [(fname, 0, 10)]
+    assert len(copied) == 16
+
+def test_iter_blocks():
+    '''Blocks are consecutive and of at most the block size'''
+    payload = Payload.from_bytes(bytes(range(100)))
+    blocks = list(payload.iter_blocks(32))
+    assert [len(block) for block in blocks] == [32, 32, 32, 4]
+    assert b''.join(blocks) == bytes(range(100))
+
+def test_object_writer_writes_payloads(tmp_path):
+    '''Payloads written to a file object give the payload bytes'''
+    fname = tmp_path / 'in.bin'
+    fname.write_bytes(b'xyz' * 10)
+    payload = Payload.from_file(str(fname), 3, 9)
+    payload.extend_zeros(3)
+
+    out_name = tmp_path / 'out.bin'
+    with open(out_name, 'wb') as file, ObjectWriter(file) as writer:
+        writer.write(b'head')
+        writer.write(payload)
+    assert out_name.read_bytes() == b'head' + b'xyz' * 3 + bytes(3)
@@ -0,0 +1,109 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Tests of the pipelined mode'''
+
+import io
+import os
+import time
+
+from modules.pipeline import ElfPrefetcher
+from conftest import get_image_args, get_pattern, read_load_segments, run_genimage
+
+def test_pipelined_image_matches(tmp_path, elf_factory):
+    '''The reader and writer threads produce the same images as the sequential mode'''
+    cores = {}
+    for core_id in range(3):
+        cores[core_id] = elf_factory(f"core{core_id}.out", [
+            (0x10000 * (core_id + 1), get_pattern(0x3000, seed=core_id)),
+            (0x10000 * (core_id + 1) + 0x4000, get_pattern(0x10, seed=core_id + 3)),
+            (0x60100000 + 0x1000 * core_id, get_pattern(0x400, seed=core_id + 6))])
+
+    outputs = {}
+    for depth in (0, 2):
+        output = tmp_path / f"image{depth}.out"
+        result = run_genimage(*get_image_args(cores, output, f"--pipeline-depth={depth}"))
+        assert result.returncode == 0, result.stdout + result.stderr
+        outputs[depth] = output
+
+    for suffix in ("", "_xip"):
+        sequential = f"{outputs[0]}{suffix}"
+        pipelined = f"{outputs[2]}{suffix}"
+        assert read_load_segments(pipelined) == read_load_segments(sequential)
+        assert os.path.getsize(pipelined) == os.path.getsize(sequential)
+
+def test_prefetched_inputs_stay_files(tmp_path):
+    '''Input files are handed over as open files for their segments to stay file-backed'''
+    fname = tmp_path / 'core0.out'
+    fname.write_bytes(b'x' * 100)
+    items = list(ElfPrefetcher({'0': str(fname), '1': b'in memory'}))
+    assert [core_id for core_id, _ in items] == ['0', '1']
+    assert items[0][1].name == str(fname) and items[0][1].read() == b'x' * 100
+    assert isinstance(items[1][1], io.BytesIO)
+    for _, stream in items:
+        stream.close()
+
+def write_inputs(tmp_path, count, size):
+    '''Writes count input files of size bytes, returns the file list of a prefetcher'''
+    file_list = {}
+    for index in range(count):
+        fname = tmp_path / f"in{index}.bin"
+        fname.write_bytes(bytes(size))
+        file_list[str(index)] = str(fname)
+    return file_list
+
+def test_prefetch_bounded_by_bytes(tmp_path):
+    '''The reader opens files ahead of the parser up to the byte bound, at least one at a time'''
+    prefetcher = ElfPrefetcher(write_inputs(tmp_path, 4, 1000), max_bytes=1500)
+    streams = []
+    for _, stream in prefetcher:
+        # give the reader time to run ahead
+        time.sleep(0.05)
+        assert prefetcher.pending_bytes <= 1000
+        streams.append(stream)
+    assert len(streams) == 4
+    for stream in streams:
+        stream.close()
+
+def test_prefetch_stopped_early_closes_files(tmp_path):
+    '''Files opened ahead of a parser which stops are closed'''
+    prefetcher = ElfPrefetcher(write_inputs(tmp_path, 3, 10))
+    items = iter(prefetcher)
+    _, first = next(items)
+    time.sleep(0.05)
+    opened = [item[1] for item, _ in prefetcher.items if item is not None]
+    items.close()
+    first.close()
+    assert len(opened) == 2 and all(stream.closed for stream in opened)
+
+if __name__ == "__main__":
+    pass
@@ -0,0 +1,68 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Tests of the layout report'''
+
+import json
+
+from elftools.elf.elffile import ELFFile
+
+from conftest import generate_segments, get_pattern, write_xlat
+
+def test_layout_report(tmp_path, elf_factory):
+    '''The report counts the bytes and segments of each core, the padding, the gaps and the translations'''
+    core0 = elf_factory('core0.out', [(0x1000, get_pattern(0x1000)), (0x2080, get_pattern(0x80, seed=1))])
+    core1 = elf_factory('core1.out', [(0x90000, get_pattern(0x100, seed=2))])
+    xlat = write_xlat(tmp_path / 'xlat.json', [[], [(0x90000, 0x70090000, 0x10000)]])
+    ofname = tmp_path / 'image.out'
+    generate_segments([(0, core0), (1, core1)], ofname, max_segment_size=0x800, segmerge=True, tol_limit=0x100,
+                      xlat_file_path=xlat, report=True)
+
+    with open(f"{ofname}.report.json", encoding='utf-8') as file:
+        report = json.load(file)
+    with open(ofname, 'rb') as file:
+        segs = [seg.header for seg in ELFFile(file).iter_segments(type='PT_LOAD')]
+
+    assert report['file_size'] == ofname.stat().st_size
+    assert report['cores']['0'] == {"bytes": 0x1080, "load_segments": 2, "chunked_segments": 3}
+    assert report['cores']['1'] == {"bytes": 0x100, "load_segments": 1, "chunked_segments": 1}
+    assert report['segments'] == {"input_load": 3, "after_chunking": 4, "after_merging": len(segs)}
+    # the 0x80 byte hole of core 0 is merged
+    assert report['padding']['merge_zero_padding'] == sum(seg['p_filesz'] for seg in segs) - 0x1180 == 0x80
+    # the chunks are translated before they are merged
+    assert report['xlat'] == {"hits": 1, "passes": 3}
+
+    ends = sorted((seg['p_paddr'], seg['p_paddr'] + seg['p_filesz']) for seg in segs)
+    gaps = sorted(((end, start) for (_, end), (start, _) in zip(ends, ends[1:]) if start > end),
+                  key=lambda gap: gap[0] - gap[1])
+    assert [(int(gap['start'], 16), int(gap['end'], 16)) for gap in report['largest_gaps']] == gaps
+    assert "Largest gaps" in (tmp_path / 'image.out.report.txt').read_text(encoding='utf-8')
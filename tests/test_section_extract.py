@@ -0,0 +1,61 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Tests of the section-granular extraction of loadable segments'''
+
+from conftest import SHT_INIT_ARRAY, SHT_NOBITS, SHT_PROGBITS, get_image_args, get_pattern, \
+    read_load_segments, run_genimage
+
+def generate(tmp_path, core, section_extract):
+    '''Generates an image of core 0, returns its PT_LOAD segments'''
+    output = tmp_path / "image.out"
+    result = run_genimage(*get_image_args({0: core}, output, f"--section-extract={section_extract}"))
+    assert result.returncode == 0, result.stdout + result.stderr
+    return read_load_segments(output)
+
+def test_holes_between_sections_are_dropped(tmp_path, elf_factory):
+    '''Only the ranges of allocated sections with file contents are copied'''
+    data = get_pattern(0x3000)
+    sections = [(".text", 0x1000, 0x100, SHT_PROGBITS), (".init_array", 0x2000, 0x10, SHT_INIT_ARRAY),
+                (".data", 0x2010, 0x1f0, SHT_PROGBITS), (".bss", 0x2200, 0xe00, SHT_NOBITS)]
+    core = elf_factory("core0.out", [(0x1000, data)], sections=sections)
+
+    assert generate(tmp_path, core, "true") == [(0x1000, data[:0x100]), (0x2000, data[0x1000:0x1200])]
+    segs = generate(tmp_path, core, "false")
+    assert segs[0][0] == 0x1000 and b''.join(seg_data for _, seg_data in segs) == data
+
+def test_segments_without_sections_are_kept(tmp_path, elf_factory):
+    '''Inputs without section headers keep their whole segments'''
+    data = get_pattern(0x800)
+    core = elf_factory("core0.out", [(0x1000, data)])
+
+    assert generate(tmp_path, core, "true") == [(0x1000, data)]
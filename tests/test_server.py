@@ -0,0 +1,112 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Tests of the image server and its socket'''
+
+import os
+import socket
+import sys
+import threading
+
+import pytest
+
+from modules import server
+
+def test_private_dir(tmp_path):
+    '''Only directories of the user which others cannot access are private'''
+    path = tmp_path / "run"
+    assert server.is_private_dir(path, create=True)
+    assert server.is_private_dir(path)
+
+    os.chmod(path, 0o755)
+    assert not server.is_private_dir(path)
+    os.chmod(path, 0o700)
+
+    link = tmp_path / "link"
+    link.symlink_to(path)
+    assert not server.is_private_dir(link)
+    assert not server.is_private_dir(tmp_path / "missing")
+
+def test_default_socket_path(tmp_path, monkeypatch):
+    '''The default socket is in the runtime directory of the user, else in a directory of the user'''
+    monkeypatch.delenv(server.SOCKET_ENV, raising=False)
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path))
+    assert server.get_socket_path() == str(tmp_path / server.SOCKET_NAME)
+
+    monkeypatch.delenv('XDG_RUNTIME_DIR')
+    assert os.path.dirname(server.get_socket_path()).endswith(f"genimage-{os.geteuid()}")
+    assert server.get_socket_path(str(tmp_path / "given.sock")) == str(tmp_path / "given.sock")
+
+def test_client_skips_shared_dir(tmp_path, monkeypatch):
+    '''The client does not connect to a default directory others can access'''
+    monkeypatch.delenv(server.SOCKET_ENV, raising=False)
+    monkeypatch.setenv('XDG_RUNTIME_DIR', str(tmp_path))
+    os.chmod(tmp_path, 0o777)
+    assert server.send_job(["--help"]) is None
+
+def test_peer_uid():
+    '''Both ends of a socket pair run as the same user'''
+    left, right = socket.socketpair(socket.AF_UNIX)
+    with left, right:
+        assert server.is_same_user(left)
+        if hasattr(socket, 'SO_PEERCRED'):
+            assert server.get_peer_uid(left) == os.geteuid()
+
+def test_send_job(tmp_path):
+    '''A job is run in the server and its status and output are sent back'''
+    def run(argv, core_caches=None):
+        print(' '.join(argv))
+        return 3
+
+    socket_path = str(tmp_path / "genimage.sock")
+    image_server = server.GenImageServer(socket_path, run)
+    thread = threading.Thread(target=image_server.handle_request)
+    thread.start()
+    try:
+        assert server.send_job(["a", "b"], socket_path=socket_path) == (3, "a b\n")
+    finally:
+        thread.join()
+        image_server.server_close()
+
+def test_stop_during_job(tmp_path):
+    '''Exiting in a job is its exit code, unless the server is being stopped'''
+    image_server = server.GenImageServer(str(tmp_path / "genimage.sock"), None)
+    try:
+        image_server.run = lambda argv, core_caches=None: sys.exit(2)
+        assert image_server.run_job([], str(tmp_path)) == (2, "")
+
+        image_server.run = lambda argv, core_caches=None: image_server.stop()
+        with pytest.raises(SystemExit):
+            image_server.run_job([], str(tmp_path))
+        assert os.getcwd() != str(tmp_path)
+    finally:
+        image_server.server_close()
@@ -0,0 +1,81 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Tests of the shared static objects and the Shared Segments note'''
+
+from modules.args import sso_type
+from modules.consts import SSO_CORE_ID
+from modules.image import MultiCoreELFImage
+from modules.multicoreelf import MultiCoreELF
+from conftest import get_pattern, write_xlat
+
+def generate_shared(tmp_path, elf_factory, sso_cores, **kwargs):
+    '''Generates an image of two cores and an SSO used by sso_cores, returns its PT_LOAD segments'''
+    core0 = elf_factory('core0.out', [(0x1000, get_pattern(0x100))])
+    core1 = elf_factory('core1.out', [(0x1000, get_pattern(0x100, seed=1))])
+    sso = elf_factory('sso.out', [(0x1100, get_pattern(0x80, seed=2))])
+    ofname = str(tmp_path / 'image.out')
+    m_elf = MultiCoreELF(ofname=ofname)
+    m_elf.add_elf(f"0:{core0}")
+    m_elf.add_elf(f"1:{core1}")
+    m_elf.add_sso(sso, cores=sso_cores)
+    assert m_elf.generate_multicoreelf(max_segment_size=0x10000, **kwargs) == 0
+    with MultiCoreELFImage(ofname) as image:
+        return [(seg['core'], seg['vaddr'], seg['filesz'], seg['shared']) for seg in image.get_load_segments()]
+
+def test_sso_translated_for_each_core(tmp_path, elf_factory):
+    '''An SSO is stored once and the note has its address in the view of each core using it'''
+    xlat = write_xlat(tmp_path / 'xlat.json', [[(0x0, 0x70000000, 0x10000)], [(0x0, 0x78000000, 0x10000)]])
+    segs = generate_shared(tmp_path, elf_factory, [0, 1], xlat_file_path=xlat)
+    shared = [seg for seg in segs if seg[0] == SSO_CORE_ID]
+    assert shared == [(SSO_CORE_ID, 0x70001100, 0x80, [(0, 0x70001100), (1, 0x78001100)])]
+    assert sorted(seg[1] for seg in segs if seg[0] != SSO_CORE_ID) == [0x70001000, 0x78001000]
+
+def test_sso_of_one_core(tmp_path, elf_factory):
+    '''Only the cores using an SSO are listed in the note'''
+    segs = generate_shared(tmp_path, elf_factory, [1])
+    assert [seg[3] for seg in segs if seg[0] == SSO_CORE_ID] == [[(1, 0x1100)]]
+
+def test_sso_not_merged_with_core_segments(tmp_path, elf_factory):
+    '''A shared segment adjacent to a segment of a core stays apart even ignoring the context'''
+    segs = generate_shared(tmp_path, elf_factory, None, segmerge=True, ignore_context=True, tol_limit=0x1000)
+    assert [(seg[0], seg[1], seg[2]) for seg in segs if seg[0] == SSO_CORE_ID] == [(SSO_CORE_ID, 0x1100, 0x80)]
+    assert [seg[3] for seg in segs if seg[0] == SSO_CORE_ID] == [[(0, 0x1100), (1, 0x1100)]]
+
+def test_sso_argument():
+    '''--sso takes the file alone or the cores using it and the file'''
+    assert sso_type('lib.out') == (None, 'lib.out')
+    assert sso_type('0,2:lib.out') == ([0, 2], 'lib.out')
+    assert sso_type('C:/lib.out') == (None, 'C:/lib.out')
+
+if __name__ == "__main__":
+    pass
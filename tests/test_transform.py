@@ -0,0 +1,110 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Tests of the per-segment transforms'''
+
+import hashlib
+import json
+import pickle
+import random
+
+import pytest
+
+from modules.payload import Payload
+from modules.transform import DigestTransform, SegmentTransform, ZeroBlockTransform, run_transforms
+from conftest import generate_segments, get_pattern
+
+def test_compact_payload(tmp_path):
+    '''A compacted payload reads the same and only holds the referenced bytes'''
+    data = get_pattern(1 << 20)
+    fname = str(tmp_path / "input.bin")
+    with open(fname, 'wb') as file:
+        file.write(data)
+
+    payload = Payload.from_bytes(data).slice(0x1000, 0x100)
+    payload.extend_zeros(0x10)
+    payload.extend(Payload.from_file(fname, 0x20, 0x40))
+    compact = payload.compact()
+
+    assert len(compact) == len(payload)
+    assert compact.read() == payload.read()
+    assert compact.extents[1:] == payload.extents[1:]
+    assert len(pickle.dumps(compact)) < 0x1000 < len(pickle.dumps(payload))
+
+def test_run_transforms_jobs():
+    '''The results are in segment order and do not depend on the threads or processes used'''
+    data = bytes(0x3000) + get_pattern(0x5000)
+    segments = [{"data": Payload.from_bytes(data).slice(start, 0x2000)} for start in range(0, 0x6000, 0x1000)]
+    transforms = [DigestTransform('sha256'), ZeroBlockTransform(block_size=0x800)]
+
+    results = run_transforms(segments, transforms, jobs=1)
+    assert run_transforms(segments, transforms, jobs=2) == results
+    for seg, result in zip(segments, results):
+        assert result['sha256'] == hashlib.sha256(seg['data'].read()).hexdigest()
+    assert [result['zero_bytes'] for result in results] == [0x2000, 0x2000, 0x1000, 0, 0, 0]
+
+def test_zero_blocks():
+    '''The zero bytes are those of the blocks, including a short last one, which are all zeros'''
+    rand = random.Random(1)
+    for block_size in (1, 3, 0x10, 0x1000):
+        transform = ZeroBlockTransform(block_size=block_size)
+        for _ in range(50):
+            data = b''.join(bytes(rand.randrange(3 * block_size + 5)) if rand.random() < 0.5 else
+                            rand.randbytes(rand.randrange(3 * block_size + 5)) for _ in range(rand.randrange(1, 12)))
+            blocks = [data[start:start + block_size] for start in range(0, len(data), block_size)]
+            expected = sum(len(block) for block in blocks if not any(block))
+            assert transform.apply(Payload.from_bytes(data)) == expected
+    assert ZeroBlockTransform().releases_gil
+
+def test_transform_needs_apply():
+    '''A transform without apply can not be created'''
+    class NoApply(SegmentTransform):
+        '''Transform missing apply'''
+        name = 'none'
+
+    with pytest.raises(TypeError):
+        NoApply()
+
+def test_transforms_while_writing(tmp_path, elf_factory):
+    '''The results computed alongside the writing are in the report and the image is unchanged'''
+    core0 = elf_factory('core0.out', [(0x1000, bytes(0x2000) + get_pattern(0x1000))])
+    core1 = elf_factory('core1.out', [(0x90000, get_pattern(0x800, seed=2))])
+    plain = generate_segments([(0, core0), (1, core1)], tmp_path / 'plain.out')
+    ofname = tmp_path / 'image.out'
+    segs = generate_segments([(0, core0), (1, core1)], ofname, report=True,
+                             transforms=[DigestTransform('sha256'), ZeroBlockTransform()], transform_jobs=2)
+    assert segs == plain
+
+    with open(f"{ofname}.report.json", encoding='utf-8') as file:
+        results = json.load(file)['segment_transforms']
+    assert [result['sha256'] for result in results] == [hashlib.sha256(data).hexdigest() for _, data in segs]
+    assert [result['zero_bytes'] for result in results] == [0x2000, 0]
@@ -0,0 +1,143 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Tests of the in-place update of an existing image'''
+
+import os
+
+from modules.elf import UPDATE_STATE_SUFFIX
+from modules.multicoreelf import MultiCoreELF
+from conftest import get_pattern
+
+def generate(inputs, ofname, update=False, **kwargs):
+    '''Generates an image of the (core ID, input ELF) inputs without the random string note'''
+    m_elf = MultiCoreELF(ofname=str(ofname))
+    for core_id, fname in inputs:
+        m_elf.add_elf(f"{core_id}:{fname}")
+    assert m_elf.generate_multicoreelf(max_segment_size=0x800, update=update, **kwargs) == 0
+    return ofname.read_bytes()
+
+def test_update_patches_changed_segments(tmp_path, elf_factory):
+    '''An image updated in place equals an image rebuilt from the changed inputs'''
+    core0 = elf_factory('core0.out', [(0x1000, get_pattern(0x2000))], entry=0x1000)
+    core1 = elf_factory('core1.out', [(0x8000, get_pattern(0x1000, seed=3))], entry=0x8000)
+    inputs = [(0, core0), (1, core1)]
+    image = tmp_path / 'out.mcelf'
+    generate(inputs, image)
+
+    elf_factory('core1.out', [(0x8000, get_pattern(0x1000, seed=4))], entry=0x8000)
+    updated = generate(inputs, image, update=True)
+    assert updated == generate(inputs, tmp_path / 'full.mcelf')
+
+def test_update_picks_up_inputs_with_older_mtime(tmp_path, elf_factory):
+    '''An input changed but with a modification time older than the image is still updated'''
+    core0 = elf_factory('core0.out', [(0x1000, get_pattern(0x2000))], entry=0x1000)
+    core1 = elf_factory('core1.out', [(0x8000, get_pattern(0x1000, seed=3))], entry=0x8000)
+    inputs = [(0, core0), (1, core1)]
+    image = tmp_path / 'out.mcelf'
+    generate(inputs, image)
+
+    # patch two bytes of an input, like a cache restore, with a time before the image
+    data = bytearray(get_pattern(0x2000))
+    data[0x1234:0x1236] = b'\xAA\x55'
+    elf_factory('core0.out', [(0x1000, bytes(data))], entry=0x1000)
+    os.utime(core0, ns=(946684800 * 10**9, 946684800 * 10**9))
+
+    updated = generate(inputs, image, update=True)
+    rebuilt = generate(inputs, tmp_path / 'full.mcelf')
+    assert updated == rebuilt
+
+def test_update_without_changes_keeps_the_image(tmp_path, elf_factory):
+    '''Updating with unchanged inputs gives the same image'''
+    core0 = elf_factory('core0.out', [(0x1000, get_pattern(0x1800))], entry=0x1000)
+    image = tmp_path / 'out.mcelf'
+    first = generate([(0, core0)], image)
+    assert generate([(0, core0)], image, update=True) == first
+
+def test_update_with_another_layout_rebuilds(tmp_path, elf_factory):
+    '''A layout change falls back to writing the whole image'''
+    core0 = elf_factory('core0.out', [(0x1000, get_pattern(0x1800))], entry=0x1000)
+    image = tmp_path / 'out.mcelf'
+    generate([(0, core0)], image)
+
+    elf_factory('core0.out', [(0x1000, get_pattern(0x1800)), (0x4000, get_pattern(0x100, seed=9))], entry=0x1000)
+    updated = generate([(0, core0)], image, update=True)
+    assert updated == generate([(0, core0)], tmp_path / 'full.mcelf')
+
+def spy_preads(monkeypatch):
+    '''Returns the list the sizes of the reads of the existing image are appended to'''
+    sizes = []
+    pread = os.pread
+
+    def counting_pread(fd, length, offset):
+        sizes.append(length)
+        return pread(fd, length, offset)
+
+    monkeypatch.setattr(os, 'pread', counting_pread)
+    return sizes
+
+def test_update_skips_unchanged_segments_unread(tmp_path, elf_factory, monkeypatch):
+    '''Only the segments whose inputs changed since the last update are read back and compared'''
+    core0 = elf_factory('core0.out', [(0x1000, get_pattern(0x4000))], entry=0x1000)
+    core1 = elf_factory('core1.out', [(0x8000, get_pattern(0x1000, seed=3))], entry=0x8000)
+    inputs = [(0, core0), (1, core1)]
+    image = tmp_path / 'out.mcelf'
+    generate(inputs, image, update=True)
+    assert os.path.exists(f"{image}{UPDATE_STATE_SUFFIX}")
+
+    elf_factory('core1.out', [(0x8000, get_pattern(0x1000, seed=4))], entry=0x8000)
+    sizes = spy_preads(monkeypatch)
+    updated = generate(inputs, image, update=True)
+    # the headers and layout notes, then the segments of core 1 only
+    assert 0x1000 <= sum(sizes) < 0x1400
+    monkeypatch.undo()
+    assert updated == generate(inputs, tmp_path / 'full.mcelf')
+
+def test_update_compares_an_image_changed_since(tmp_path, elf_factory):
+    '''An image written since its segments were recorded is compared in full'''
+    core0 = elf_factory('core0.out', [(0x1000, get_pattern(0x1800))], entry=0x1000)
+    image = tmp_path / 'out.mcelf'
+    first = generate([(0, core0)], image, update=True)
+
+    # corrupt the last byte of the segment data, the recorded keys are then stale
+    data = bytearray(first)
+    data[-1] ^= 0xFF
+    image.write_bytes(bytes(data))
+    assert generate([(0, core0)], image, update=True) == first
+
+def test_full_write_drops_the_recorded_segments(tmp_path, elf_factory):
+    '''Writing an image without --update removes the record of the segments of the last update'''
+    core0 = elf_factory('core0.out', [(0x1000, get_pattern(0x1800))], entry=0x1000)
+    image = tmp_path / 'out.mcelf'
+    generate([(0, core0)], image, update=True)
+    generate([(0, core0)], image)
+    assert not os.path.exists(f"{image}{UPDATE_STATE_SUFFIX}")
@@ -0,0 +1,119 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Tests of the watch mode'''
+
+import os
+import signal
+import subprocess
+import sys
+import time
+
+import pytest
+
+from modules import watch
+from modules.elf import ELF
+from conftest import GENIMAGE, generate_segments, get_image_args, get_pattern, read_load_segments, \
+    write_elf32
+
+@pytest.fixture(params=['inotify', 'poll'])
+def watcher_mode(request, monkeypatch):
+    '''Runs a test with inotify and with the stat polling fallback'''
+    if request.param == 'poll':
+        monkeypatch.setattr(watch.ctypes.util, 'find_library', lambda name: None)
+    return request.param
+
+def test_watcher_reports_changed_files(tmp_path, watcher_mode):
+    '''Rewritten and replaced files are reported once they stay quiet, other files are not'''
+    watched = [tmp_path / "core0.out", tmp_path / "core1.out"]
+    for path in watched + [tmp_path / "other.out"]:
+        path.write_bytes(b'old')
+
+    watcher = watch.FileWatcher(watched, debounce=0.05, poll_interval=0.05)
+    try:
+        assert (watcher.inotify_fd is None) == (watcher_mode == 'poll')
+        watched[0].write_bytes(b'new contents')
+        (tmp_path / "other.out").write_bytes(b'new contents')
+        assert watcher.wait() == {os.path.realpath(watched[0])}
+
+        # build tools often write a new file and rename it over the old one
+        (tmp_path / "core1.tmp").write_bytes(b'replaced')
+        os.replace(tmp_path / "core1.tmp", watched[1])
+        assert watcher.wait() == {os.path.realpath(watched[1])}
+    finally:
+        watcher.close()
+
+def wait_for(condition, timeout=20):
+    '''Waits until condition() is true, returns False on timeout'''
+    end = time.monotonic() + timeout
+    while time.monotonic() < end:
+        if condition():
+            return True
+        time.sleep(0.05)
+    return False
+
+def test_watch_regenerates_image(tmp_path):
+    '''The image is generated again when an input ELF changes'''
+    core = write_elf32(tmp_path / "core0.out", [(0x1000, get_pattern(0x100))])
+    output = tmp_path / "image.out"
+    args = get_image_args({0: core}, output, "--watch", "--watch-debounce=0.05")
+    with subprocess.Popen([sys.executable, GENIMAGE, *args], stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                          text=True) as proc:
+        try:
+            assert proc.stdout.readline().startswith("Watching")
+            assert read_load_segments(output) == [(0x1000, get_pattern(0x100))]
+
+            new_segments = [(0x1000, get_pattern(0x100, seed=1)), (0x2000, get_pattern(0x80, seed=2))]
+            write_elf32(tmp_path / "core0.tmp", new_segments)
+            os.replace(tmp_path / "core0.tmp", core)
+            assert "Regenerated" in proc.stdout.readline()
+            assert read_load_segments(output) == new_segments
+        finally:
+            proc.send_signal(signal.SIGINT)
+            proc.wait(timeout=10)
+
+def test_input_rebuilt_before_writing(tmp_path, monkeypatch):
+    '''An input rebuilt between parsing and writing is parsed again instead of mixing two builds'''
+    core = write_elf32(tmp_path / "core0.out", [(0x1000, get_pattern(0x100))])
+    new_segments = [(0x1000, get_pattern(0x180, seed=1)), (0x2000, get_pattern(0x80, seed=2))]
+    layout_elf = ELF.layout_elf
+    layouts = []
+
+    def rebuild_after_layout(self, *args, **kwargs):
+        layouts.append(self)
+        if len(layouts) == 1:
+            write_elf32(tmp_path / "core0.out", new_segments)
+        return layout_elf(self, *args, **kwargs)
+
+    monkeypatch.setattr(ELF, 'layout_elf', rebuild_after_layout)
+    assert generate_segments([(0, core)], tmp_path / "image.out") == new_segments
+    assert len(layouts) == 2
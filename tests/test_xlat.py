@@ -0,0 +1,88 @@
+'''
+Copyright (C) 2024 Texas Instruments Incorporated
+
+Redistribution and use in source and binary forms, with or without
+modification, are permitted provided that the following conditions
+are met:
+
+  Redistributions of source code must retain the above copyright
+  notice, this list of conditions and the following disclaimer.
+
+  Redistributions in binary form must reproduce the above copyright
+  notice, this list of conditions and the following disclaimer in the
+  documentation and/or other materials provided with the
+  distribution.
+
+  Neither the name of Texas Instruments Incorporated nor the names of
+  its contributors may be used to endorse or promote products derived
+  from this software without specific prior written permission.
+
+THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+"AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS FOR
+A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE COPYRIGHT
+OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT, INCIDENTAL,
+SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING, BUT NOT
+LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES; LOSS OF USE,
+DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER CAUSED AND ON ANY
+THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT LIABILITY, OR TORT
+(INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN ANY WAY OUT OF THE USE
+OF THIS SOFTWARE, EVEN IF ADVISED OF THE POSSIBILITY OF SUCH DAMAGE.
+'''
+
+'''Tests of the address translation of the segments'''
+
+import pytest
+
+from modules.addtranslate import AddressTranslator
+from conftest import generate_segments, get_image_args, get_pattern, run_genimage, write_xlat
+
+def test_translation_region_boundary_splits_segments(tmp_path, elf_factory):
+    '''A segment crossing the end of a translation region is split and each part translated'''
+    data = get_pattern(0x2000)
+    core0 = elf_factory('core0.out', [(0x1000, data)])
+    xlat = write_xlat(tmp_path / 'xlat.json', [[(0x0, 0x70000000, 0x2000)]])
+
+    segs = generate_segments([(0, core0)], tmp_path / 'out', xlat_file_path=xlat)
+
+    # sorted by SoC address, the part outside of the region is passed through
+    assert segs == [(0x2000, data[0x1000:]), (0x70001000, data[:0x1000])]
+
+def test_segments_merge_in_soc_address_space(tmp_path, elf_factory):
+    '''Segments next to each other after translation are merged, even if they are not locally'''
+    data0 = get_pattern(0x1000, seed=1)
+    data1 = get_pattern(0x1000, seed=2)
+    core0 = elf_factory('core0.out', [(0x0, data0)])
+    core1 = elf_factory('core1.out', [(0x0, data1)])
+    xlat = write_xlat(tmp_path / 'xlat.json', [[(0x0, 0x80000000, 0x1000)], [(0x0, 0x80001000, 0x1000)]])
+
+    segs = generate_segments([(0, core0), (1, core1)], tmp_path / 'out', xlat_file_path=xlat,
+                    segmerge=True, ignore_context=True)
+
+    assert segs == [(0x80000000, data0 + data1)]
+
+def test_locally_adjacent_segments_in_different_regions_are_not_merged(tmp_path, elf_factory):
+    '''Segments next to each other locally but translated apart stay separate'''
+    data = get_pattern(0x2000)
+    core0 = elf_factory('core0.out', [(0x0, data)])
+    xlat = write_xlat(tmp_path / 'xlat.json', [[(0x0, 0x90000000, 0x1000), (0x1000, 0x80000000, 0x1000)]])
+
+    segs = generate_segments([(0, core0)], tmp_path / 'out', xlat_file_path=xlat, segmerge=True, tol_limit=0x1000)
+
+    assert segs == [(0x80000000, data[0x1000:]), (0x90000000, data[:0x1000])]
+
+def test_core_without_regions_is_an_error(tmp_path, elf_factory):
+    '''A core beyond the translation tables fails naming the core instead of passing its addresses through'''
+    xlat = write_xlat(tmp_path / 'xlat.json', [[(0x0, 0x70000000, 0x10000)], [(0x0, 0x78000000, 0x10000)]])
+    translator = AddressTranslator(xlat)
+    with pytest.raises(ValueError, match="core 2"):
+        translator.translate(2, 0x1000)
+    with pytest.raises(ValueError, match="core 2"):
+        translator.get_boundaries(2, 0x1000, 0x100)
+
+    core2 = elf_factory('core2.out', [(0x1000, get_pattern(0x100))])
+    output = tmp_path / 'image.out'
+    result = run_genimage(*get_image_args({2: core2}, output, f"--xlat={xlat}"))
+    assert result.returncode == 1
+    assert "[ERROR] : No address translation regions for core 2" in result.stdout
+    assert not output.exists()